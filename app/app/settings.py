@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "corsheaders",
     'core',
     'rest_framework',
@@ -94,10 +95,57 @@ DATABASES = {
     }
 }
 
+# Check persistent connections still work before a request reuses them,
+# as CONN_HEALTH_CHECKS does from Django 4.1 on. See core/db.py.
+SHOP_DB_HEALTH_CHECKS = os.environ.get('SHOP_DB_HEALTH_CHECKS', '0') == '1'
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default, a shared Redis server when REDIS_URL is set
+# (requires the redis package) or a directory when CACHE_DIR is set.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+elif os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
+# New passwords are hashed by SHOP_PASSWORD_HASHER: 'argon2', 'scrypt'
+# or 'pbkdf2'. Hashes made by the others still verify, and are replaced
+# on the next login.
+PASSWORD_HASHER_CLASSES = {
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+SHOP_PASSWORD_HASHER = os.environ.get('SHOP_PASSWORD_HASHER', 'argon2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[SHOP_PASSWORD_HASHER]] + [
+    hasher for hasher in [
+        *PASSWORD_HASHER_CLASSES.values(),
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    ] if hasher != PASSWORD_HASHER_CLASSES[SHOP_PASSWORD_HASHER]
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -141,10 +189,111 @@ AUTH_USER_MODEL = 'core.User'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema', 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'user.authentication.SignedTokenAuthentication',
+        'user.authentication.CachedTokenAuthentication',
     ),
+    # Login attempts allowed per client IP and per email.
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('SHOP_LOGIN_RATE_IP', '30/min'),
+        'login_email': os.environ.get('SHOP_LOGIN_RATE_EMAIL', '5/min'),
+    },
 }
 
+# Password checks run on SHOP_LOGIN_WORKERS threads (0 runs them in the
+# request), with SHOP_LOGIN_QUEUE more logins waiting at most. Logins
+# beyond that get a 503. See user/login.py.
+SHOP_LOGIN_WORKERS = int(os.environ.get('SHOP_LOGIN_WORKERS', 4))
+SHOP_LOGIN_QUEUE = int(os.environ.get('SHOP_LOGIN_QUEUE', 16))
+
+# Lifetimes of the signed access tokens and of the refresh tokens they
+# are renewed with, in seconds. See user/tokens.py.
+SHOP_ACCESS_TOKEN_LIFETIME = int(
+    os.environ.get('SHOP_ACCESS_TOKEN_LIFETIME', 300)
+)
+SHOP_REFRESH_TOKEN_LIFETIME = int(
+    os.environ.get('SHOP_REFRESH_TOKEN_LIFETIME', 14 * 24 * 3600)
+)
+
+# The users of recently seen auth tokens are cached for
+# SHOP_AUTH_CACHE_TIMEOUT seconds, in an LRU of SHOP_AUTH_CACHE_SIZE
+# tokens per process ('local') or in the shared Django cache ('shared').
+# Empty disables it. Entries are dropped when users are saved, but not
+# by queryset update(), e.g. User.objects.update(is_active=False), which
+# only takes effect after the timeout. See user/authentication.py.
+SHOP_AUTH_CACHE = os.environ.get('SHOP_AUTH_CACHE', 'local')
+SHOP_AUTH_CACHE_SIZE = int(os.environ.get('SHOP_AUTH_CACHE_SIZE', 10000))
+SHOP_AUTH_CACHE_TIMEOUT = int(os.environ.get('SHOP_AUTH_CACHE_TIMEOUT', 60))
+
+# Page sizes of the shop api list endpoints.
+SHOP_PAGE_SIZE = int(os.environ.get('SHOP_PAGE_SIZE', 50))
+SHOP_MAX_PAGE_SIZE = int(os.environ.get('SHOP_MAX_PAGE_SIZE', 500))
+
+# Maximum number of products accepted by a single bulk request.
+SHOP_BULK_MAX_ITEMS = int(os.environ.get('SHOP_BULK_MAX_ITEMS', 10000))
+
+# Lifetime of cached catalog responses, and how long a request waits for
+# another one computing the same response, in seconds.
+SHOP_CACHE_TIMEOUT = int(os.environ.get('SHOP_CACHE_TIMEOUT', 300))
+SHOP_CACHE_LOCK_TIMEOUT = int(os.environ.get('SHOP_CACHE_LOCK_TIMEOUT', 5))
+
+# Number of rows fetched and serialized at a time by the catalog export.
+SHOP_EXPORT_CHUNK_SIZE = int(os.environ.get('SHOP_EXPORT_CHUNK_SIZE', 2000))
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+
+# Product images are staged in SHOP_IMAGE_STAGING_DIR, then uploaded by
+# SHOP_IMAGE_WORKERS background threads (0 uploads right after the
+# request) to the SHOP_IMAGE_BACKEND storage: 'cloudinary', 'local' to
+# keep them in SHOP_IMAGE_LOCAL_DIR served under SHOP_IMAGE_LOCAL_URL,
+# 'memory', or the dotted path of a Storage class. See shop/storage.py.
+SHOP_IMAGE_STAGING_DIR = os.environ.get(
+    'SHOP_IMAGE_STAGING_DIR', BASE_DIR / 'staging' / 'images'
+)
+SHOP_IMAGE_WORKERS = int(os.environ.get('SHOP_IMAGE_WORKERS', 2))
+SHOP_IMAGE_BACKEND = os.environ.get('SHOP_IMAGE_BACKEND', 'cloudinary')
+SHOP_IMAGE_LOCAL_DIR = os.environ.get(
+    'SHOP_IMAGE_LOCAL_DIR', os.path.join(MEDIA_ROOT, 'product_images')
+)
+SHOP_IMAGE_LOCAL_URL = os.environ.get(
+    'SHOP_IMAGE_LOCAL_URL', MEDIA_URL + 'product_images/'
+)
+
+# Before upload, images are stripped of their metadata and shrunk to fit
+# SHOP_IMAGE_MAX_SIZE pixels, with a SHOP_IMAGE_THUMBNAIL_SIZE thumbnail
+# and a WebP copy. SHOP_IMAGE_PROCESSES worker processes do the work (0
+# processes images in the uploading thread).
+SHOP_IMAGE_MAX_SIZE = int(os.environ.get('SHOP_IMAGE_MAX_SIZE', 1600))
+SHOP_IMAGE_THUMBNAIL_SIZE = int(
+    os.environ.get('SHOP_IMAGE_THUMBNAIL_SIZE', 300)
+)
+SHOP_IMAGE_QUALITY = int(os.environ.get('SHOP_IMAGE_QUALITY', 85))
+SHOP_IMAGE_PROCESSES = int(os.environ.get('SHOP_IMAGE_PROCESSES', 2))
+
+# Number of recommendations stored for each product.
+SHOP_RECOMMENDATIONS_TOP_K = int(
+    os.environ.get('SHOP_RECOMMENDATIONS_TOP_K', 20)
+)
+
+# Semantic search embeds products into SHOP_SEMANTIC_DIM hashed TF-IDF
+# buckets, indexed under SHOP_SEMANTIC_INDEX_DIR by the
+# build_semantic_index command. Queries scan the SHOP_SEMANTIC_NPROBE
+# clusters nearest to them. See shop/semantic.py.
+SHOP_SEMANTIC_INDEX_DIR = os.environ.get(
+    'SHOP_SEMANTIC_INDEX_DIR', BASE_DIR / 'indexes' / 'semantic'
+)
+SHOP_SEMANTIC_DIM = int(os.environ.get('SHOP_SEMANTIC_DIM', 256))
+SHOP_SEMANTIC_NPROBE = int(os.environ.get('SHOP_SEMANTIC_NPROBE', 16))
+
+# Products kept in each user's personalized feed, cached for
+# SHOP_FEED_TIMEOUT seconds or until the user orders again.
+SHOP_FEED_SIZE = int(os.environ.get('SHOP_FEED_SIZE', 100))
+SHOP_FEED_TIMEOUT = int(os.environ.get('SHOP_FEED_TIMEOUT', 600))
+
+# Serve the catalog read endpoints by async views, for ASGI servers.
+# See shop/async_views.py.
+SHOP_ASYNC_VIEWS = os.environ.get('SHOP_ASYNC_VIEWS', '0') == '1'
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True
 }
@@ -166,8 +315,9 @@ cloudinary.config(
 
 )
 
-# For static and media files
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# Media files live on Cloudinary too, unless images are stored elsewhere
+if SHOP_IMAGE_BACKEND == 'cloudinary':
+    DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
 
 # CORS Configuration
@@ -0,0 +1,68 @@
+"""
+Production settings for app project.
+
+The base settings, hardened and tuned for a multi-worker server. Select
+them with DJANGO_SETTINGS_MODULE=app.settings_production; the server
+itself is configured in gunicorn.conf.py.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+# Debug mode also keeps every SQL query in memory.
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+    if host
+]
+
+# Every server worker is a process of its own, so the caches behind the
+# catalog responses, login throttles and token cache must be shared for
+# invalidations and limits to apply across workers: Redis is required.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+}
+SHOP_AUTH_CACHE = 'shared'
+
+# Connections stay open DB_CONN_MAX_AGE seconds across requests, and are
+# checked before being reused (see core/db.py). Each gthread server
+# thread keeps one, so workers x threads connections in all. Under ASGI
+# (SHOP_SERVER_MODE=asgi), sync code runs on executor threads which are
+# not the ones closing connections at the end of requests, so persistent
+# connections would pile up: they are closed after each request instead.
+DATABASES = {'default': {
+    **DATABASES['default'],
+    'CONN_MAX_AGE': (
+        0 if os.environ.get('SHOP_SERVER_MODE') == 'asgi'
+        else int(os.environ.get('DB_CONN_MAX_AGE', 60))
+    ),
+}}
+SHOP_DB_HEALTH_CHECKS = True
+
+# Behind a pgbouncer in transaction pooling mode (DB_POOLER=pgbouncer),
+# consecutive transactions may run on different server connections, so
+# the server-side cursors of QuerySet.iterator() cannot be used.
+if os.environ.get('DB_POOLER') == 'pgbouncer':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
+    },
+    'loggers': {
+        # Never log SQL queries, whatever the root level.
+        'django.db.backends': {'level': 'WARNING'},
+    },
+}
@@ -18,6 +18,8 @@ from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
 )
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
@@ -32,3 +34,7 @@ urlpatterns = [
     path('api/user/', include('user.urls')),
     path('api/shop/', include('shop.urls'))
 ]
+
+if settings.SHOP_IMAGE_BACKEND == 'local':
+    urlpatterns += static(settings.MEDIA_URL,
+                          document_root=settings.MEDIA_ROOT)
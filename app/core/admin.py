@@ -1,12 +1,10 @@
 """
 Django admin customization.
 """
-from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
-from cloudinary.forms import CloudinaryFileField
 
 from core import models
 
@@ -50,44 +48,51 @@ admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Category)
 
 
-class ProductAdminForm(forms.ModelForm):
-    # Using Cloudinary's file field for the image
-    image = CloudinaryFileField(
-        options={
-            'folder': 'product_images',
-            'overwrite': True,
-            'resource_type': 'image'
-        },
-        required=False
-    )
-
-    class Meta:
-        model = models.Product
-        fields = '__all__'
-
-
 @admin.register(models.Product)
 class ProductAdmin(admin.ModelAdmin):
-    form = ProductAdminForm
     list_display = ['name', 'price', 'stock', 'category', 'user', 'image_tag']
+    list_select_related = ['category', 'user']
     readonly_fields = ['image_tag']
 
     def image_tag(self, obj):
-        if obj.image:
+        url = obj.image_thumbnail or (obj.image.url if obj.image else '')
+        if url:
             return format_html('<img src="{}" width="150" height="150" />',
-                               obj.image.url)
+                               url)
         return "No Image Uploaded"
     image_tag.short_description = 'Image'
 
-    fields = ('name', 'description', 'price',
-              'stock', 'category', 'user', 'image')
-
     # Adjust the fields and fieldsets as per your requirements
     fields = ('name', 'description', 'price',
-              'stock', 'category', 'user', 'image')
+              'stock', 'category', 'user', 'image_tag')
+
+
+@admin.register(models.ImageUploadJob)
+class ImageUploadJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'product', 'status', 'attempts', 'updated_at']
+    list_filter = ['status']
+    readonly_fields = ['staged_path', 'image_url', 'error', 'attempts']
+
+
+@admin.register(models.ImageAsset)
+class ImageAssetAdmin(admin.ModelAdmin):
+    list_display = ['digest', 'image_url', 'created_at']
+    readonly_fields = ['digest', 'image_url', 'thumbnail_url', 'webp_url',
+                       'names']
+
+
+@admin.register(models.Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'item_count', 'total_amount', 'created_at']
+    list_select_related = ['user']
+    readonly_fields = ['total_amount', 'item_count']
+
+
+@admin.register(models.OrderItem)
+class OrderItemAdmin(admin.ModelAdmin):
+    list_display = ['order', 'product_name', 'unit_price', 'quantity']
+    readonly_fields = ['unit_price', 'product_name']
 
 
-admin.site.register(models.Order)
-admin.site.register(models.OrderItem)
 admin.site.register(models.Cart)
 admin.site.register(models.CartItem)
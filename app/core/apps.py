@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        if settings.SHOP_DB_HEALTH_CHECKS:
+            from django.core.signals import request_started
+
+            from .db import check_connections
+            request_started.connect(check_connections)
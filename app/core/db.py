@@ -0,0 +1,17 @@
+"""
+Health checks of persistent database connections.
+
+With CONN_MAX_AGE, a connection closed by the database or a pooler
+while idle would fail the next request reusing it. Django checks them
+from 4.1 on (CONN_HEALTH_CHECKS); until then, this pings the open
+connections of the thread at the start of each request, after Django
+closed the expired ones, and drops those that no longer answer.
+"""
+from django.db import connections
+
+
+def check_connections(**kwargs):
+    """Close the open connections that no longer work."""
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
@@ -0,0 +1,172 @@
+"""
+Django command to compare the WSGI and ASGI paths of a catalog endpoint.
+"""
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+from urllib.parse import urlsplit
+
+import numpy as np
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.urls import URLResolver, include, path, resolve
+from django.utils.module_loading import import_string
+
+from shop.async_views import async_routes
+from shop.urls import router
+
+
+def catalog_urlconf(async_views):
+    """Return the project URLconf with sync or async catalog views.
+
+    Whatever SHOP_ASYNC_VIEWS says, so that both run in one process.
+    """
+    routes = router.urls
+    if async_views:
+        routes = async_routes(routes)
+    urlconf = ModuleType('async_catalog' if async_views else 'sync_catalog')
+    urlconf.urlpatterns = [
+        pattern for pattern in import_string(
+            f'{settings.ROOT_URLCONF}.urlpatterns'
+        )
+        if not (isinstance(pattern, URLResolver)
+                and pattern.app_name == 'shop')
+    ] + [path('api/shop/', include((routes, 'shop')))]
+    return urlconf
+
+
+class SyncHandler(WSGIHandler):
+    """The WSGI handler, resolving the sync catalog views."""
+    urlconf = catalog_urlconf(async_views=False)
+
+    def get_response(self, request):
+        request.urlconf = self.urlconf
+        return super().get_response(request)
+
+
+class AsyncHandler(ASGIHandler):
+    """The ASGI handler, resolving the async catalog views."""
+    urlconf = catalog_urlconf(async_views=True)
+
+    async def get_response_async(self, request):
+        request.urlconf = self.urlconf
+        return await super().get_response_async(request)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the request handlers in process."""
+    help = (
+        'Send the same GET requests through the WSGI and the ASGI '
+        'handlers at the same concurrency, without any server or '
+        'socket, and report requests per second and latencies. WSGI '
+        'serves the sync views and ASGI the async ones, whatever '
+        'SHOP_ASYNC_VIEWS says.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/shop/products/')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=16)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        url = urlsplit(options['url'])
+        for name, handler in (('wsgi', SyncHandler), ('asgi', AsyncHandler)):
+            view = resolve(url.path, handler.urlconf).func
+            kind = 'async' if asyncio.iscoroutinefunction(view) else 'sync'
+            self.stdout.write(f'{name}: {url.path} is served by the {kind} '
+                              'view.')
+        for name, run in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+            start = time.perf_counter()
+            results = run(url.path, url.query, options['requests'],
+                          options['concurrency'])
+            elapsed = time.perf_counter() - start
+            statuses = [status for status, _ in results]
+            durations = np.array([duration for _, duration in results]) * 1000
+            p50, p99 = np.percentile(durations, [50, 99])
+            errors = sum(status != 200 for status in statuses)
+            self.stdout.write(
+                f'{name}: {len(results) / elapsed:8.1f} req/s, '
+                f'p50 {p50:6.2f} ms, p99 {p99:6.2f} ms, '
+                f'{errors} non-200 responses'
+            )
+
+    def run_wsgi(self, path, query, requests, concurrency):
+        """Send the requests to the WSGI handler from a thread pool."""
+        handler = SyncHandler()
+
+        def send(_):
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': path,
+                'QUERY_STRING': query,
+                'SERVER_NAME': 'localhost',
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'localhost',
+                'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.version': (1, 0),
+                'wsgi.url_scheme': 'http',
+                'wsgi.input': io.BytesIO(),
+                'wsgi.errors': sys.stderr,
+                'wsgi.multithread': True,
+                'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            statuses = []
+            start = time.perf_counter()
+            response = handler(
+                environ, lambda status, headers: statuses.append(status)
+            )
+            b''.join(response)
+            # Fires request_finished, releasing the thread's connection.
+            response.close()
+            return int(statuses[0].split()[0]), time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(send, range(requests)))
+
+    def run_asgi(self, path, query, requests, concurrency):
+        """Send the requests to the ASGI handler from one event loop."""
+        handler = AsyncHandler()
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'headers': [(b'host', b'localhost')],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(slots):
+            statuses = []
+
+            async def reply(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with slots:
+                start = time.perf_counter()
+                await handler(dict(scope), receive, reply)
+                return statuses[0], time.perf_counter() - start
+
+        async def main():
+            slots = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(
+                *(send(slots) for _ in range(requests))
+            )
+
+        return asyncio.run(main())
@@ -0,0 +1,137 @@
+"""
+Django command to check the product list filters are served by indexes.
+"""
+import itertools
+import re
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from core.models import Category
+from shop.filters import ProductOrderingFilter
+
+SYNTHETIC_PRODUCTS_SQL = """
+INSERT INTO core_product
+    (user_id, category_id, name, description, price, stock, updated_at,
+     image_thumbnail, image_webp)
+SELECT
+    ids.users[1 + g %% cardinality(ids.users)],
+    ids.categories[1 + (g * 7) %% cardinality(ids.categories)],
+    'Product ' || g,
+    '',
+    round((random() * 1000)::numeric, 2),
+    CASE WHEN random() < 0.2 THEN 0 ELSE (random() * 100)::int END,
+    now(),
+    '',
+    ''
+FROM generate_series(1, %s) AS g,
+    (SELECT %s::bigint[] AS users, %s::bigint[] AS categories) AS ids
+"""
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the product list filters."""
+    help = (
+        'Fill a synthetic catalog and EXPLAIN ANALYZE every combination '
+        'of product list filters and ordering, failing when one needs a '
+        'sequential scan. The catalog is rolled back unless --keep is '
+        'given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--keep', action='store_true')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with transaction.atomic():
+            users, categories = self.fill_catalog(options)
+            results = self.explain_all({
+                'category_id': {'category_id': categories[0]},
+                'price': {'min_price': '100', 'max_price': '150'},
+                'in_stock': {'in_stock': 'true'},
+                'user': {'user': users[0]},
+            })
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        seq_scans = [name for name, scan, _ in results if 'Seq Scan' in scan]
+        for name, scan, duration in results:
+            style = self.style.ERROR if 'Seq Scan' in scan else str
+            self.stdout.write(style(f'{name:<55} {duration:>9} {scan}'))
+        if seq_scans:
+            raise CommandError(
+                f'{len(seq_scans)} combinations scan the whole product table.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'All {len(results)} combinations use an index.'
+        ))
+
+    def fill_catalog(self, options):
+        """Insert the synthetic users, categories and products."""
+        run = time.time_ns()
+        users = get_user_model().objects.bulk_create([
+            get_user_model()(email=f'benchmark-{run}-{i}@example.com')
+            for i in range(options['users'])
+        ])
+        categories = Category.objects.bulk_create([
+            Category(name=f'Benchmark {run} {i}')
+            for i in range(options['categories'])
+        ])
+        user_ids = [user.id for user in users]
+        category_ids = [category.id for category in categories]
+
+        start = time.monotonic()
+        with connection.cursor() as cursor:
+            cursor.execute(SYNTHETIC_PRODUCTS_SQL,
+                           [options['rows'], user_ids, category_ids])
+            cursor.execute('ANALYZE core_product')
+        self.stdout.write(
+            f'Inserted {options["rows"]} products in '
+            f'{time.monotonic() - start:.1f}s.'
+        )
+        return user_ids, category_ids
+
+    def explain_all(self, filters):
+        """EXPLAIN the first page of every filter and ordering mix."""
+        orderings = [None] + ProductOrderingFilter.ordering_fields
+        results = []
+        for size in range(len(filters) + 1):
+            for names in itertools.combinations(filters, size):
+                for ordering in orderings:
+                    params = {}
+                    for name in names:
+                        params.update(filters[name])
+                    if ordering:
+                        params['ordering'] = ordering
+                    label = ' + '.join(names) or 'no filter'
+                    label += f' by {ordering or "-id"}'
+                    results.append((label, *self.explain(params)))
+        return results
+
+    def explain(self, params):
+        """Return the product scan and duration of a list request."""
+        from shop.views import ProductViewSet
+
+        request = Request(RequestFactory().get('/', params))
+        view = ProductViewSet(request=request, action='list',
+                              format_kwarg=None, kwargs={})
+        queryset = view.filter_queryset(view.get_queryset())
+        paginator = view.paginator
+        ordering = paginator.get_ordering(request, queryset, view)
+        page = queryset.order_by(*ordering)[:paginator.page_size + 1]
+
+        plan = page.explain(analyze=True)
+        scan = next(
+            (line.strip().lstrip('-> ') for line in plan.splitlines()
+             if 'on core_product' in line),
+            '?',
+        )
+        duration = re.search(r'Execution Time: ([\d.]+ ms)', plan)
+        return re.sub(r'\s+\(.*', '', scan), duration.group(1)
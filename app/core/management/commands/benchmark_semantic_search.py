@@ -0,0 +1,73 @@
+"""
+Django command to check semantic search queries stay fast at scale.
+"""
+import tempfile
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.semantic import SemanticIndex, embed, write_index
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the semantic search index."""
+    help = (
+        'Index a synthetic catalog in a temporary directory and time '
+        'queries against it, failing when the slowest exceed the budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000000)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--vocabulary', type=int, default=20000)
+        parser.add_argument('--budget-ms', type=float, default=20)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        rng = np.random.default_rng(0)
+        vocabulary = [
+            ''.join(rng.choice(list('abcdefghijklmnopqrstuvwxyz'),
+                               rng.integers(3, 10)))
+            for _ in range(options['vocabulary'])
+        ]
+
+        def chunks():
+            """Yield the same synthetic products on every call."""
+            chunk_rng = np.random.default_rng(1)
+            for start in range(0, options['products'], 10000):
+                size = min(10000, options['products'] - start)
+                words = chunk_rng.integers(0, len(vocabulary), (size, 24))
+                yield [
+                    (start + i + 1,
+                     ' '.join(vocabulary[w] for w in row[:4]),
+                     ' '.join(vocabulary[w] for w in row[4:]))
+                    for i, row in enumerate(words.tolist())
+                ]
+
+        with tempfile.TemporaryDirectory() as root:
+            start = time.monotonic()
+            path = f'{root}/index'
+            count = write_index(path, chunks, settings.SHOP_SEMANTIC_DIM)
+            self.stdout.write(
+                f'Indexed {count} products in '
+                f'{time.monotonic() - start:.1f}s.'
+            )
+            index = SemanticIndex(path)
+            durations = []
+            for _ in range(options['queries']):
+                words = rng.integers(0, len(vocabulary), 2)
+                query = ' '.join(vocabulary[w] for w in words)
+                start = time.perf_counter()
+                index.search(embed([(query, '')], index.idf)[0], 20)
+                durations.append((time.perf_counter() - start) * 1000)
+
+        p50, p99 = np.percentile(durations, [50, 99])
+        self.stdout.write(f'Queries: p50 {p50:.2f} ms, p99 {p99:.2f} ms.')
+        if p99 > options['budget_ms']:
+            raise CommandError(
+                f'p99 of {p99:.2f} ms exceeds the {options["budget_ms"]} ms '
+                f'budget.'
+            )
+        self.stdout.write(self.style.SUCCESS('Within budget.'))
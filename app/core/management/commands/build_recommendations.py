@@ -0,0 +1,48 @@
+"""
+Django command to build the product recommendations.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.recommendations import METRICS, build_recommendations
+
+
+class Command(BaseCommand):
+    """Django command to build the "customers also bought" tables."""
+    help = (
+        'Compute the products most often bought together from the orders '
+        'and store the best ones of each product.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metric', choices=METRICS, default='cosine')
+        parser.add_argument(
+            '--top-k', type=int, default=None,
+            help='Recommendations kept per product.',
+        )
+        parser.add_argument(
+            '--min-count', type=int, default=1,
+            help='Orders a pair of products must share to be recommended.',
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only update the products touched by orders placed since '
+                 'the last build.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        start = time.monotonic()
+        build = build_recommendations(
+            metric=options['metric'],
+            k=options['top_k'],
+            incremental=options['incremental'],
+            min_count=options['min_count'],
+        )
+        kind = 'incremental' if build.incremental else 'full'
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated the recommendations of {build.products_updated} '
+            f'products ({kind} {build.metric} build) in '
+            f'{time.monotonic() - start:.1f}s.'
+        ))
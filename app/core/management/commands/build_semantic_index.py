@@ -0,0 +1,32 @@
+"""
+Django command to build the semantic product search index.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.semantic import build_index
+
+
+class Command(BaseCommand):
+    """Django command to embed the catalog and cluster its vectors."""
+    help = (
+        'Embed every product and write a new semantic search index, '
+        'which the running servers switch to.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clusters', type=int, default=None,
+            help='IVF clusters, the square root of the products by default.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        start = time.monotonic()
+        count = build_index(n_clusters=options['clusters'],
+                            chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} products in {time.monotonic() - start:.1f}s.'
+        ))
@@ -0,0 +1,56 @@
+"""
+Django command to delete stored images no product uses anymore.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.models import ImageAsset
+from shop.storage import get_image_storage
+
+
+class Command(BaseCommand):
+    """Django command to garbage collect unreferenced image assets."""
+    help = (
+        'Delete the image assets no product references anymore, along '
+        'with their files in the image storage.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=24,
+            help='Only collect assets created at least this many hours ago.',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        created_before = timezone.now() - timedelta(hours=options['min_age'])
+        unreferenced = ImageAsset.objects.filter(
+            products__isnull=True, created_at__lt=created_before
+        )
+        storage = get_image_storage()
+        collected = 0
+        for asset in unreferenced.iterator():
+            if options['dry_run']:
+                self.stdout.write(f'Would delete {asset.digest}')
+                collected += 1
+                continue
+            try:
+                with transaction.atomic():
+                    # A product may have started using it since.
+                    deleted, _ = ImageAsset.objects.filter(
+                        id=asset.id, products__isnull=True
+                    ).delete()
+            except IntegrityError:
+                continue
+            if deleted:
+                for name in asset.names:
+                    storage.delete(name)
+                collected += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Collected {collected} unreferenced image assets.'
+        ))
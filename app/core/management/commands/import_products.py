@@ -0,0 +1,245 @@
+"""
+Django command to bulk import products from a CSV or NDJSON file.
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Category, Product
+from shop.cache import invalidate
+from shop.semantic import schedule_upsert
+
+
+def read_csv(stream):
+    """Yield the rows of a CSV stream as dicts."""
+    yield from csv.DictReader(stream)
+
+
+def read_ndjson(stream):
+    """Yield the rows of a newline delimited JSON stream.
+
+    Lines that are not valid JSON are yielded as their error, so that
+    they are reported and skipped like any other invalid row.
+    """
+    for line in stream:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                yield error
+
+
+READERS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+}
+
+
+def copy_text(value):
+    """Format a value for PostgreSQL's COPY text format."""
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def positive_int(value):
+    """Parse a command line integer, refusing values below 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, not {number}')
+    return number
+
+
+def clean_field(name, value, model=Product):
+    """Return `value` converted and validated by the model field."""
+    field = model._meta.get_field(name)
+    if isinstance(value, float):
+        # Through str, not to get the float's binary approximation.
+        value = str(value)
+    try:
+        return field.clean(value, None)
+    except ValidationError as error:
+        label = name
+        if model is not Product:
+            label = f'{model._meta.model_name} {name}'
+        raise ValueError(f'{label}: {" ".join(error.messages)}')
+
+
+class Command(BaseCommand):
+    """Django command to bulk import products."""
+    help = 'Import products from a CSV or NDJSON file ("-" for stdin).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=READERS, dest='file_format',
+            help='Input format, guessed from the file extension by default.',
+        )
+        parser.add_argument(
+            '--owner', required=True,
+            help='Email of the user the imported products belong to.',
+        )
+        parser.add_argument('--batch-size', type=positive_int, default=5000)
+        parser.add_argument(
+            '--create-categories', action='store_true',
+            help='Create categories that do not exist yet.',
+        )
+        parser.add_argument(
+            '--copy', action='store_true',
+            help=(
+                'Write batches with PostgreSQL COPY instead of INSERT. '
+                'The products are not added to the semantic search index.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        path = options['path']
+        file_format = options['file_format'] or (
+            'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+        )
+        try:
+            self.owner = get_user_model().objects.get(email=options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["owner"]}.')
+
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.category_ids = set(self.categories.values())
+        self.create_categories = options['create_categories']
+        self.copy = options['copy']
+        self.write = self.copy_batch if self.copy else self.insert_batch
+        self.imported = self.skipped = 0
+        self.verbosity = options['verbosity']
+
+        start = time.monotonic()
+        if path == '-':
+            self.import_rows(READERS[file_format](sys.stdin),
+                             options['batch_size'])
+        else:
+            with open(path, newline='', encoding='utf-8') as stream:
+                self.import_rows(READERS[file_format](stream),
+                                 options['batch_size'])
+        elapsed = time.monotonic() - start
+
+        rate = self.imported / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.imported} products in {elapsed:.2f}s '
+            f'({rate:.0f} rows/sec), skipped {self.skipped}.'
+        ))
+        if self.copy and self.imported:
+            self.stdout.write(
+                'COPY does not return the ids of the products, run '
+                'build_semantic_index for them to show in semantic search.'
+            )
+
+    def import_rows(self, rows, batch_size):
+        """Build products from `rows` and write them in batches."""
+        products = (
+            product for product in (
+                self.build_product(line, row)
+                for line, row in enumerate(rows, start=1)
+            )
+            if product is not None
+        )
+        while True:
+            batch = list(islice(products, batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                self.write(batch)
+                invalidate(Product)
+                if not self.copy:
+                    schedule_upsert(product.id for product in batch)
+            self.imported += len(batch)
+            if self.verbosity > 1:
+                self.stdout.write(f'{self.imported} products imported...')
+
+    def build_product(self, line, row):
+        """Return an unsaved Product for `row`, or None if it is invalid.
+
+        Values are checked against the model fields here, as a single
+        value the database rejects would fail its whole batch.
+        """
+        try:
+            if isinstance(row, Exception):
+                raise row
+            if not isinstance(row, dict):
+                raise ValueError(f'not an object: {row!r}')
+            return Product(
+                user=self.owner,
+                category_id=self.category_id(row),
+                name=clean_field('name', row.get('name')),
+                description=clean_field('description',
+                                        row.get('description') or ''),
+                price=clean_field('price', row.get('price')),
+                stock=clean_field('stock', row.get('stock') or 0),
+            )
+        except (KeyError, TypeError, ValueError) as error:
+            self.stderr.write(f'Skipping line {line}: {error!r}')
+            self.skipped += 1
+            return None
+
+    def category_id(self, row):
+        """Resolve the category of `row` to an id without a query."""
+        if row.get('category_id'):
+            try:
+                category_id = int(str(row['category_id']))
+            except ValueError:
+                raise ValueError(
+                    f'invalid category id {row["category_id"]!r}'
+                ) from None
+            if category_id not in self.category_ids:
+                raise ValueError(f'unknown category id {category_id}')
+            return category_id
+        name = clean_field('name', row.get('category'), model=Category)
+        if name not in self.categories:
+            if not self.create_categories:
+                raise ValueError(f'unknown category {name!r}')
+            self.categories[name] = Category.objects.create(name=name).id
+            self.category_ids.add(self.categories[name])
+        return self.categories[name]
+
+    def insert_batch(self, products):
+        """Write `products` with a single multi-row INSERT."""
+        Product.objects.bulk_create(products)
+
+    def copy_batch(self, products):
+        """Write `products` with PostgreSQL's COPY FROM STDIN."""
+        fields = [
+            field for field in Product._meta.concrete_fields
+            if not field.primary_key
+        ]
+        buffer = io.StringIO()
+        for product in products:
+            buffer.write('\t'.join(
+                copy_text(field.get_db_prep_save(
+                    field.pre_save(product, add=True), connection
+                ))
+                for field in fields
+            ))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in fields
+        )
+        table = connection.ops.quote_name(Product._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {table} ({columns}) FROM STDIN', buffer
+            )
@@ -0,0 +1,54 @@
+"""
+Django command to upload the product images waiting in the job queue.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ImageUploadJob
+from shop.images import run_job
+
+
+class Command(BaseCommand):
+    """Django command to run pending image upload jobs."""
+    help = (
+        'Upload staged product images whose job is pending, for instance '
+        'after a restart interrupted the background workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Run failed jobs again.',
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Seconds after which a running job is considered lost.',
+        )
+        parser.add_argument('--limit', type=int, default=None)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        stale = timezone.now() - timedelta(seconds=options['stale_after'])
+        ImageUploadJob.objects.filter(
+            status=ImageUploadJob.RUNNING, updated_at__lt=stale
+        ).update(status=ImageUploadJob.PENDING)
+        if options['retry_failed']:
+            ImageUploadJob.objects.filter(
+                status=ImageUploadJob.FAILED
+            ).update(status=ImageUploadJob.PENDING)
+
+        job_ids = ImageUploadJob.objects.filter(
+            status=ImageUploadJob.PENDING
+        ).order_by('created_at').values_list('id', flat=True)
+        job_ids = list(job_ids[:options['limit']])
+        for job_id in job_ids:
+            run_job(job_id)
+
+        failed = ImageUploadJob.objects.filter(
+            id__in=job_ids, status=ImageUploadJob.FAILED
+        ).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ran {len(job_ids)} image uploads, {failed} failed.'
+        ))
@@ -0,0 +1,67 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:38
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_TRIGGER_SQL = """
+CREATE FUNCTION core_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_product_search_vector_trigger
+BEFORE INSERT OR UPDATE OF name, description ON core_product
+FOR EACH ROW EXECUTE FUNCTION core_product_search_vector_update();
+
+UPDATE core_product SET name = name;
+"""
+
+DROP_SEARCH_TRIGGER_SQL = """
+DROP TRIGGER core_product_search_vector_trigger ON core_product;
+DROP FUNCTION core_product_search_vector_update();
+"""
+
+
+def create_trigram_index(apps, schema_editor):
+    """Index product names for typo tolerant search, if pg_trgm exists."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX product_name_trgm_idx ON core_product '
+        'USING gin (name gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS product_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_category_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.RunSQL(SEARCH_TRIGGER_SQL, DROP_SEARCH_TRIGGER_SQL),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:43
+
+from django.db import migrations, models
+
+
+def merge_duplicate_items(apps, schema_editor):
+    """Fold duplicate cart lines for a product into the oldest one."""
+    CartItem = apps.get_model('core', 'CartItem')
+    kept = {}
+    for item in CartItem.objects.order_by('id'):
+        key = (item.cart_id, item.product_id)
+        if key not in kept:
+            kept[key] = item
+            continue
+        kept[key].quantity += item.quantity
+        kept[key].save(update_fields=['quantity'])
+        item.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_product_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='cart_item_unique_product'),
+        ),
+    ]
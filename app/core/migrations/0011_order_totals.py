@@ -0,0 +1,55 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:45
+
+from django.db import migrations, models
+
+# Past orders are snapshotted with the current product prices and names,
+# the closest to what was ordered that is still known.
+BACKFILL_SQL = """
+UPDATE core_orderitem AS item
+SET unit_price = product.price, product_name = product.name
+FROM core_product AS product
+WHERE product.id = item.product_id;
+
+UPDATE core_order AS o
+SET total_amount = totals.total_amount, item_count = totals.item_count
+FROM (
+    SELECT order_id,
+           SUM(quantity * unit_price) AS total_amount,
+           SUM(quantity) AS item_count
+    FROM core_orderitem
+    GROUP BY order_id
+) AS totals
+WHERE totals.order_id = o.id;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_cart_item_unique_product'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(default='', max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_image_upload_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_thumbnail',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_webp',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+    ]
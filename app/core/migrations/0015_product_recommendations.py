@@ -0,0 +1,40 @@
+# Generated by Django 4.0.10 on 2026-10-18 04:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_image_asset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationBuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=10)),
+                ('top_k', models.PositiveSmallIntegerField()),
+                ('last_order_item_id', models.BigIntegerField()),
+                ('products_updated', models.PositiveIntegerField()),
+                ('incremental', models.BooleanField(default=False)),
+                ('built_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='core.product')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_in', to='core.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='productrecommendation',
+            constraint=models.UniqueConstraint(fields=('product', 'rank'), name='recommendation_unique_rank'),
+        ),
+    ]
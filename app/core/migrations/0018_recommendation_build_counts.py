@@ -0,0 +1,28 @@
+# Generated by Django 4.0.10 on 2026-10-18 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_product_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recommendationbuild',
+            name='min_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='recommendationbuild',
+            name='order_count',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='recommendationbuild',
+            name='order_item_count',
+            field=models.PositiveIntegerField(null=True),
+        ),
+    ]
@@ -2,6 +2,8 @@
 Database models.
 """
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -46,15 +48,48 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class RefreshToken(models.Model):
+    """A refresh token, stored hashed and exchanged at most once."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE,
+                             related_name='refresh_tokens')
+    key_hash = models.CharField(max_length=64, unique=True)
+    # Tokens rotated from one another share a family, revoked at once
+    # when a token already exchanged is presented again.
+    family = models.UUIDField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    used_at = models.DateTimeField(null=True, blank=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.user_id}:{self.family}'
+
+
 class Category(models.Model):
     """Model representing a category."""
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 
+class ImageAsset(models.Model):
+    """Stored variants of an image, shared by all uploads of its content."""
+    digest = models.CharField(max_length=64, unique=True)
+    image_url = models.CharField(max_length=500)
+    thumbnail_url = models.CharField(max_length=500)
+    webp_url = models.CharField(max_length=500)
+    # Names of the variants in the image storage.
+    names = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.digest
+
+
 class Product(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -71,17 +106,135 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField()
     image = CloudinaryField('image', blank=True, null=True)
+    # Smaller variants of the image, generated when it is uploaded.
+    image_thumbnail = models.CharField(max_length=500, blank=True)
+    image_webp = models.CharField(max_length=500, blank=True)
+    image_asset = models.ForeignKey(ImageAsset, on_delete=models.SET_NULL,
+                                    null=True, blank=True,
+                                    related_name='products')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Maintained by a database trigger from the name and description.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'],
+                     name='product_search_vector_idx'),
+            models.Index(fields=['category', 'price', 'id'],
+                         name='product_category_price_idx'),
+            models.Index(fields=['category', 'id'],
+                         name='product_category_id_idx'),
+            models.Index(fields=['user', 'id'],
+                         name='product_user_id_idx'),
+            models.Index(fields=['price', 'id'],
+                         name='product_price_idx'),
+            models.Index(fields=['name', 'id'],
+                         name='product_name_idx'),
+            models.Index(fields=['stock', 'id'],
+                         name='product_stock_idx'),
+            models.Index(fields=['id'], condition=models.Q(stock__gt=0),
+                         name='product_in_stock_idx'),
+            models.Index(fields=['category', 'id'],
+                         condition=models.Q(stock__gt=0),
+                         name='product_category_in_stock_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class ImageUploadJob(models.Model):
+    """An image staged on disk, waiting to be uploaded for a product."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='image_jobs')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=PENDING)
+    staged_path = models.CharField(max_length=500, blank=True)
+    digest = models.CharField(max_length=64, blank=True)
+    image_url = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'],
+                         name='image_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Image upload {self.id} of {self.product_id} ({self.status})"
+
+
+class ProductRecommendation(models.Model):
+    """A product bought together with another, best ones ranked first."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                related_name='recommendations')
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE,
+                                    related_name='recommended_in')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'],
+                                    name='recommendation_unique_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.recommended_id} for {self.product_id} ({self.rank})"
+
+
+class RecommendationBuild(models.Model):
+    """A build of the recommendations, up to the order items it saw."""
+    metric = models.CharField(max_length=10)
+    top_k = models.PositiveSmallIntegerField()
+    last_order_item_id = models.BigIntegerField()
+    min_count = models.PositiveIntegerField(default=1)
+    # Orders with items and order items seen, which tell whether any
+    # were deleted since. Null for builds recorded before they were.
+    order_count = models.PositiveIntegerField(null=True)
+    order_item_count = models.PositiveIntegerField(null=True)
+    products_updated = models.PositiveIntegerField()
+    incremental = models.BooleanField(default=False)
+    built_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.metric} build up to item {self.last_order_item_id}"
+
+
 class Order(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
     products = models.ManyToManyField(Product, through='OrderItem')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Written at checkout so that listing orders needs no join.
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2,
+                                       default=0)
+    item_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'],
+                         name='order_created_idx'),
+            models.Index(fields=['user', '-created_at', '-id'],
+                         name='order_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user}'s Order on {self.created_at.strftime('%Y-%m-%d')}"
@@ -91,9 +244,19 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Snapshots of the product when ordered, unaffected by later edits.
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    product_name = models.CharField(max_length=255)
+
+    def save(self, *args, **kwargs):
+        if self.unit_price is None:
+            self.unit_price = self.product.price
+        if not self.product_name:
+            self.product_name = self.product.name
+        super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.quantity} of {self.product.name}"
+        return f"{self.quantity} of {self.product_name}"
 
 
 class Cart(models.Model):
@@ -112,5 +275,11 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'],
+                                    name='cart_item_unique_product'),
+        ]
+
     def __str__(self):
         return f"{self.quantity} x {self.product.name} in cart"
@@ -1,11 +1,19 @@
 """
 Tests for the Django admin modifications.
 """
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import Client
 
+from core.models import Category, ImageUploadJob, Product
+
 
 class AdminSiteTests(TestCase):
     """Tests for Django Admin."""
@@ -45,3 +53,48 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_product_list_shows_thumbnails(self):
+        """Test the product list previews thumbnails, not full images."""
+        Product.objects.create(
+            user=self.user, category=Category.objects.create(name='Books'),
+            name='Novel', price=Decimal('12.00'), stock=3,
+            image='https://example.com/novel.jpg',
+            image_thumbnail='https://example.com/novel_thumb.jpg',
+        )
+
+        res = self.client.get(reverse('admin:core_product_changelist'))
+
+        self.assertContains(res, 'https://example.com/novel_thumb.jpg')
+
+    def test_product_image_upload(self):
+        """Test images uploaded from the admin are processed."""
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        category = Category.objects.create(name='Books')
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600), 'green').save(buffer, format='JPEG')
+        payload = {
+            'name': 'Novel',
+            'description': '',
+            'price': '12.00',
+            'stock': 3,
+            'category': category.id,
+            'user': self.user.id,
+            'upload': SimpleUploadedFile('novel.jpg', buffer.getvalue()),
+        }
+
+        with override_settings(SHOP_IMAGE_BACKEND='local',
+                               SHOP_IMAGE_WORKERS=0,
+                               SHOP_IMAGE_PROCESSES=0,
+                               SHOP_IMAGE_STAGING_DIR=f'{root}/staging',
+                               SHOP_IMAGE_LOCAL_DIR=f'{root}/images'), \
+                self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(reverse('admin:core_product_add'),
+                                   payload)
+
+        self.assertEqual(res.status_code, 302)
+        product = Product.objects.get(name='Novel')
+        self.assertEqual(product.image_jobs.get().status,
+                         ImageUploadJob.DONE)
+        self.assertTrue(product.image_thumbnail)
@@ -1,13 +1,25 @@
 """
 Test custom Django management commands
 """
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.models import Category, ImageAsset, Product
+from shop.storage import get_image_storage
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -32,3 +44,257 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class ImportProductsCommandTests(TestCase):
+    """Test the import_products command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='seller@example.com',
+            password='testpass123',
+        )
+        self.category = Category.objects.create(name='Electronics')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_file(self, name, content):
+        """Write `content` to a temporary file and return its path."""
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        return path
+
+    def import_products(self, path, *args):
+        """Run the command and return its output."""
+        out, err = StringIO(), StringIO()
+        call_command('import_products', path, '--owner', self.user.email,
+                     *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv(self):
+        """Test importing products from a CSV file."""
+        path = self.write_file('products.csv', (
+            'name,description,price,stock,category\n'
+            'Laptop,"Fast, light",999.99,5,Electronics\n'
+            'Phone,,499.00,10,Electronics\n'
+        ))
+
+        out, _ = self.import_products(path)
+
+        self.assertIn('Imported 2 products', out)
+        self.assertIn('rows/sec', out)
+        laptop = Product.objects.get(name='Laptop')
+        self.assertEqual(laptop.description, 'Fast, light')
+        self.assertEqual(laptop.price, Decimal('999.99'))
+        self.assertEqual(laptop.category, self.category)
+        self.assertEqual(laptop.user, self.user)
+
+    def test_import_ndjson_with_copy(self):
+        """Test importing NDJSON through PostgreSQL COPY."""
+        path = self.write_file('products.ndjson', (
+            '{"name": "Tab\\there", "price": "1.50", "stock": 3, '
+            f'"category_id": {self.category.id}}}\n'
+            '{"name": "Back\\\\slash", "description": "two\\nlines", '
+            '"price": 2, "category": "Electronics"}\n'
+        ))
+
+        self.import_products(path, '--copy', '--batch-size', '1')
+
+        self.assertEqual(Product.objects.count(), 2)
+        tab = Product.objects.get(name='Tab\there')
+        self.assertEqual(tab.stock, 3)
+        self.assertIsNone(tab.image)
+        slash = Product.objects.get(name='Back\\slash')
+        self.assertEqual(slash.description, 'two\nlines')
+
+    def test_import_in_batches(self):
+        """Test products are written one batch at a time."""
+        lines = ''.join(
+            f'Product {i},1.00,1,Electronics\n' for i in range(10)
+        )
+        path = self.write_file('products.csv',
+                               'name,price,stock,category\n' + lines)
+
+        # Owner and categories lookups, then a savepoint, an insert
+        # and a release for each of the 4 batches.
+        with self.assertNumQueries(2 + 4 * 3):
+            self.import_products(path, '--batch-size', '3')
+
+        self.assertEqual(Product.objects.count(), 10)
+
+    def test_invalid_rows_are_skipped(self):
+        """Test rows that cannot be imported are reported and skipped."""
+        path = self.write_file('products.csv', (
+            'name,price,stock,category\n'
+            'Good,1.00,1,Electronics\n'
+            'Bad price,abc,1,Electronics\n'
+            'Negative,1.00,-1,Electronics\n'
+            'Unknown,1.00,1,Garden\n'
+        ))
+
+        out, err = self.import_products(path)
+
+        self.assertIn('Imported 1 products', out)
+        self.assertIn('skipped 3', out)
+        self.assertIn('line 4', err)
+        self.assertEqual(Product.objects.get().name, 'Good')
+
+    def test_malformed_ndjson_rows_are_skipped(self):
+        """Test NDJSON lines that are not product objects are skipped."""
+        path = self.write_file('products.ndjson', (
+            '{"name": "Good", "price": "1.00", "category": "Electronics"}\n'
+            '{"name": "Truncated", "price": \n'
+            '["not", "an", "object"]\n'
+            '{"name": "After", "price": 2, "category": "Electronics"}\n'
+        ))
+
+        out, err = self.import_products(path)
+
+        self.assertIn('Imported 2 products', out)
+        self.assertIn('skipped 2', out)
+        self.assertIn('line 2', err)
+        self.assertIn('line 3', err)
+
+    def test_missing_columns_are_skipped(self):
+        """Test CSV rows missing a required column are skipped."""
+        path = self.write_file('products.csv', (
+            'price,category,name\n'
+            '1.00,Electronics,Good\n'
+            '1.00,Electronics\n'
+            '1.00\n'
+        ))
+
+        out, err = self.import_products(path, '--create-categories')
+
+        self.assertIn('skipped 2', out)
+        self.assertIn("line 2: ValueError('name:", err)
+        self.assertIn("line 3: ValueError('category name:", err)
+        self.assertEqual(Product.objects.get().name, 'Good')
+
+    def test_values_the_database_rejects_are_skipped(self):
+        """Test values that do not fit the columns are skipped first."""
+        path = self.write_file('products.csv', (
+            'name,price,stock,category\n'
+            'Good,1.00,1,Electronics\n'
+            'Too expensive,100000000.00,1,Electronics\n'
+            'Not a number,NaN,1,Electronics\n'
+            'Too precise,1.001,1,Electronics\n'
+            f'{"x" * 256},1.00,1,Electronics\n'
+            'Too many,1.00,3000000000,Electronics\n'
+            f'Long category,1.00,1,{"x" * 101}\n'
+        ))
+
+        for args in [(), ('--copy',)]:
+            with self.subTest(args=args):
+                out, err = self.import_products(
+                    path, '--create-categories', *args
+                )
+
+                self.assertIn('Imported 1 products', out)
+                self.assertIn('skipped 6', out)
+                for line in range(2, 8):
+                    self.assertIn(f'line {line}', err)
+        self.assertEqual(Product.objects.filter(name='Good').count(), 2)
+
+    def test_invalid_category_id_is_skipped(self):
+        """Test category ids that are not integers are reported."""
+        category = self.category.id
+        path = self.write_file('products.ndjson', (
+            f'{{"name": "Good", "price": 1, "category_id": {category}}}\n'
+            f'{{"name": "A", "price": 1, "category_id": "{category}.0"}}\n'
+            f'{{"name": "B", "price": 1, "category_id": {category}.5}}\n'
+        ))
+
+        out, err = self.import_products(path)
+
+        self.assertIn('Imported 1 products', out)
+        self.assertIn('skipped 2', out)
+        self.assertIn('invalid category id', err)
+
+    def test_batch_size_must_be_positive(self):
+        """Test batch sizes below 1 are refused."""
+        path = self.write_file('products.csv', 'name,price\n')
+
+        for size in ['0', '-5']:
+            with self.subTest(size=size), self.assertRaises(CommandError):
+                self.import_products(path, '--batch-size', size)
+
+    def test_create_missing_categories(self):
+        """Test missing categories are created on demand."""
+        path = self.write_file('products.csv', (
+            'name,price,stock,category\n'
+            'Shovel,20.00,1,Garden\n'
+            'Rake,15.00,1,Garden\n'
+        ))
+
+        self.import_products(path, '--create-categories')
+
+        garden = Category.objects.get(name='Garden')
+        self.assertEqual(garden.products.count(), 2)
+
+    def test_unknown_owner(self):
+        """Test importing for a user that does not exist fails."""
+        path = self.write_file('products.csv', 'name,price\n')
+
+        with self.assertRaises(CommandError):
+            call_command('import_products', path,
+                         '--owner', 'nobody@example.com')
+
+
+@override_settings(SHOP_IMAGE_BACKEND='memory')
+class GcImageAssetsCommandTests(TestCase):
+    """Test garbage collecting image assets."""
+
+    def setUp(self):
+        self.storage = get_image_storage()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.category = Category.objects.create(name='Books')
+
+    def create_asset(self, digest, age_hours=48):
+        """Create and return an asset whose file is in the storage."""
+        name = self.storage.save(f'{digest}.jpg', ContentFile(b'image'))
+        asset = ImageAsset.objects.create(
+            digest=digest, image_url=self.storage.url(name),
+            thumbnail_url='', webp_url='', names=[name],
+        )
+        ImageAsset.objects.filter(id=asset.id).update(
+            created_at=timezone.now() - timedelta(hours=age_hours)
+        )
+        return asset
+
+    def test_collects_unreferenced_assets(self):
+        """Test only assets without products are deleted."""
+        used = self.create_asset('a' * 64)
+        unused = self.create_asset('b' * 64)
+        Product.objects.create(
+            user=self.user, category=self.category, name='Novel',
+            price=Decimal('12.00'), stock=3, image_asset=used,
+        )
+
+        call_command('gc_image_assets', stdout=StringIO())
+
+        self.assertEqual(list(ImageAsset.objects.all()), [used])
+        self.assertTrue(self.storage.exists(used.names[0]))
+        self.assertFalse(self.storage.exists(unused.names[0]))
+
+    def test_keeps_recent_assets(self):
+        """Test assets younger than --min-age are kept."""
+        self.create_asset('c' * 64, age_hours=1)
+
+        call_command('gc_image_assets', '--min-age', '24', stdout=StringIO())
+
+        self.assertEqual(ImageAsset.objects.count(), 1)
+
+    def test_dry_run(self):
+        """Test a dry run deletes nothing."""
+        asset = self.create_asset('d' * 64)
+
+        out = StringIO()
+        call_command('gc_image_assets', '--dry-run', stdout=out)
+
+        self.assertIn(asset.digest, out.getvalue())
+        self.assertTrue(ImageAsset.objects.exists())
+        self.assertTrue(self.storage.exists(asset.names[0]))
@@ -0,0 +1,94 @@
+"""
+Tests for the database connection health checks and production settings.
+"""
+import importlib
+import os
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+
+from core.db import check_connections
+
+
+class CheckConnectionsTests(TestCase):
+    """Test checking persistent connections between requests."""
+
+    def test_broken_connection_closed(self):
+        """Test a connection that no longer answers is closed."""
+        connection.ensure_connection()
+
+        with mock.patch.object(connection, 'is_usable', return_value=False), \
+                mock.patch.object(connection, 'close') as close:
+            check_connections()
+
+        close.assert_called_once()
+
+    def test_working_connection_kept(self):
+        """Test a working connection is left open."""
+        connection.ensure_connection()
+
+        with mock.patch.object(connection, 'close') as close:
+            check_connections()
+
+        close.assert_not_called()
+
+
+class ProductionSettingsTests(TestCase):
+    """Test the production settings module."""
+
+    @mock.patch.dict(os.environ, {
+        'DJANGO_SECRET_KEY': 'secret',
+        'REDIS_URL': 'redis://redis:6379/0',
+        'DJANGO_ALLOWED_HOSTS': 'shop.example.com,api.example.com',
+        'DB_CONN_MAX_AGE': '120',
+        'DB_POOLER': 'pgbouncer',
+    })
+    def test_production_settings(self):
+        """Test debug is off and connections are persistent."""
+        from app import settings as base
+        production = importlib.reload(
+            importlib.import_module('app.settings_production')
+        )
+
+        self.assertFalse(production.DEBUG)
+        self.assertEqual(production.ALLOWED_HOSTS,
+                         ['shop.example.com', 'api.example.com'])
+        self.assertTrue(production.SHOP_DB_HEALTH_CHECKS)
+        default = production.DATABASES['default']
+        self.assertEqual(default['CONN_MAX_AGE'], 120)
+        self.assertTrue(default['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertEqual(
+            production.LOGGING['loggers']['django.db.backends']['level'],
+            'WARNING',
+        )
+        self.assertEqual(production.CACHES['default']['LOCATION'],
+                         'redis://redis:6379/0')
+        self.assertEqual(production.SHOP_AUTH_CACHE, 'shared')
+        # The base settings are left alone.
+        self.assertNotIn('DISABLE_SERVER_SIDE_CURSORS',
+                         base.DATABASES['default'])
+
+    @mock.patch.dict(os.environ, {
+        'DJANGO_SECRET_KEY': 'secret',
+        'REDIS_URL': 'redis://redis:6379/0',
+        'DB_CONN_MAX_AGE': '120',
+        'SHOP_SERVER_MODE': 'asgi',
+    })
+    def test_asgi_closes_connections(self):
+        """Test connections are not kept across requests under ASGI."""
+        production = importlib.reload(
+            importlib.import_module('app.settings_production')
+        )
+
+        self.assertEqual(production.DATABASES['default']['CONN_MAX_AGE'], 0)
+
+    @mock.patch.dict(os.environ, {'DJANGO_SECRET_KEY': 'secret'})
+    def test_redis_required(self):
+        """Test the production settings refuse to load without Redis."""
+        os.environ.pop('REDIS_URL', None)
+
+        with self.assertRaises(KeyError):
+            importlib.reload(
+                importlib.import_module('app.settings_production')
+            )
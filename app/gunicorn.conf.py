@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration of the production server.
+
+SHOP_SERVER_WORKERS processes (2 per CPU plus one by default) each serve
+SHOP_SERVER_THREADS requests at a time, with a database connection per
+thread. SHOP_SERVER_MODE=asgi runs the ASGI application on uvicorn
+workers instead, for the async views: those ignore SHOP_SERVER_THREADS,
+and open a database connection per request running sync code.
+"""
+import multiprocessing
+import os
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '8000')
+
+workers = int(os.environ.get(
+    'SHOP_SERVER_WORKERS', multiprocessing.cpu_count() * 2 + 1
+))
+threads = int(os.environ.get('SHOP_SERVER_THREADS', 4))
+
+if os.environ.get('SHOP_SERVER_MODE') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'app.asgi:application'
+else:
+    worker_class = 'gthread'
+    wsgi_app = 'app.wsgi:application'
+
+# Restart workers now and then, at different times, to bound leaks.
+max_requests = int(os.environ.get('SHOP_SERVER_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('SHOP_SERVER_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = 5
+
+accesslog = '-'
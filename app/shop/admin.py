@@ -0,0 +1,36 @@
+"""
+Django admin customization of the shop app.
+"""
+from django import forms
+from django.contrib import admin
+
+from core import admin as core_admin
+from core.models import ImageUploadJob, Product
+from .images import submit_image
+
+
+class ProductAdminForm(forms.ModelForm):
+    # Images are processed and uploaded in the background, see images.py
+    upload = forms.ImageField(label='Image', required=False)
+
+    class Meta:
+        model = Product
+        fields = '__all__'
+
+
+class ProductAdmin(core_admin.ProductAdmin):
+    """Product admin uploading images through the shop image pipeline."""
+    form = ProductAdminForm
+    fields = core_admin.ProductAdmin.fields + ('upload',)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        upload = form.cleaned_data.get('upload')
+        if upload:
+            job = submit_image(obj, request.user, upload)
+            if job.status != ImageUploadJob.DONE:
+                self.message_user(request, 'The image is being processed.')
+
+
+admin.site.unregister(Product)
+admin.site.register(Product, ProductAdmin)
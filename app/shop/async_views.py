@@ -0,0 +1,52 @@
+"""
+Async views for the catalog read endpoints, served in ASGI mode.
+
+Django 4.0 has no async ORM and DRF no async views, so these wrap the
+regular DRF views: each request runs its view, queries and rendering
+in one sync_to_async call. Under ASGI that call gets a thread of its
+own, so the event loop keeps accepting and answering other requests
+while the database is queried, and a request makes a single trip
+between the loop and its thread.
+
+shop/urls.py swaps them in for the routes in ASYNC_ROUTES when
+SHOP_ASYNC_VIEWS is set.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.urls import URLPattern
+
+ASYNC_ROUTES = {
+    'category-list',
+    'product-list',
+    'product-detail',
+    'product-recommendations',
+}
+
+
+def async_view(view):
+    """Return an async view running the sync `view` in a thread."""
+    def respond(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            # Rendered here rather than by another trip to a thread.
+            response.render()
+        return response
+
+    run = sync_to_async(respond, thread_sensitive=True)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await run(request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_routes(patterns):
+    """Serve the patterns named in ASYNC_ROUTES by async views."""
+    return [
+        URLPattern(pattern.pattern, async_view(pattern.callback),
+                   pattern.default_args, pattern.name)
+        if pattern.name in ASYNC_ROUTES else pattern
+        for pattern in patterns
+    ]
@@ -0,0 +1,209 @@
+"""
+Bulk create, update and delete of products.
+
+Each operation validates the whole batch first, checks categories and
+ownership with one query, then writes everything in a single
+transaction. Nothing is written when any item fails, and the response
+lists the outcome of every item in the order it was sent.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from core.models import Category, Product
+from .cache import invalidate
+from .semantic import schedule_upsert
+from .serializers import ProductSerializer
+
+
+def check_batch(data, item_type=dict):
+    """Return an error message if `data` is not an acceptable batch."""
+    if not isinstance(data, list) or not data:
+        return 'Expected a non-empty list.'
+    if len(data) > settings.SHOP_BULK_MAX_ITEMS:
+        return f'Batches are limited to {settings.SHOP_BULK_MAX_ITEMS} items.'
+    if not all(isinstance(item, item_type) for item in data):
+        return f'Expected a list of {item_type.__name__} items.'
+    return None
+
+
+def existing_category_ids(items):
+    """Return the ids of the categories referenced by `items` that exist."""
+    category_ids = {
+        item['category_id'] for item in items if 'category_id' in item
+    }
+    if not category_ids:
+        return set()
+    return set(
+        Category.objects.filter(id__in=category_ids)
+        .values_list('id', flat=True)
+    )
+
+
+def owned_products(product_ids, user, lock=False):
+    """Fetch products by id, split into ({id: product}, forbidden ids).
+
+    With `lock`, the rows are locked in id order until the transaction
+    ends, as checkout locks them.
+    """
+    queryset = Product.objects.all()
+    if lock:
+        queryset = queryset.select_for_update().order_by('id')
+    products = queryset.in_bulk(product_ids)
+    forbidden = {
+        product_id for product_id, product in products.items()
+        if not user.is_superuser and product.user_id != user.id
+    }
+    return products, forbidden
+
+
+def failure(results):
+    """Return the status code of a batch in which some items failed."""
+    if any(result['status'] == 'forbidden' for result in results):
+        return status.HTTP_403_FORBIDDEN
+    return status.HTTP_400_BAD_REQUEST
+
+
+def bulk_create_products(data, user):
+    """Create the products in `data` for `user`."""
+    error = check_batch(data)
+    if error:
+        return status.HTTP_400_BAD_REQUEST, {'detail': error}
+
+    serializer = ProductSerializer(data=data, many=True)
+    if not serializer.is_valid():
+        return status.HTTP_400_BAD_REQUEST, [
+            {'index': index, 'status': 'error', 'errors': errors}
+            if errors else {'index': index, 'status': 'valid'}
+            for index, errors in enumerate(serializer.errors)
+        ]
+
+    items = serializer.validated_data
+    category_ids = existing_category_ids(items)
+    results = [
+        {'index': index, 'status': 'valid'}
+        if item.get('category_id') in category_ids else
+        {'index': index, 'status': 'error', 'errors': {
+            'category_id': ['A valid category is required.']
+        }}
+        for index, item in enumerate(items)
+    ]
+    if any(result['status'] != 'valid' for result in results):
+        return failure(results), results
+
+    with transaction.atomic():
+        products = Product.objects.bulk_create([
+            Product(user=user, **item) for item in items
+        ])
+        invalidate(Product)
+        schedule_upsert(product.id for product in products)
+    return status.HTTP_201_CREATED, [
+        {'index': index, 'status': 'created', 'id': product.id}
+        for index, product in enumerate(products)
+    ]
+
+
+def bulk_update_products(data, user):
+    """Apply the partial updates in `data`, each carrying a product id.
+
+    The products are locked while validated and written, and each one
+    only has the fields its item sent written, so that concurrent
+    changes to its other fields, such as stock taken by checkout, are
+    kept.
+    """
+    error = check_batch(data)
+    if error:
+        return status.HTTP_400_BAD_REQUEST, {'detail': error}
+    if not all(isinstance(item.get('id'), int) for item in data):
+        return status.HTTP_400_BAD_REQUEST, {
+            'detail': 'Every item needs an integer id.'
+        }
+
+    with transaction.atomic():
+        products, forbidden = owned_products(
+            [item['id'] for item in data], user, lock=True
+        )
+        results, updates = validate_updates(data, products, forbidden)
+        if any(result['status'] != 'valid' for result in results):
+            return failure(results), results
+
+        # One UPDATE per set of fields sent, leaving the others alone.
+        groups = {}
+        now = timezone.now()
+        for result, fields in updates:
+            product = products[result['id']]
+            for name, value in fields.items():
+                setattr(product, name, value)
+            product.updated_at = now
+            groups.setdefault(frozenset(fields), []).append(product)
+            result['status'] = 'updated'
+        for fields, group in groups.items():
+            if not fields:
+                continue
+            Product.objects.bulk_update(group, [*fields, 'updated_at'])
+            if fields & {'name', 'description'}:
+                schedule_upsert(product.id for product in group)
+        if any(groups):
+            invalidate(Product)
+    return status.HTTP_200_OK, results
+
+
+def validate_updates(data, products, forbidden):
+    """Validate each update, return the results and the valid fields."""
+    results, updates = [], []
+    for index, item in enumerate(data):
+        product_id = item['id']
+        result = {'index': index, 'id': product_id}
+        if product_id not in products:
+            result.update(status='error', errors={'id': ['Not found.']})
+        elif product_id in forbidden:
+            result.update(status='forbidden', errors={
+                'detail': 'Not authorized to update this product.'
+            })
+        else:
+            serializer = ProductSerializer(
+                products[product_id], data=item, partial=True
+            )
+            if serializer.is_valid():
+                result['status'] = 'valid'
+                updates.append((result, serializer.validated_data))
+            else:
+                result.update(status='error', errors=serializer.errors)
+        results.append(result)
+
+    category_ids = existing_category_ids(fields for _, fields in updates)
+    for result, fields in updates:
+        if 'category_id' in fields and (
+                fields['category_id'] not in category_ids):
+            result.update(status='error', errors={
+                'category_id': ['A valid category is required.']
+            })
+    return results, updates
+
+
+def bulk_delete_products(data, user):
+    """Delete the products whose ids are listed in `data`."""
+    error = check_batch(data, item_type=int)
+    if error:
+        return status.HTTP_400_BAD_REQUEST, {'detail': error}
+
+    products, forbidden = owned_products(data, user)
+
+    results = []
+    for index, product_id in enumerate(data):
+        result = {'index': index, 'id': product_id, 'status': 'valid'}
+        if product_id not in products:
+            result.update(status='error', errors={'id': ['Not found.']})
+        elif product_id in forbidden:
+            result.update(status='forbidden', errors={
+                'detail': 'Not authorized to delete this product.'
+            })
+        results.append(result)
+    if any(result['status'] != 'valid' for result in results):
+        return failure(results), results
+
+    with transaction.atomic():
+        Product.objects.filter(id__in=products).delete()
+    for result in results:
+        result['status'] = 'deleted'
+    return status.HTTP_200_OK, results
@@ -0,0 +1,154 @@
+"""
+Versioned read-through cache for the catalog endpoints.
+
+Responses are stored under keys that embed a version counter for each
+model they depend on. Saving or deleting a row bumps its model's
+counter, so stale entries are never read again and simply expire.
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+
+def version_key(model):
+    """Return the cache key holding the version counter of `model`."""
+    return f'shop:version:{model._meta.label_lower}'
+
+
+def get_versions(models):
+    """Return the current version counters of `models`."""
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock rather than 1, so that a counter
+            # evicted from the cache never goes back to a value used
+            # by entries that may still be cached.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bump(model):
+    try:
+        cache.incr(version_key(model))
+    except ValueError:
+        cache.add(version_key(model), time.time_ns(), timeout=None)
+
+
+def invalidate(model):
+    """Invalidate every cached response depending on `model`.
+
+    The version is bumped right away and again once the current
+    transaction commits, so a response computed from the old rows
+    between the two is not kept either.
+    """
+    _bump(model)
+    transaction.on_commit(lambda: _bump(model))
+
+
+def record(outcome):
+    """Count a cache hit or miss."""
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def stats():
+    """Return the hit and miss counters of this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def response_key(name, request, models):
+    """Return the cache key of the response to `request`."""
+    versions = '.'.join(str(version) for version in get_versions(models))
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'shop:response:{name}:{versions}:{path}'
+
+
+@contextmanager
+def _local_lock(key):
+    """Hold a lock shared by the threads of this process computing `key`."""
+    with _key_locks_guard:
+        lock, users = _key_locks.get(key, (threading.Lock(), 0))
+        _key_locks[key] = (lock, users + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _key_locks_guard:
+            lock, users = _key_locks.pop(key)
+            if users > 1:
+                _key_locks[key] = (lock, users - 1)
+
+
+def _wait_for(key, lock_key):
+    """Wait for another process computing `key`, return its result."""
+    deadline = time.monotonic() + settings.SHOP_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        data = cache.get(key)
+        if data is not None or cache.get(lock_key) is None:
+            return data
+    return None
+
+
+def compute_once(key, compute):
+    """Return `(data, hit)`, calling `compute` once for concurrent misses.
+
+    `compute` returns a Response; only successful responses are cached.
+    Threads of a process share a lock per key, and processes share a
+    lock stored in the cache with a timeout, so a popular entry is
+    recomputed once when it expires rather than by every request.
+    """
+    with _local_lock(key):
+        data = cache.get(key)
+        if data is not None:
+            return data, True
+
+        lock_key = f'{key}:lock'
+        locked = cache.add(lock_key, 1, settings.SHOP_CACHE_LOCK_TIMEOUT)
+        if not locked:
+            data = _wait_for(key, lock_key)
+            if data is not None:
+                return data, True
+        try:
+            response = compute()
+            if response.status_code != status.HTTP_200_OK:
+                return response, False
+            cache.set(key, response.data, settings.SHOP_CACHE_TIMEOUT)
+            return response.data, False
+        finally:
+            if locked:
+                cache.delete(lock_key)
+
+
+def cached_response(name, request, models, compute):
+    """Return the cached response to `request`, computing it on a miss.
+
+    `models` lists the models the response is built from and `compute`
+    builds the response when it is not cached.
+    """
+    key = response_key(name, request, models)
+    data = cache.get(key)
+    hit = data is not None
+    if not hit:
+        data, hit = compute_once(key, compute)
+    record('hits' if hit else 'misses')
+
+    response = data if isinstance(data, Response) else Response(data)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response
@@ -0,0 +1,128 @@
+"""
+Server-side shopping carts for the shop api.
+"""
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import ValidationError
+from core.models import Cart, CartItem, Order, Product
+from .checkout import MAX_QUANTITY, checkout, merge_line_items
+
+ADD_ITEMS_SQL = """
+INSERT INTO core_cartitem (cart_id, product_id, quantity)
+SELECT %s, item.product_id, item.quantity
+FROM unnest(%s::bigint[], %s::integer[]) AS item (product_id, quantity)
+ON CONFLICT (cart_id, product_id)
+DO UPDATE SET quantity = core_cartitem.quantity + EXCLUDED.quantity
+RETURNING product_id, quantity
+"""
+
+
+def get_cart(user):
+    """Return the cart of `user`, creating it on first use."""
+    return Cart.objects.get_or_create(user=user)[0]
+
+
+def cart_items(user):
+    """Return the items in the cart of `user` with their line totals."""
+    return CartItem.objects.filter(cart__user=user).select_related(
+        'product'
+    ).annotate(
+        line_total=F('quantity') * F('product__price'),
+    ).order_by('id')
+
+
+def check_products(product_ids):
+    """Raise a ValidationError unless every product exists."""
+    found = set(
+        Product.objects.filter(id__in=product_ids).values_list('id', flat=True)
+    )
+    missing = sorted(set(product_ids) - found)
+    if missing:
+        raise ValidationError({
+            'product_id': f'Product with id {missing[0]} does not exist.'
+        })
+
+
+def check_quantities(quantities):
+    """Raise a ValidationError if a product exceeds MAX_QUANTITY."""
+    for product_id, quantity in quantities.items():
+        if quantity > MAX_QUANTITY:
+            raise ValidationError({'quantity': (
+                f'At most {MAX_QUANTITY} items of product {product_id} '
+                'can be in the cart.'
+            )})
+
+
+@transaction.atomic
+def add_items(cart, items):
+    """Add `items` to `cart`, summing quantities of products already in it.
+
+    The whole batch is upserted with a single statement, so concurrent
+    additions to the same cart never lose a quantity. Sums above
+    MAX_QUANTITY are rolled back.
+    """
+    quantities = merge_line_items(items)
+    if not quantities:
+        return
+    check_quantities(quantities)
+    check_products(quantities)
+    with connection.cursor() as cursor:
+        cursor.execute(ADD_ITEMS_SQL, [
+            cart.id, list(quantities), list(quantities.values()),
+        ])
+        check_quantities(dict(cursor.fetchall()))
+
+
+def set_quantity(cart, product_id, quantity):
+    """Set the quantity of a product in `cart`, adding it if needed."""
+    check_products([product_id])
+    CartItem.objects.update_or_create(
+        cart=cart, product_id=product_id, defaults={'quantity': quantity},
+    )
+
+
+def remove_item(cart, product_id):
+    """Remove a product from `cart`, returning whether it was there."""
+    deleted, _ = CartItem.objects.filter(
+        cart=cart, product_id=product_id
+    ).delete()
+    return bool(deleted)
+
+
+def cart_summary(user):
+    """Return the line count, item count and total of the cart of `user`.
+
+    Computed by a single aggregate query, without loading any item.
+    """
+    return CartItem.objects.filter(cart__user=user).aggregate(
+        lines=Count('id'),
+        item_count=Coalesce(Sum('quantity'), 0),
+        total=Coalesce(
+            Sum(F('quantity') * F('product__price')),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+@transaction.atomic
+def checkout_cart(user):
+    """Turn the cart of `user` into an order and empty the cart.
+
+    The cart row is locked first so that two concurrent checkouts of
+    the same cart cannot both order its content.
+    """
+    cart = Cart.objects.select_for_update().filter(user=user).first()
+    items = list(
+        CartItem.objects.filter(cart=cart).values('product_id', 'quantity')
+    ) if cart else []
+    if not items:
+        raise ValidationError({'cart': 'The cart is empty.'})
+
+    order = Order.objects.create(user=user)
+    checkout(order, items)
+    CartItem.objects.filter(cart=cart).delete()
+    return order
@@ -0,0 +1,89 @@
+"""
+Checkout engine for the shop api.
+"""
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, When
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from core.models import OrderItem, Product
+from .cache import invalidate
+
+# Most items of one product a cart line or order line may hold, far
+# below the integer columns' range so sums of lines cannot overflow.
+MAX_QUANTITY = 10000
+
+
+def merge_line_items(items):
+    """Return a {product_id: quantity} mapping, summing duplicate lines."""
+    quantities = {}
+    for item in items:
+        product_id = item['product_id']
+        quantities[product_id] = (
+            quantities.get(product_id, 0) + item['quantity']
+        )
+    return quantities
+
+
+def lock_products(product_ids):
+    """Lock the given products and return them by id.
+
+    Only the columns checkout needs are loaded: stock, price and name.
+
+    Rows are locked in ascending id order so that concurrent checkouts
+    touching the same products always acquire their locks in the same
+    order and cannot deadlock.
+    """
+    return Product.objects.select_for_update().filter(
+        id__in=product_ids
+    ).order_by('id').only('id', 'stock', 'price', 'name').in_bulk()
+
+
+@transaction.atomic
+def checkout(order, items):
+    """Add `items` to `order`, taking them out of stock atomically.
+
+    Runs a fixed number of queries whatever the number of items: one
+    to lock the products, one to decrement their stock, one to insert
+    the order items and one to store the order totals.
+    """
+    quantities = merge_line_items(items)
+    products = lock_products(sorted(quantities))
+
+    for product_id, quantity in quantities.items():
+        if product_id not in products:
+            raise ValidationError({
+                'product_id': f'Product with id {product_id} does not exist.'
+            })
+        if quantity > products[product_id].stock:
+            raise ValidationError({
+                'quantity': (
+                    f'Insufficient stock for product ID {product_id}. '
+                    f'Available: {products[product_id].stock}, '
+                    f'requested: {quantity}.'
+                )
+            })
+
+    Product.objects.filter(id__in=quantities).update(stock=Case(
+        *[
+            When(id=product_id, then=F('stock') - quantity)
+            for product_id, quantity in quantities.items()
+        ],
+        output_field=PositiveIntegerField(),
+    ), updated_at=timezone.now())
+    invalidate(Product)
+
+    order_items = OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order, product_id=product_id, quantity=quantity,
+            unit_price=products[product_id].price,
+            product_name=products[product_id].name,
+        )
+        for product_id, quantity in quantities.items()
+    ])
+
+    order.total_amount += sum(
+        item.unit_price * item.quantity for item in order_items
+    )
+    order.item_count += sum(quantities.values())
+    order.save(update_fields=['total_amount', 'item_count', 'updated_at'])
+    return order_items
@@ -0,0 +1,93 @@
+"""
+Conditional GET support for the catalog list endpoints.
+
+A list is validated by the count and latest `updated_at` of its rows,
+and of the related rows it embeds, together with the time of the last
+deletion of any of those models. Deletions leave no row to take the
+maximum of, so post_delete records them in the cache (see signals.py).
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def deletion_key(model):
+    """Return the cache key holding the last deletion time of `model`."""
+    return f'shop:deleted:{model._meta.label_lower}'
+
+
+def record_deletion(model):
+    """Remember that a row of `model` was just deleted."""
+    cache.set(deletion_key(model), datetime.now(timezone.utc).timestamp(),
+              timeout=None)
+
+
+def last_deletion(models):
+    """Return when a row of `models` was last deleted, if known."""
+    stamps = cache.get_many([deletion_key(model) for model in models])
+    if not stamps:
+        return None
+    return datetime.fromtimestamp(max(stamps.values()), timezone.utc)
+
+
+def list_state(queryset, related=()):
+    """Return the (count, last modification) of `queryset` in one query.
+
+    `related` names foreign keys whose rows are embedded in the list,
+    and whose own `updated_at` counts as a modification of it.
+    """
+    stamps = {'updated_at': Max('updated_at')}
+    for name in related:
+        stamps[f'{name}_updated_at'] = Max(f'{name}__updated_at')
+    state = queryset.order_by().aggregate(count=Count('id'), **stamps)
+    modified = [state[name] for name in stamps if state[name] is not None]
+    return state['count'], max(modified, default=None)
+
+
+def list_etag(request, count, last_modified):
+    """Return a strong ETag for a list response.
+
+    The request path and the negotiated format are part of the tag, as
+    each page and each representation has its own body.
+    """
+    stamp = last_modified.isoformat() if last_modified else ''
+    renderer = getattr(request, 'accepted_renderer', None)
+    source = ':'.join([
+        str(count), stamp, request.get_full_path(),
+        renderer.format if renderer else '',
+    ])
+    return '"%s"' % hashlib.md5(source.encode()).hexdigest()
+
+
+def conditional_response(request, queryset, compute, related=()):
+    """Answer `request` with 304 when `queryset` has not changed.
+
+    Only a cheap aggregate is run to decide; `compute` builds the full
+    response otherwise.
+    """
+    models = [queryset.model] + [
+        queryset.model._meta.get_field(name).related_model
+        for name in related
+    ]
+    count, last_modified = list_state(queryset, related)
+    deleted = last_deletion(models)
+    if deleted is not None and (last_modified is None
+                                or deleted > last_modified):
+        last_modified = deleted
+    etag = list_etag(request, count, last_modified)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    if response is None:
+        response = compute()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+    return response
@@ -0,0 +1,75 @@
+"""
+Streaming export of the product catalog.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'price': 'price',
+    'stock': 'stock',
+    'category_id': 'category_id',
+    'category_name': 'category__name',
+    'user_id': 'user_id',
+    'image': 'image',
+}
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """File-like object returning what is written instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, chunk_size):
+    """Yield products as dicts, fetched through a server-side cursor."""
+    rows = queryset.order_by('id').values_list(*EXPORT_COLUMNS.values())
+    for row in rows.iterator(chunk_size=chunk_size):
+        product = dict(zip(EXPORT_COLUMNS, row))
+        product['image'] = str(product['image']) if product['image'] else ''
+        yield product
+
+
+def iter_chunks(rows, render, chunk_size):
+    """Render `rows` and yield them `chunk_size` lines at a time."""
+    chunk = []
+    for row in rows:
+        chunk.append(render(row))
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream_ndjson(queryset, chunk_size):
+    """Yield the products of `queryset` as newline delimited JSON."""
+    def render(row):
+        return json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+    return iter_chunks(iter_rows(queryset, chunk_size), render, chunk_size)
+
+
+def stream_csv(queryset, chunk_size):
+    """Yield the products of `queryset` as CSV, header first."""
+    writer = csv.DictWriter(Echo(), fieldnames=list(EXPORT_COLUMNS))
+    yield writer.writeheader()
+    yield from iter_chunks(
+        iter_rows(queryset, chunk_size), writer.writerow, chunk_size
+    )
+
+
+STREAMS = {
+    'ndjson': stream_ndjson,
+    'csv': stream_csv,
+}
@@ -0,0 +1,158 @@
+"""
+Personalized product feed for the shop api.
+
+Each user's order history is turned into candidate products, scored in
+one vectorized pass:
+
+- co-purchase: the recommendation scores (see recommendations.py) of
+  the products bought with the ones the user ordered, summed up;
+- category affinity: the share of the user's ordered quantities that
+  went to the candidate's category;
+- popularity: how often the candidate was ordered by anyone, on a log
+  scale.
+
+Products the user already ordered are left out. Users without orders
+get the most popular products. The best SHOP_FEED_SIZE candidates are
+cached per user for SHOP_FEED_TIMEOUT seconds and dropped as soon as
+the user orders again.
+"""
+import numpy as np
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from core.models import OrderItem, Product, ProductRecommendation
+
+WEIGHTS = {'copurchase': 0.5, 'affinity': 0.3, 'popularity': 0.2}
+
+# Categories whose popular products are added to the candidates.
+TOP_CATEGORIES = 5
+
+# No scores at all, for users without orders.
+NOTHING = (np.array([], dtype=np.int64), np.array([], dtype=np.float64))
+
+
+def feed_key(user_id):
+    """Return the cache key of a user's feed."""
+    return f'shop:feed:{user_id}'
+
+
+def invalidate_feed(user_id):
+    """Drop a user's feed now and once the current transaction commits."""
+    cache.delete(feed_key(user_id))
+    transaction.on_commit(lambda: cache.delete(feed_key(user_id)))
+
+
+def load_history(user):
+    """Return the products, categories and quantities a user ordered."""
+    rows = np.array(
+        OrderItem.objects.filter(order__user=user).values_list(
+            'product_id', 'product__category_id', 'quantity'
+        ).order_by(),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    return rows[:, 0], rows[:, 1], rows[:, 2]
+
+
+def category_affinity(categories, quantities):
+    """Return the categories ordered and the share of items of each."""
+    ordered, index = np.unique(categories, return_inverse=True)
+    totals = np.bincount(index, weights=quantities)
+    return ordered, totals / totals.sum()
+
+
+def copurchase_scores(product_ids):
+    """Return the products bought with `product_ids` and their scores."""
+    rows = np.array(
+        ProductRecommendation.objects.filter(
+            product_id__in=product_ids.tolist()
+        ).values_list('recommended_id', 'score').order_by(),
+        dtype=np.float64,
+    ).reshape(-1, 2)
+    products, index = np.unique(rows[:, 0].astype(np.int64),
+                                return_inverse=True)
+    return products, np.bincount(index, weights=rows[:, 1])
+
+
+def popular_products(limit, category_ids=None):
+    """Return (id, category_id, orders) rows of the most ordered products."""
+    products = Product.objects.filter(stock__gt=0)
+    if category_ids is not None:
+        products = products.filter(category_id__in=category_ids.tolist())
+    return np.array(
+        products.annotate(orders=Count('orderitem')).order_by(
+            '-orders', '-id'
+        ).values_list('id', 'category_id', 'orders')[:limit],
+        dtype=np.int64,
+    ).reshape(-1, 3)
+
+
+def candidate_details(product_ids):
+    """Return (id, category_id, orders) rows of the products in stock."""
+    rows = Product.objects.filter(
+        id__in=product_ids.tolist(), stock__gt=0
+    ).annotate(orders=Count('orderitem')).values_list(
+        'id', 'category_id', 'orders'
+    ).order_by()
+    return np.array(rows, dtype=np.int64).reshape(-1, 3)
+
+
+def lookup(keys, values, wanted, default=0.0):
+    """Return the values of `wanted` in the sorted `keys`, or `default`."""
+    result = np.full(len(wanted), default, dtype=np.float64)
+    if len(keys):
+        positions = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        found = keys[positions] == wanted
+        result[found] = values[positions[found]]
+    return result
+
+
+def score(candidates, affinity, copurchase):
+    """Score candidate rows of (id, category_id, orders) at once."""
+    popularity = np.log1p(candidates[:, 2].astype(np.float64))
+    if popularity.max(initial=0) > 0:
+        popularity /= popularity.max()
+    bought_with = lookup(*copurchase, candidates[:, 0])
+    if bought_with.max(initial=0) > 0:
+        bought_with /= bought_with.max()
+    return (
+        WEIGHTS['copurchase'] * bought_with
+        + WEIGHTS['affinity'] * lookup(*affinity, candidates[:, 1])
+        + WEIGHTS['popularity'] * popularity
+    )
+
+
+def build_feed(user, size=None):
+    """Return the ids and scores of the best products for `user`."""
+    size = size or settings.SHOP_FEED_SIZE
+    ordered, categories, quantities = load_history(user)
+    if not len(ordered):
+        candidates = popular_products(size)
+        scores = score(candidates, NOTHING, NOTHING)
+        return candidates[:, 0].tolist(), scores.tolist()
+
+    affinity = category_affinity(categories, quantities)
+    copurchase = copurchase_scores(np.unique(ordered))
+    top_categories = affinity[0][np.argsort(-affinity[1])[:TOP_CATEGORIES]]
+    popular = popular_products(size, top_categories)[:, 0]
+
+    ids = np.setdiff1d(np.union1d(copurchase[0], popular), ordered)
+    candidates = candidate_details(ids)
+    scores = score(candidates, affinity, copurchase)
+    best = np.lexsort((candidates[:, 0], -scores))[:size]
+    return candidates[best, 0].tolist(), scores[best].tolist()
+
+
+def get_feed(user):
+    """Return the cached feed of `user`, building it on a miss.
+
+    Returns `(ids, scores, hit)`.
+    """
+    key = feed_key(user.id)
+    feed = cache.get(key)
+    if feed is not None:
+        return (*feed, True)
+    feed = build_feed(user)
+    cache.set(key, feed, settings.SHOP_FEED_TIMEOUT)
+    return (*feed, False)
@@ -0,0 +1,116 @@
+"""
+Filter backends for the shop api.
+"""
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+# Text search configuration used by the trigger maintaining
+# Product.search_vector, see core/migrations/0008.
+SEARCH_CONFIG = 'english'
+
+
+@lru_cache(maxsize=None)
+def trigram_available():
+    """Return whether the pg_trgm extension is installed."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """Full-text search of products through the `search` parameter.
+
+    Matches are ranked by relevance, name matches first. When nothing
+    matches, product names similar to the terms are returned instead so
+    that typos still find something. Results are annotated with `rank`,
+    cast to double precision so it survives the round trip through a
+    pagination cursor.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+
+        query = SearchQuery(terms, config=SEARCH_CONFIG,
+                            search_type='websearch')
+        matches = queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+        if not trigram_available() or matches.exists():
+            return matches
+
+        return queryset.filter(name__trigram_similar=terms).annotate(
+            rank=Cast(TrigramSimilarity('name', terms), FloatField())
+        )
+
+
+def parse_param(params, name, parse):
+    """Parse the query parameter `name`, raising a 400 when invalid."""
+    value = params.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        return parse(value)
+    except (ValueError, InvalidOperation):
+        raise ValidationError({name: f'Invalid value {value!r}.'})
+
+
+def parse_bool(value):
+    """Parse a boolean query parameter."""
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(value)
+
+
+class ProductFilter(BaseFilterBackend):
+    """Filter products by category, price range, stock and owner.
+
+    Each filter is backed by an index on Product, see its Meta.indexes.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        category_id = parse_param(params, 'category_id', int)
+        min_price = parse_param(params, 'min_price', Decimal)
+        max_price = parse_param(params, 'max_price', Decimal)
+        in_stock = parse_param(params, 'in_stock', parse_bool)
+        user_id = parse_param(params, 'user', int)
+
+        if category_id is not None:
+            queryset = queryset.filter(category_id=category_id)
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+        if in_stock is True:
+            queryset = queryset.filter(stock__gt=0)
+        elif in_stock is False:
+            queryset = queryset.filter(stock=0)
+        if user_id is not None:
+            queryset = queryset.filter(user_id=user_id)
+        return queryset
+
+
+class ProductOrderingFilter(OrderingFilter):
+    """Sort products on a single indexed field through `ordering`."""
+    ordering_fields = ['id', 'price', 'name', 'stock', 'updated_at']
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # Cursor pagination only pages on the first field.
+        return ordering[:1] if ordering else ordering
@@ -0,0 +1,247 @@
+"""
+Background product image uploads for the shop api.
+
+Uploaded images are written to a staging directory and recorded as an
+ImageUploadJob, then processed and uploaded out of the request by a
+small thread pool, which hands the CPU bound processing to a process
+pool. Jobs live in the database, so the `process_image_jobs` command
+can pick up any left behind by a restarted server.
+
+Stored images are recorded as an ImageAsset under the SHA-256 digest
+of the uploaded content, so that uploading the same content again
+reuses them at once.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from core.models import ImageAsset, ImageUploadJob, Product
+from .cache import invalidate
+from .processing import process_image
+from .storage import get_image_storage
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_process_pool = None
+_executor_lock = threading.Lock()
+
+
+def store_file(path):
+    """Save the file at `path` to the image storage.
+
+    Returns the name it was stored under and its URL.
+    """
+    storage = get_image_storage()
+    with open(path, 'rb') as file:
+        name = storage.save(os.path.basename(path), File(file))
+    return name, storage.url(name)
+
+
+def file_digest(path):
+    """Return the SHA-256 digest of the file at `path`, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in File(file).chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stage_file(file):
+    """Write an uploaded file to the staging directory.
+
+    Returns its path and the SHA-256 digest of its content, computed
+    chunk by chunk while writing it.
+    """
+    os.makedirs(settings.SHOP_IMAGE_STAGING_DIR, exist_ok=True)
+    extension = os.path.splitext(file.name)[1].lower()
+    path = os.path.join(settings.SHOP_IMAGE_STAGING_DIR,
+                        f'{uuid.uuid4().hex}{extension}')
+    digest = hashlib.sha256()
+    with open(path, 'wb') as staged:
+        for chunk in file.chunks():
+            digest.update(chunk)
+            staged.write(chunk)
+    return path, digest.hexdigest()
+
+
+def attach_asset(product_id, asset):
+    """Make the variants of `asset` the image of a product."""
+    Product.objects.filter(id=product_id).update(
+        image=asset.image_url,
+        image_thumbnail=asset.thumbnail_url,
+        image_webp=asset.webp_url,
+        image_asset=asset,
+        updated_at=timezone.now(),
+    )
+    invalidate(Product)
+
+
+def save_asset(digest, stored):
+    """Record the variants just stored as the asset of `digest`.
+
+    When another job stored the same content meanwhile, its asset is
+    kept and the files stored by this one are deleted.
+    """
+    try:
+        with transaction.atomic():
+            return ImageAsset.objects.create(
+                digest=digest,
+                image_url=stored['image'][1],
+                thumbnail_url=stored['thumbnail'][1],
+                webp_url=stored['webp'][1],
+                names=[name for name, _ in stored.values()],
+            )
+    except IntegrityError:
+        storage = get_image_storage()
+        for name, _ in stored.values():
+            storage.delete(name)
+        return ImageAsset.objects.get(digest=digest)
+
+
+def get_process_pool():
+    """Return the process pool processing images, creating it once.
+
+    Workers are spawned rather than forked, as forking a process
+    running threads can leave locks held in the child.
+    """
+    global _process_pool
+    with _executor_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.SHOP_IMAGE_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _process_pool
+
+
+def make_variants(path):
+    """Process the image at `path`, return the paths of its variants."""
+    args = (path, settings.SHOP_IMAGE_MAX_SIZE,
+            settings.SHOP_IMAGE_THUMBNAIL_SIZE, settings.SHOP_IMAGE_QUALITY)
+    if settings.SHOP_IMAGE_PROCESSES == 0:
+        return process_image(*args)
+    return get_process_pool().submit(process_image, *args).result()
+
+
+def remove_files(paths):
+    """Delete the given files, ignoring those already gone."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def claim_job(job_id):
+    """Mark a pending job as running, return whether this call did."""
+    return ImageUploadJob.objects.filter(
+        id=job_id, status=ImageUploadJob.PENDING
+    ).update(
+        status=ImageUploadJob.RUNNING,
+        attempts=F('attempts') + 1,
+        updated_at=timezone.now(),
+    ) == 1
+
+
+def run_job(job_id):
+    """Process and upload the staged image of a job for its product.
+
+    Jobs already claimed by another worker are left alone. On failure
+    the staged file is kept so that the job can be retried.
+    """
+    if not claim_job(job_id):
+        return
+    job = ImageUploadJob.objects.get(id=job_id)
+    variants = {}
+    try:
+        digest = job.digest or file_digest(job.staged_path)
+        asset = ImageAsset.objects.filter(digest=digest).first()
+        if asset is None:
+            variants = make_variants(job.staged_path)
+            asset = save_asset(digest, {
+                name: store_file(path) for name, path in variants.items()
+            })
+    except Exception as exc:
+        logger.exception('Image upload %s failed.', job.id)
+        job.status = ImageUploadJob.FAILED
+        job.error = str(exc)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        return
+    finally:
+        remove_files(variants.values())
+
+    with transaction.atomic():
+        attach_asset(job.product_id, asset)
+        job.status = ImageUploadJob.DONE
+        job.digest = digest
+        job.image_url = asset.image_url
+        job.error = ''
+        job.save(update_fields=['status', 'digest', 'image_url', 'error',
+                                'updated_at'])
+    remove_files([job.staged_path])
+
+
+def get_executor():
+    """Return the thread pool running the uploads, creating it once."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.SHOP_IMAGE_WORKERS,
+                thread_name_prefix='image-upload',
+            )
+        return _executor
+
+
+def run_in_worker(job_id):
+    """Run a job from a pool thread, releasing its connection after."""
+    try:
+        run_job(job_id)
+    except Exception:
+        logger.exception('Image upload %s crashed.', job_id)
+    finally:
+        connection.close()
+
+
+def enqueue(job):
+    """Start uploading `job` once the current transaction commits."""
+    if settings.SHOP_IMAGE_WORKERS == 0:
+        transaction.on_commit(lambda: run_job(job.id))
+    else:
+        transaction.on_commit(
+            lambda: get_executor().submit(run_in_worker, job.id)
+        )
+
+
+@transaction.atomic
+def submit_image(product, user, file):
+    """Make `file` the image of `product`, return its upload job.
+
+    Content uploaded before is reused at once and the job returned is
+    already done, otherwise the job is queued.
+    """
+    path, digest = stage_file(file)
+    asset = ImageAsset.objects.filter(digest=digest).first()
+    if asset is None:
+        job = ImageUploadJob.objects.create(
+            product=product, user=user, staged_path=path, digest=digest,
+        )
+        enqueue(job)
+        return job
+
+    remove_files([path])
+    attach_asset(product.id, asset)
+    return ImageUploadJob.objects.create(
+        product=product, user=user, digest=digest,
+        status=ImageUploadJob.DONE, image_url=asset.image_url,
+    )
@@ -0,0 +1,43 @@
+"""
+Pagination for the shop api.
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class ShopCursorPagination(CursorPagination):
+    """Keyset pagination whose page size clients can choose.
+
+    Pages are fetched with a `WHERE <ordering> < <cursor>` condition
+    instead of an OFFSET, so deep pages cost the same as the first one.
+    """
+    page_size = settings.SHOP_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.SHOP_MAX_PAGE_SIZE
+
+
+class ProductPagination(ShopCursorPagination):
+    """Paginate products, newest first or by relevance for searches."""
+    ordering = ('-id',)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        searching = 'rank' in queryset.query.annotations
+        if searching and 'ordering' not in request.query_params:
+            ordering = ('-rank',)
+        # Break ties on id so that rows sharing a value keep a stable
+        # order from one page to the next.
+        field = ordering[0]
+        if field.lstrip('-') != 'id':
+            ordering = (field, '-id' if field.startswith('-') else 'id')
+        return ordering
+
+
+class CategoryPagination(ShopCursorPagination):
+    """Paginate categories by name, which is unique."""
+    ordering = ('-name',)
+
+
+class OrderPagination(ShopCursorPagination):
+    """Paginate orders, most recent first."""
+    ordering = ('-created_at', '-id')
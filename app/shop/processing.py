@@ -0,0 +1,46 @@
+"""
+Image processing for product images.
+
+Kept free of Django imports so that worker processes can run it
+without setting Django up.
+"""
+import os
+
+from PIL import Image, ImageOps
+
+
+def has_alpha(image):
+    """Return whether `image` has transparent pixels to preserve."""
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def process_image(path, max_size, thumbnail_size, quality):
+    """Write the resized, thumbnail and WebP variants of an image.
+
+    The image is rotated upright according to its EXIF orientation,
+    then saved without any metadata. Variants are written next to
+    `path` and their paths returned by name.
+    """
+    with Image.open(path) as original:
+        image = ImageOps.exif_transpose(original)
+        transparent = has_alpha(original)
+    image = image.convert('RGBA' if transparent else 'RGB')
+    image_format, extension = ('PNG', '.png') if transparent \
+        else ('JPEG', '.jpg')
+
+    stem = os.path.splitext(path)[0]
+    variants = {
+        'image': f'{stem}_full{extension}',
+        'thumbnail': f'{stem}_thumb{extension}',
+        'webp': f'{stem}.webp',
+    }
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    image.save(variants['image'], image_format, quality=quality,
+               optimize=True)
+    image.save(variants['webp'], 'WEBP', quality=quality)
+    image.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
+    image.save(variants['thumbnail'], image_format, quality=quality,
+               optimize=True)
+    return variants
@@ -0,0 +1,186 @@
+"""
+"Customers also bought" recommendations for the shop api.
+
+Orders are turned into a sparse order x product matrix X, whose
+product x product co-occurrence matrix C = X'X counts how many orders
+contain each pair of products. Pairs are then scored by one of:
+
+- cosine: C[i, j] / sqrt(n[i] * n[j])
+- lift: C[i, j] * orders / (n[i] * n[j])
+
+where n counts the orders containing each product, and the top K
+products of each row are stored as ProductRecommendation rows.
+
+Incremental builds rank again the products ordered since the previous
+build with the same parameters, and the products bought with them. The
+lift of every other product only changes by the number of orders, and
+is rescaled in place. Deleted order items cannot be tracked that way,
+so a full build is made when some were deleted. Items whose product
+was changed after the fact are not seen either: their scores stay
+approximate until the next full build.
+"""
+import numpy as np
+from scipy import sparse
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max
+from core.models import (
+    OrderItem,
+    ProductRecommendation,
+    RecommendationBuild,
+)
+
+METRICS = ('cosine', 'lift')
+
+
+def load_baskets():
+    """Return the order and product ids of every distinct order line."""
+    pairs = np.array(
+        OrderItem.objects.values_list('order_id', 'product_id')
+        .distinct().order_by(),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def cooccurrence(order_ids, product_ids):
+    """Build the co-occurrence matrix of products within orders.
+
+    Returns the product ids indexing its rows and columns, the matrix
+    itself with an empty diagonal, the number of orders containing each
+    product and the number of orders.
+    """
+    orders, order_index = np.unique(order_ids, return_inverse=True)
+    products, product_index = np.unique(product_ids, return_inverse=True)
+    baskets = sparse.csr_matrix(
+        (np.ones(len(order_index), dtype=np.float64),
+         (order_index, product_index)),
+        shape=(len(orders), len(products)),
+    )
+    counts = np.asarray(baskets.sum(axis=0)).ravel()
+    matrix = (baskets.T @ baskets).tocsr()
+    matrix.setdiag(0)
+    matrix.eliminate_zeros()
+    return products, matrix, counts, len(orders)
+
+
+def normalize(matrix, counts, n_orders, metric):
+    """Score the co-occurrence `matrix` with `metric`."""
+    if metric == 'cosine':
+        scale = 1 / np.sqrt(counts)
+        return (sparse.diags(scale) @ matrix @ sparse.diags(scale)).tocsr()
+    if metric == 'lift':
+        scale = 1 / counts
+        return (sparse.diags(scale * n_orders) @ matrix
+                @ sparse.diags(scale)).tocsr()
+    raise ValueError(f'Unknown metric {metric!r}.')
+
+
+def top_k(scores, row, k):
+    """Return the columns and scores of the best `k` entries of a row."""
+    start, end = scores.indptr[row], scores.indptr[row + 1]
+    columns = scores.indices[start:end]
+    values = scores.data[start:end]
+    if len(values) > k:
+        best = np.argpartition(-values, k)[:k]
+        columns, values = columns[best], values[best]
+    # Best first, ties broken on the column for stable rankings.
+    order = np.lexsort((columns, -values))
+    return columns[order], values[order]
+
+
+def affected_rows(matrix, products, since):
+    """Return the rows whose ranking order items after `since` changed.
+
+    Those are the products ordered since, and the products bought with
+    them whose scores depend on their counts.
+    """
+    changed = OrderItem.objects.filter(
+        order__orderitem__id__gt=since
+    ).values_list('product_id', flat=True).distinct()
+    rows = np.flatnonzero(np.isin(products, list(changed)))
+    neighbours = matrix[rows].indices
+    return np.union1d(rows, neighbours)
+
+
+def previous_build(metric, k, min_count):
+    """Return the last build an incremental one can start from, or None.
+
+    None when there is no build with the same parameters, or when order
+    items it saw were deleted since.
+    """
+    previous = RecommendationBuild.objects.filter(
+        metric=metric, top_k=k, min_count=min_count,
+        order_item_count__isnull=False,
+    ).order_by('-built_at', '-id').first()
+    if previous is None:
+        return None
+    remaining = OrderItem.objects.filter(
+        id__lte=previous.last_order_item_id
+    ).count()
+    if remaining < previous.order_item_count:
+        return None
+    return previous
+
+
+def build_recommendations(metric='cosine', k=None, incremental=False,
+                          min_count=1):
+    """Compute and store the top `k` recommendations of each product.
+
+    With `incremental`, only the rows touched by the orders placed since
+    the last build with the same parameters are ranked again, when no
+    order item was deleted since. Returns the build recorded.
+    """
+    k = k or settings.SHOP_RECOMMENDATIONS_TOP_K
+    stats = OrderItem.objects.aggregate(last=Max('id'), count=Count('id'))
+    last_item_id = stats['last'] or 0
+    previous = previous_build(metric, k, min_count) if incremental else None
+
+    products, matrix, counts, n_orders = cooccurrence(*load_baskets())
+    if previous is not None and n_orders < previous.order_count:
+        previous = None
+    if min_count > 1:
+        matrix.data[matrix.data < min_count] = 0
+        matrix.eliminate_zeros()
+    scores = normalize(matrix, counts, n_orders, metric)
+
+    if previous is None:
+        rows = np.arange(len(products))
+    else:
+        rows = affected_rows(matrix, products, previous.last_order_item_id)
+
+    product_ids = products.tolist()
+    recommendations = []
+    for row in rows:
+        columns, values = top_k(scores, row, k)
+        recommendations.extend(
+            ProductRecommendation(
+                product_id=product_ids[row],
+                recommended_id=product_ids[column],
+                score=score, rank=rank,
+            )
+            for rank, (column, score) in enumerate(
+                zip(columns.tolist(), values.tolist()), 1
+            )
+        )
+
+    with transaction.atomic():
+        stale = ProductRecommendation.objects.all()
+        if previous is not None:
+            updated = products[rows].tolist()
+            stale = stale.filter(product_id__in=updated)
+            if metric == 'lift' and n_orders != previous.order_count:
+                # Lift scales with the number of orders, for every row.
+                ProductRecommendation.objects.exclude(
+                    product_id__in=updated
+                ).update(score=F('score') * n_orders / previous.order_count)
+        stale.delete()
+        ProductRecommendation.objects.bulk_create(recommendations,
+                                                  batch_size=5000)
+        return RecommendationBuild.objects.create(
+            metric=metric, top_k=k, min_count=min_count,
+            last_order_item_id=last_item_id, order_count=n_orders,
+            order_item_count=stats['count'], products_updated=len(rows),
+            incremental=previous is not None,
+        )
@@ -0,0 +1,462 @@
+"""
+Semantic product search for the shop api.
+
+Products are embedded locally, without any model to download: the words
+of their name and description, and the character trigrams of the name,
+are hashed into SHOP_SEMANTIC_DIM buckets weighted by TF-IDF, and the
+vectors normalized so that their dot product is a cosine similarity.
+Trigrams let "laptops" find "Laptop" and survive small typos.
+
+The vectors live in a float32 matrix memory-mapped from disk, so that
+every worker process shares one copy in the page cache. They are
+searched through an IVF index: k-means splits them into clusters and a
+query only scores the vectors of its SHOP_SEMANTIC_NPROBE nearest
+clusters.
+
+`build_index` writes each index to a new generation directory under
+SHOP_SEMANTIC_INDEX_DIR and points the CURRENT file at it, which the
+processes serving queries notice and reload. The previous generation is
+kept until the next build, for processes still using it. In between,
+saved products are upserted in the background: known ones are rewritten
+in place, keeping their cluster, and new ones appended to a tail of the
+matrix scanned in full by every query, until the next build.
+"""
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from core.models import Product
+from .images import get_executor
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+')
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def features(name, description):
+    """Return the features of a product, repeated by their weight.
+
+    Name words count twice, as they describe the product best.
+    """
+    name_words = TOKEN_RE.findall(name.lower())
+    result = name_words * 2
+    for word in name_words:
+        padded = f'<{word}>'
+        result.extend(f'#{padded[i:i + 3]}' for i in range(len(padded) - 2))
+    result.extend(TOKEN_RE.findall(description.lower()))
+    return result
+
+
+def hashed_counts(products, dim):
+    """Count the hashed features of `(name, description)` pairs.
+
+    Returns a sparse products x `dim` matrix.
+    """
+    indptr, hashes = [0], []
+    for name, description in products:
+        hashes.extend(
+            zlib.crc32(feature.encode())
+            for feature in features(name, description)
+        )
+        indptr.append(len(hashes))
+    hashes = np.array(hashes, dtype=np.uint32)
+    counts = sparse.csr_matrix(
+        (np.ones(len(hashes), dtype=np.float32), hashes % dim, indptr),
+        shape=(len(products), dim),
+    )
+    # Duplicate buckets of a row are summed up.
+    counts.sum_duplicates()
+    return counts
+
+
+def document_frequencies(counts):
+    """Return how many rows of `counts` use each bucket."""
+    return np.bincount(counts.indices, minlength=counts.shape[1])
+
+
+def inverse_frequencies(frequencies, total):
+    """Return the smoothed IDF weights of the buckets."""
+    return (np.log((1 + total) / (1 + frequencies)) + 1).astype(np.float32)
+
+
+def embed(products, idf):
+    """Return the unit float32 vectors of `(name, description)` pairs."""
+    counts = hashed_counts(products, len(idf))
+    counts.data = 1 + np.log(counts.data)
+    vectors = (counts @ sparse.diags(idf)).toarray().astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def train_centroids(vectors, n_clusters, iterations=10, sample_size=50000,
+                    seed=0):
+    """Cluster `vectors` by spherical k-means, return the centroids.
+
+    Only a random sample of the vectors is clustered, which is plenty
+    to place the centroids.
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(vectors), min(sample_size, len(vectors)),
+                              replace=False))
+    sample = np.asarray(vectors[rows])
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)]
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        members = sparse.csr_matrix(
+            (np.ones(len(sample), dtype=np.float32),
+             (assignment, np.arange(len(sample)))),
+            shape=(n_clusters, len(sample)),
+        )
+        sums = np.asarray(members @ sample)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Clusters left empty keep their previous centroid.
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12),
+                             centroids).astype(np.float32)
+    return centroids
+
+
+def assign_clusters(vectors, centroids, chunk_size=65536):
+    """Return the nearest centroid of every vector."""
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = np.asarray(vectors[start:start + chunk_size])
+        assignment[start:start + len(chunk)] = np.argmax(
+            chunk @ centroids.T, axis=1
+        )
+    return assignment
+
+
+@contextmanager
+def index_lock(path):
+    """Hold the lock serializing writes to the index under `path`."""
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class SemanticIndex:
+    """An IVF index over memory-mapped product vectors.
+
+    Rows [0, built) were clustered by the build, rows [built, count)
+    were appended since and are scanned in full.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / 'meta.json') as file:
+            meta = json.load(file)
+        self.built = meta['built']
+        self.capacity = meta['capacity']
+        self.vectors = np.load(self.path / 'vectors.npy', mmap_mode='r+')
+        self.ids = np.load(self.path / 'ids.npy', mmap_mode='r+')
+        # The number of rows in use, shared by all the processes.
+        self.state = np.load(self.path / 'state.npy', mmap_mode='r+')
+        self.centroids = np.load(self.path / 'centroids.npy')
+        self.idf = np.load(self.path / 'idf.npy')
+
+        assignment = np.load(self.path / 'assignment.npy')
+        self.lists = np.argsort(assignment, kind='stable').astype(np.int32)
+        self.offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=len(self.centroids)),
+                  out=self.offsets[1:])
+
+    @property
+    def count(self):
+        return int(self.state[0])
+
+    def candidates(self, query, nprobe):
+        """Return the rows to score for `query`."""
+        count = self.count
+        tail = np.arange(self.built, count, dtype=np.int32)
+        if len(self.centroids) == 0:
+            return tail
+        if nprobe < len(self.centroids):
+            probes = np.argpartition(-(self.centroids @ query), nprobe)[
+                :nprobe
+            ]
+        else:
+            probes = range(len(self.centroids))
+        return np.concatenate([
+            self.lists[self.offsets[probe]:self.offsets[probe + 1]]
+            for probe in probes
+        ] + [tail])
+
+    def search(self, query, k, nprobe=None):
+        """Return the ids and scores of the `k` products nearest `query`.
+
+        Products sharing no bucket with the query are left out.
+        """
+        nprobe = nprobe or settings.SHOP_SEMANTIC_NPROBE
+        rows = self.candidates(query, nprobe)
+        # Reading the rows in order keeps the page cache reads sequential.
+        rows.sort()
+        scores = self.vectors[rows] @ query
+        if len(scores) > k:
+            best = np.argpartition(-scores, k)[:k]
+            rows, scores = rows[best], scores[best]
+        order = np.argsort(-scores, kind='stable')
+        rows, scores = rows[order], scores[order]
+        found = scores > 0
+        return self.ids[rows[found]].tolist(), scores[found].tolist()
+
+    def find(self, product_id):
+        """Return the row of a product, or None."""
+        # Built rows are sorted by id, appended ones are not.
+        row = int(np.searchsorted(self.ids[:self.built], product_id))
+        if row < self.built and self.ids[row] == product_id:
+            return row
+        tail = np.flatnonzero(self.ids[self.built:self.count] == product_id)
+        return self.built + int(tail[0]) if len(tail) else None
+
+    def upsert(self, vectors_by_id):
+        """Write the vectors of the given products.
+
+        Returns the number of products left out because the matrix is
+        full, which only a new build makes room for.
+        """
+        skipped = 0
+        with index_lock(self.path.parent):
+            for product_id, vector in vectors_by_id.items():
+                row = self.find(product_id)
+                if row is None:
+                    row = self.count
+                    if row >= self.capacity:
+                        skipped += 1
+                        continue
+                    self.ids[row] = product_id
+                    self.vectors[row] = vector
+                    self.state[0] = row + 1
+                else:
+                    self.vectors[row] = vector
+            self.vectors.flush()
+            self.ids.flush()
+            self.state.flush()
+        return skipped
+
+    def remove(self, product_ids):
+        """Zero the vectors of the given products, hiding them."""
+        with index_lock(self.path.parent):
+            for product_id in product_ids:
+                row = self.find(product_id)
+                if row is not None:
+                    self.vectors[row] = 0
+            self.vectors.flush()
+
+
+def get_index():
+    """Return the current index, reloaded after a build, or None."""
+    global _index
+    root = Path(settings.SHOP_SEMANTIC_INDEX_DIR)
+    try:
+        generation = (root / 'CURRENT').read_text().strip()
+    except FileNotFoundError:
+        return None
+    with _index_lock:
+        if _index is None or _index.path != root / generation:
+            _index = SemanticIndex(root / generation)
+        return _index
+
+
+@receiver(setting_changed)
+def reset_index(setting, **kwargs):
+    """Load the index again when its settings change."""
+    global _index
+    if setting.startswith('SHOP_SEMANTIC_'):
+        with _index_lock:
+            _index = None
+
+
+def search(query, k):
+    """Return the ids and scores of the products best matching `query`.
+
+    Returns None when no index was built.
+    """
+    index = get_index()
+    if index is None:
+        return None
+    return index.search(embed([(query, '')], index.idf)[0], k)
+
+
+def iter_products(queryset, chunk_size):
+    """Yield the ids and texts of products, `chunk_size` at a time."""
+    rows = queryset.order_by('id').values_list('id', 'name', 'description')
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_index(path, chunks, dim, n_clusters=None):
+    """Write the index of the products yielded by `chunks()` to `path`.
+
+    `chunks` is called twice, to count document frequencies then to
+    embed the products, and must yield the same `(id, name,
+    description)` chunks sorted by id both times. Returns the number of
+    products indexed.
+    """
+    os.makedirs(path)
+    frequencies = np.zeros(dim, dtype=np.int64)
+    total = 0
+    for chunk in chunks():
+        counts = hashed_counts([row[1:] for row in chunk], dim)
+        frequencies += document_frequencies(counts)
+        total += len(chunk)
+    idf = inverse_frequencies(frequencies, total)
+
+    capacity = total + max(total // 4, 1024)
+    vectors = np.lib.format.open_memmap(
+        os.path.join(path, 'vectors.npy'), mode='w+', dtype=np.float32,
+        shape=(capacity, dim),
+    )
+    ids = np.lib.format.open_memmap(
+        os.path.join(path, 'ids.npy'), mode='w+', dtype=np.int64,
+        shape=(capacity,),
+    )
+    built = 0
+    for chunk in chunks():
+        end = built + len(chunk)
+        ids[built:end] = [row[0] for row in chunk]
+        vectors[built:end] = embed([row[1:] for row in chunk], idf)
+        built = end
+
+    if n_clusters is None:
+        n_clusters = int(np.sqrt(built))
+    n_clusters = min(max(n_clusters, 1), built)
+    if n_clusters:
+        centroids = train_centroids(vectors[:built], n_clusters)
+    else:
+        centroids = np.zeros((0, dim), dtype=np.float32)
+    np.save(os.path.join(path, 'centroids.npy'), centroids)
+    np.save(os.path.join(path, 'assignment.npy'),
+            assign_clusters(vectors[:built], centroids))
+    np.save(os.path.join(path, 'idf.npy'), idf)
+    np.save(os.path.join(path, 'state.npy'), np.array([built], np.int64))
+    with open(os.path.join(path, 'meta.json'), 'w') as file:
+        json.dump({'built': built, 'capacity': capacity, 'dim': dim}, file)
+    vectors.flush()
+    ids.flush()
+    return built
+
+
+def upsert_products(product_ids):
+    """Embed the given products again into the current index.
+
+    Products deleted meanwhile are removed from it.
+    """
+    index = get_index()
+    if index is None:
+        return
+    rows = Product.objects.filter(id__in=product_ids).values_list(
+        'id', 'name', 'description'
+    )
+    texts = {row[0]: row[1:] for row in rows}
+    if texts:
+        vectors = embed(list(texts.values()), index.idf)
+        skipped = index.upsert(dict(zip(texts, vectors)))
+        if skipped:
+            logger.warning(
+                'The semantic index is full, %s products were left out '
+                'until the next build.', skipped
+            )
+    index.remove(set(product_ids) - set(texts))
+
+
+def run_upsert(product_ids):
+    """Upsert products, logging rather than raising any failure."""
+    try:
+        upsert_products(product_ids)
+    except Exception:
+        logger.exception('Updating the semantic index failed.')
+
+
+def upsert_in_worker(product_ids):
+    """Upsert products from a pool thread, releasing its connection after."""
+    try:
+        run_upsert(product_ids)
+    finally:
+        connection.close()
+
+
+def schedule_upsert(product_ids):
+    """Upsert products in the background once the transaction commits.
+
+    They go to the background threads uploading images (see images.py),
+    or are upserted right away when SHOP_IMAGE_WORKERS is 0.
+    """
+    product_ids = list(product_ids)
+    if settings.SHOP_IMAGE_WORKERS == 0:
+        transaction.on_commit(lambda: run_upsert(product_ids))
+    else:
+        transaction.on_commit(
+            lambda: get_executor().submit(upsert_in_worker, product_ids)
+        )
+
+
+def build_index(n_clusters=None, chunk_size=10000):
+    """Index every product into a new generation and switch to it.
+
+    Products saved while building are upserted into the new index once
+    it is current. Returns the number of products indexed.
+    """
+    root = Path(settings.SHOP_SEMANTIC_INDEX_DIR)
+    started = timezone.now()
+    max_id = Product.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0
+    # Products created during the build are upserted afterwards.
+    queryset = Product.objects.filter(id__lte=max_id)
+    generation = f'{time.time_ns()}'
+    count = write_index(
+        root / generation, lambda: iter_products(queryset, chunk_size),
+        settings.SHOP_SEMANTIC_DIM, n_clusters,
+    )
+
+    with index_lock(root):
+        try:
+            previous = (root / 'CURRENT').read_text().strip()
+        except FileNotFoundError:
+            previous = None
+        with open(root / 'CURRENT.tmp', 'w') as file:
+            file.write(generation)
+        os.replace(root / 'CURRENT.tmp', root / 'CURRENT')
+        # The previous generation stays, as processes switch to the new
+        # one on their next query and may still be upserting into it.
+        # Older ones have not been current since the last build.
+        for old in root.iterdir():
+            if old.is_dir() and old.name not in (generation, previous):
+                shutil.rmtree(old, ignore_errors=True)
+
+    changed = list(Product.objects.filter(
+        updated_at__gte=started
+    ).values_list('id', flat=True))
+    if changed:
+        upsert_products(changed)
+    return count
@@ -6,8 +6,11 @@ from core.models import (
     Category,
     Product,
     Order,
-    OrderItem
+    OrderItem,
+    CartItem,
+    ImageUploadJob
 )
+from .checkout import MAX_QUANTITY
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -43,8 +46,11 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = ['id', 'user', 'category_detail', 'category_id', 'name', 'description', 'price', 'stock', 'image']
-        read_only_fields = ['id', 'user', 'category_detail']  # include 'category_detail' here
+        fields = ['id', 'user', 'category_detail', 'category_id', 'name', 'description', 'price', 'stock', 'image',
+                  'image_thumbnail', 'image_webp']
+        # include 'category_detail' here
+        read_only_fields = ['id', 'user', 'category_detail',
+                            'image_thumbnail', 'image_webp']
 
     def get_category_detail(self, obj):
         """Return the category object."""
@@ -63,6 +69,14 @@ class ProductSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class ScoredProductSerializer(ProductSerializer):
+    """Serializer for products ranked by a score."""
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['score']
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to products."""
     image = serializers.ImageField(required=True)
@@ -73,6 +87,16 @@ class ProductImageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class ImageUploadJobSerializer(serializers.ModelSerializer):
+    """Serializer for the status of product image uploads."""
+
+    class Meta:
+        model = ImageUploadJob
+        fields = ['id', 'product', 'status', 'image_url', 'error',
+                  'created_at', 'updated_at']
+        read_only_fields = fields
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     product = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(),
@@ -82,8 +106,9 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OrderItem
-        fields = ['id', 'product', 'product_data', 'quantity']
-        read_only_fields = ['id']
+        fields = ['id', 'product', 'product_data', 'quantity',
+                  'unit_price', 'product_name']
+        read_only_fields = ['id', 'unit_price', 'product_name']
 
 
 # class OrderSerializer(serializers.ModelSerializer):
@@ -111,10 +136,42 @@ class OrderItemSerializer(serializers.ModelSerializer):
 #         return obj.user.email  # Ensure your Order model has a 'user' field pointing to the User model
 
 
+def requested_fields(request, param):
+    """Return the comma separated names given in the `param` parameter."""
+    if request is None:
+        return set()
+    value = request.query_params.get(param, '')
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """Let clients choose the fields returned through the query string.
+
+    `?fields=id,total_amount` keeps only the listed fields and
+    `?expand=items` adds the optional fields declared in
+    `Meta.expandable_fields`, which are left out by default.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        expand = requested_fields(request, 'expand')
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand & set(expandable):
+            serializer_class, options = expandable[name]
+            self.fields[name] = serializer_class(**options)
+
+        fields = requested_fields(request, 'fields')
+        if fields:
+            for name in set(self.fields) - fields - expand:
+                self.fields.pop(name)
+
+
 class OrderCreateSerializer(serializers.Serializer):
     """Serializer for creating order items, expects product_id and quantity."""
     product_id = serializers.IntegerField()
-    quantity = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1,
+                                        max_value=MAX_QUANTITY)
 
 
 
@@ -128,8 +185,10 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ['id', 'user_email', 'products', 'product_details', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at', 'user_email', 'product_details']
+        fields = ['id', 'user_email', 'products', 'product_details',
+                  'total_amount', 'item_count', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'user_email',
+                            'product_details', 'total_amount', 'item_count']
 
     def get_user_email(self, obj):
         return obj.user.email
@@ -149,3 +208,42 @@ class OrderSerializer(serializers.ModelSerializer):
         return order
 
 
+class OrderListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Compact serializer for listing orders, items only on request."""
+    user_email = serializers.EmailField(source='user.email', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'user_email', 'total_amount', 'item_count',
+                  'created_at', 'updated_at']
+        read_only_fields = fields
+        expandable_fields = {
+            'items': (OrderItemSerializer, {
+                'source': 'orderitem_set', 'many': True, 'read_only': True,
+            }),
+        }
+
+
+class CartItemSerializer(serializers.ModelSerializer):
+    """Serializer for the items of a cart."""
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1,
+                                        max_value=MAX_QUANTITY)
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    unit_price = serializers.DecimalField(
+        source='product.price', max_digits=10, decimal_places=2,
+        read_only=True
+    )
+    line_total = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
+
+    class Meta:
+        model = CartItem
+        fields = ['product_id', 'product_name', 'unit_price', 'quantity',
+                  'line_total']
+
+
+class CartMergeSerializer(serializers.Serializer):
+    """Serializer for merging a client side cart into the server cart."""
+    items = CartItemSerializer(many=True)
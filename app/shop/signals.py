@@ -0,0 +1,73 @@
+"""
+Signal handlers for the shop app.
+"""
+import threading
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.models import Category, Order, OrderItem, Product
+from .cache import invalidate
+from .conditional import record_deletion
+from .feed import invalidate_feed
+from .semantic import schedule_upsert
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Invalidate cached responses built from the changed model."""
+    invalidate(sender)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Product)
+def record_catalog_deletion(sender, **kwargs):
+    """Date the deletion, which no remaining row's updated_at shows."""
+    record_deletion(sender)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def update_semantic_index(sender, instance, **kwargs):
+    """Upsert the changed product into the semantic search index."""
+    schedule_upsert([instance.pk])
+
+
+# Ids of the orders being deleted, whose items need no handling of
+# their own.
+_deleting = threading.local()
+
+
+def deleting_orders():
+    """Return the ids of the orders being deleted in this thread."""
+    if not hasattr(_deleting, 'ids'):
+        _deleting.ids = set()
+    return _deleting.ids
+
+
+@receiver(pre_delete, sender=Order)
+def mark_order_deletion(sender, instance, **kwargs):
+    """Mark the order, so that its cascaded items are skipped."""
+    deleting_orders().add(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Order)
+def invalidate_order_feed(sender, instance, **kwargs):
+    """Drop the feed of the user whose orders changed."""
+    deleting_orders().discard(instance.pk)
+    invalidate_feed(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def invalidate_order_item_feed(sender, instance, **kwargs):
+    """Drop the feed of the user whose order items changed."""
+    if instance.order_id in deleting_orders():
+        return
+    if OrderItem.order.is_cached(instance):
+        user_id = instance.order.user_id
+    else:
+        user_id = Order.objects.filter(
+            id=instance.order_id
+        ).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_feed(user_id)
@@ -0,0 +1,80 @@
+"""
+Tests for the async catalog views.
+"""
+import asyncio
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase
+from rest_framework import status
+from core.models import Category, Product
+from shop.async_views import ASYNC_ROUTES, async_routes
+from shop.urls import router
+
+
+def callbacks(patterns):
+    """Return the views of `patterns` by name, without format suffixes."""
+    return {
+        pattern.name: pattern.callback for pattern in patterns
+        if 'format' not in pattern.pattern.regex.pattern
+    }
+
+
+class AsyncRoutesTests(SimpleTestCase):
+    """Test swapping the read routes for async views."""
+
+    def test_read_routes_async(self):
+        """Test only the catalog read routes become async."""
+        views = callbacks(async_routes(router.urls))
+
+        for name, view in views.items():
+            self.assertEqual(asyncio.iscoroutinefunction(view),
+                             name in ASYNC_ROUTES, name)
+        # DRF's attributes survive, for the schema and CSRF exemption.
+        self.assertTrue(views['product-list'].csrf_exempt)
+        self.assertEqual(views['product-list'].cls.__name__,
+                         'ProductViewSet')
+
+
+class AsyncViewsTests(TestCase):
+    """Test the async views answer like the sync ones."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.category = Category.objects.create(name='Books')
+        self.product = Product.objects.create(
+            user=user, category=self.category, name='Novel',
+            price=Decimal('10.00'), stock=5,
+        )
+        self.views = callbacks(async_routes(router.urls))
+        self.factory = AsyncRequestFactory()
+
+    def get(self, name, path, **kwargs):
+        """Call an async view, return its rendered response."""
+        return async_to_sync(self.views[name])(self.factory.get(path),
+                                               **kwargs)
+
+    def test_product_list(self):
+        """Test listing products through the async view."""
+        res = self.get('product-list', '/api/shop/products/')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['name'], 'Novel')
+        self.assertTrue(res.is_rendered)
+
+    def test_product_detail(self):
+        """Test retrieving a product through the async view."""
+        res = self.get('product-detail', '/', pk=str(self.product.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], 'Novel')
+
+    def test_category_list(self):
+        """Test listing categories through the async view."""
+        res = self.get('category-list', '/api/shop/categories/')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(b'Books', res.content)
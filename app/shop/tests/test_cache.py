@@ -0,0 +1,172 @@
+"""
+Tests for the catalog response cache.
+"""
+import threading
+import time
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from core.models import Category, Order, Product
+from shop import cache as shop_cache
+from shop.checkout import checkout
+
+CATEGORIES_URL = reverse('shop:category-list')
+
+
+def product_url(product_id):
+    """Create and return a product detail URL."""
+    return reverse('shop:product-detail', args=[product_id])
+
+
+class CachedResponseTests(TestCase):
+    """Test the cached catalog endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.category = Category.objects.create(name='Electronics')
+        self.product = Product.objects.create(
+            user=self.user, category=self.category, name='Laptop',
+            price=Decimal('999.99'), stock=10,
+        )
+
+    def test_category_list_is_cached(self):
+        """Test a second category listing is not serialized again."""
+        res = self.client.get(CATEGORIES_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        # Only the aggregate behind the ETag reaches the database.
+        with self.assertNumQueries(1):
+            cached = self.client.get(CATEGORIES_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.data, res.data)
+
+    def test_category_change_invalidates_list(self):
+        """Test saving a category invalidates the cached list."""
+        self.client.get(CATEGORIES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Books')
+        res = self.client.get(CATEGORIES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_pages_are_cached_separately(self):
+        """Test the query string is part of the cache key."""
+        Category.objects.create(name='Books')
+        self.client.get(CATEGORIES_URL, {'page_size': 1})
+
+        res = self.client.get(CATEGORIES_URL, {'page_size': 2})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_product_detail_is_cached(self):
+        """Test a second product retrieval does not query the database."""
+        self.client.get(product_url(self.product.id))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(product_url(self.product.id))
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res.data['name'], 'Laptop')
+
+    def test_category_rename_invalidates_product_detail(self):
+        """Test product details embedding a category are invalidated."""
+        self.client.get(product_url(self.product.id))
+
+        self.category.name = 'Computers'
+        self.category.save()
+        res = self.client.get(product_url(self.product.id))
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['category_detail']['name'], 'Computers')
+
+    def test_checkout_invalidates_product_detail(self):
+        """Test stock changes made by a checkout are not hidden."""
+        self.client.get(product_url(self.product.id))
+
+        order = Order.objects.create(user=self.user)
+        checkout(order, [{'product_id': self.product.id, 'quantity': 3}])
+        res = self.client.get(product_url(self.product.id))
+
+        self.assertEqual(res.data['stock'], 7)
+
+    def test_missing_product_is_not_cached(self):
+        """Test error responses are not cached."""
+        self.client.get(product_url(999999))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(product_url(999999))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_hit_and_miss_counters(self):
+        """Test hits and misses are counted."""
+        before = shop_cache.stats()
+
+        self.client.get(CATEGORIES_URL)
+        self.client.get(CATEGORIES_URL)
+        self.client.get(CATEGORIES_URL)
+
+        after = shop_cache.stats()
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 2)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Test concurrent misses compute a response only once."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        """Test threads missing the same key share one computation."""
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return Response({'value': 42})
+
+        def worker():
+            results.append(shop_cache.compute_once('shop:test', compute))
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(data == {'value': 42} for data, _ in results))
+        self.assertEqual(sum(not hit for _, hit in results), 1)
+
+    def test_waits_for_other_process(self):
+        """Test a miss waits for a computation held by another process."""
+        cache.add('shop:test:lock', 1)
+        timer = threading.Timer(
+            0.1, cache.set_many, args=({'shop:test': {'value': 1}},)
+        )
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        data, hit = shop_cache.compute_once(
+            'shop:test', lambda: self.fail('computed twice')
+        )
+
+        self.assertTrue(hit)
+        self.assertEqual(data, {'value': 1})
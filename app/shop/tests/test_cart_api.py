@@ -0,0 +1,202 @@
+"""
+Tests for the cart API.
+"""
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Cart, CartItem, Category, Order, OrderItem, Product
+from shop.checkout import MAX_QUANTITY
+
+CART_URL = reverse('shop:cart-list')
+CART_ITEMS_URL = reverse('shop:cart-add')
+CART_SUMMARY_URL = reverse('shop:cart-summary')
+CART_MERGE_URL = reverse('shop:cart-merge')
+CART_CHECKOUT_URL = reverse('shop:cart-checkout')
+
+
+def cart_item_url(product_id):
+    """Create and return a cart item URL."""
+    return reverse('shop:cart-item', args=[product_id])
+
+
+def create_product(user, category, **params):
+    """Create and return a sample product."""
+    defaults = {
+        'name': 'Sample product',
+        'price': Decimal('5.00'),
+        'stock': 10,
+    }
+    defaults.update(params)
+    return Product.objects.create(user=user, category=category, **defaults)
+
+
+class PublicCartApiTests(TestCase):
+    """Test unauthenticated cart API requests."""
+
+    def test_auth_required(self):
+        """Test auth is required to access the cart."""
+        res = APIClient().get(CART_URL)
+
+        self.assertIn(res.status_code, (status.HTTP_401_UNAUTHORIZED,
+                                        status.HTTP_403_FORBIDDEN))
+
+
+class PrivateCartApiTests(TestCase):
+    """Test authenticated cart API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Electronics')
+        self.laptop = create_product(self.user, category, name='Laptop',
+                                     price=Decimal('900.00'), stock=3)
+        self.mouse = create_product(self.user, category, name='Mouse',
+                                    price=Decimal('25.50'), stock=10)
+
+    def add(self, product, quantity):
+        """Add a product to the cart through the API."""
+        return self.client.post(CART_ITEMS_URL, {
+            'product_id': product.id, 'quantity': quantity,
+        }, format='json')
+
+    def test_empty_cart(self):
+        """Test a new cart is empty."""
+        res = self.client.get(CART_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['items'], [])
+        self.assertEqual(res.data['summary'], {
+            'lines': 0, 'item_count': 0, 'total': Decimal('0.00'),
+        })
+
+    def test_add_items(self):
+        """Test adding a product twice sums its quantities."""
+        self.add(self.mouse, 1)
+        res = self.add(self.mouse, 2)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        item = res.data['items'][0]
+        self.assertEqual(item['product_id'], self.mouse.id)
+        self.assertEqual(item['quantity'], 3)
+        self.assertEqual(Decimal(item['line_total']), Decimal('76.50'))
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_add_invalid_items(self):
+        """Test unknown products and non positive quantities are refused."""
+        res = self.client.post(CART_ITEMS_URL, {
+            'product_id': 999999, 'quantity': 1,
+        }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.add(self.mouse, 0)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_quantity_limit(self):
+        """Test quantities above the limit are refused, summed or not."""
+        res = self.add(self.mouse, 2 ** 31)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.add(self.mouse, MAX_QUANTITY)
+        res = self.add(self.mouse, 1)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(CART_MERGE_URL, {'items': [
+            {'product_id': self.laptop.id, 'quantity': MAX_QUANTITY},
+            {'product_id': self.laptop.id, 'quantity': MAX_QUANTITY},
+        ]}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(CartItem.objects.get().quantity, MAX_QUANTITY)
+
+    def test_update_quantity(self):
+        """Test setting the quantity of a product in the cart."""
+        self.add(self.mouse, 5)
+
+        res = self.client.patch(cart_item_url(self.mouse.id),
+                                {'quantity': 2}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['items'][0]['quantity'], 2)
+
+    def test_remove_item(self):
+        """Test removing a product from the cart."""
+        self.add(self.mouse, 1)
+        self.add(self.laptop, 1)
+
+        res = self.client.delete(cart_item_url(self.mouse.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['product_id'] for item in res.data['items']],
+                         [self.laptop.id])
+        res = self.client.delete(cart_item_url(self.mouse.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_summary_is_a_single_query(self):
+        """Test the cart summary is computed by one aggregate query."""
+        self.add(self.laptop, 2)
+        self.add(self.mouse, 3)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(CART_SUMMARY_URL)
+
+        self.assertEqual(res.data, {
+            'lines': 2, 'item_count': 5, 'total': Decimal('1876.50'),
+        })
+
+    def test_merge_local_cart(self):
+        """Test merging a client side cart adds to the server cart."""
+        self.add(self.mouse, 1)
+
+        res = self.client.post(CART_MERGE_URL, {'items': [
+            {'product_id': self.mouse.id, 'quantity': 2},
+            {'product_id': self.laptop.id, 'quantity': 1},
+        ]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        quantities = {item['product_id']: item['quantity']
+                      for item in res.data['items']}
+        self.assertEqual(quantities, {self.mouse.id: 3, self.laptop.id: 1})
+
+    def test_checkout(self):
+        """Test checking out turns the cart into an order."""
+        self.add(self.laptop, 2)
+        self.add(self.mouse, 4)
+
+        res = self.client.post(CART_CHECKOUT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(id=res.data['id'])
+        self.assertEqual(order.user, self.user)
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 2)
+        self.laptop.refresh_from_db()
+        self.mouse.refresh_from_db()
+        self.assertEqual(self.laptop.stock, 1)
+        self.assertEqual(self.mouse.stock, 6)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_checkout_insufficient_stock(self):
+        """Test a failed checkout leaves the cart and stock untouched."""
+        self.add(self.laptop, 5)
+
+        res = self.client.post(CART_CHECKOUT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+        self.laptop.refresh_from_db()
+        self.assertEqual(self.laptop.stock, 3)
+
+    def test_checkout_empty_cart(self):
+        """Test an empty cart cannot be checked out."""
+        Cart.objects.create(user=self.user)
+
+        res = self.client.post(CART_CHECKOUT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
@@ -0,0 +1,200 @@
+"""
+Tests for the checkout engine.
+"""
+import threading
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from core.models import Category, Order, OrderItem, Product
+from shop.checkout import checkout, merge_line_items
+
+ORDERS_URL = reverse('shop:order-list')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_product(user, category, **params):
+    """Create and return a sample product."""
+    defaults = {
+        'name': 'Sample product',
+        'price': Decimal('5.99'),
+        'stock': 10,
+    }
+    defaults.update(params)
+    return Product.objects.create(user=user, category=category, **defaults)
+
+
+class CheckoutTests(TestCase):
+    """Test the checkout engine."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.category = Category.objects.create(name='Electronics')
+        self.order = Order.objects.create(user=self.user)
+
+    def test_merge_line_items(self):
+        """Test duplicate lines for a product are summed."""
+        items = [
+            {'product_id': 1, 'quantity': 2},
+            {'product_id': 2, 'quantity': 1},
+            {'product_id': 1, 'quantity': 3},
+        ]
+
+        self.assertEqual(merge_line_items(items), {1: 5, 2: 1})
+
+    def test_checkout_decrements_stock(self):
+        """Test checkout creates order items and decrements stock."""
+        laptop = create_product(self.user, self.category, stock=5)
+        mouse = create_product(self.user, self.category, stock=20)
+
+        checkout(self.order, [
+            {'product_id': laptop.id, 'quantity': 2},
+            {'product_id': mouse.id, 'quantity': 7},
+        ])
+
+        laptop.refresh_from_db()
+        mouse.refresh_from_db()
+        self.assertEqual(laptop.stock, 3)
+        self.assertEqual(mouse.stock, 13)
+        self.assertEqual(self.order.orderitem_set.count(), 2)
+
+    def test_checkout_query_count_is_constant(self):
+        """Test checkout runs the same queries for any number of items."""
+        products = [
+            create_product(self.user, self.category) for _ in range(20)
+        ]
+        items = [{'product_id': p.id, 'quantity': 1} for p in products]
+
+        # Savepoint, lock, update, insert, totals and savepoint release.
+        with self.assertNumQueries(6):
+            checkout(self.order, items)
+
+    def test_checkout_stores_totals_and_snapshots(self):
+        """Test checkout records order totals and product snapshots."""
+        laptop = create_product(self.user, self.category, name='Laptop',
+                                price=Decimal('900.00'))
+        mouse = create_product(self.user, self.category, name='Mouse',
+                               price=Decimal('25.50'))
+
+        checkout(self.order, [
+            {'product_id': laptop.id, 'quantity': 1},
+            {'product_id': mouse.id, 'quantity': 2},
+        ])
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, Decimal('951.00'))
+        self.assertEqual(self.order.item_count, 3)
+        item = self.order.orderitem_set.get(product=mouse)
+        self.assertEqual(item.unit_price, Decimal('25.50'))
+        self.assertEqual(item.product_name, 'Mouse')
+
+    def test_order_history_ignores_later_product_changes(self):
+        """Test editing a product does not rewrite past orders."""
+        product = create_product(self.user, self.category, name='Laptop',
+                                 price=Decimal('900.00'))
+        checkout(self.order, [{'product_id': product.id, 'quantity': 1}])
+
+        product.name = 'Laptop 2'
+        product.price = Decimal('1200.00')
+        product.save()
+
+        item = self.order.orderitem_set.get()
+        self.assertEqual(item.unit_price, Decimal('900.00'))
+        self.assertEqual(item.product_name, 'Laptop')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, Decimal('900.00'))
+
+    def test_checkout_insufficient_stock_rolls_back(self):
+        """Test nothing is written when one item is out of stock."""
+        in_stock = create_product(self.user, self.category, stock=10)
+        short = create_product(self.user, self.category, stock=1)
+
+        with self.assertRaises(ValidationError):
+            checkout(self.order, [
+                {'product_id': in_stock.id, 'quantity': 1},
+                {'product_id': short.id, 'quantity': 2},
+            ])
+
+        in_stock.refresh_from_db()
+        self.assertEqual(in_stock.stock, 10)
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_checkout_unknown_product(self):
+        """Test checking out a product that does not exist fails."""
+        with self.assertRaises(ValidationError):
+            checkout(self.order, [{'product_id': 999999, 'quantity': 1}])
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Test checkouts racing for the same products."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.category = Category.objects.create(name='Electronics')
+
+    def place_orders(self, payloads):
+        """POST every payload from its own thread, return the statuses."""
+        barrier = threading.Barrier(len(payloads))
+        statuses = []
+
+        def worker(payload):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                res = client.post(ORDERS_URL, payload, format='json')
+                statuses.append(res.status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(payload,))
+            for payload in payloads
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_same_product_is_never_oversold(self):
+        """Test many buyers of the last units cannot oversell them."""
+        product = create_product(self.user, self.category, stock=10)
+        payload = {'products': [{'product_id': product.id, 'quantity': 1}]}
+
+        statuses = self.place_orders([payload] * 25)
+
+        product.refresh_from_db()
+        self.assertEqual(statuses.count(status.HTTP_201_CREATED), 10)
+        self.assertEqual(statuses.count(status.HTTP_400_BAD_REQUEST), 15)
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(OrderItem.objects.count(), 10)
+
+    def test_opposite_item_order_does_not_deadlock(self):
+        """Test orders listing products in opposite orders all succeed."""
+        first = create_product(self.user, self.category, stock=100)
+        second = create_product(self.user, self.category, stock=100)
+        forward = {'products': [
+            {'product_id': first.id, 'quantity': 1},
+            {'product_id': second.id, 'quantity': 1},
+        ]}
+        backward = {'products': [
+            {'product_id': second.id, 'quantity': 1},
+            {'product_id': first.id, 'quantity': 1},
+        ]}
+
+        statuses = self.place_orders([forward, backward] * 10)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(statuses, [status.HTTP_201_CREATED] * 20)
+        self.assertEqual(first.stock, 80)
+        self.assertEqual(second.stock, 80)
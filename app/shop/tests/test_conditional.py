@@ -0,0 +1,153 @@
+"""
+Tests for conditional GET on the catalog list endpoints.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Category, Product
+
+PRODUCTS_URL = reverse('shop:product-list')
+CATEGORIES_URL = reverse('shop:category-list')
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.category = Category.objects.create(name='Electronics')
+        self.product = Product.objects.create(
+            user=self.user, category=self.category, name='Laptop',
+            price=Decimal('999.99'), stock=10,
+        )
+
+    def backdate_catalog(self):
+        """Move the catalog's modifications an hour back.
+
+        Last-Modified has a one second resolution, changes within the
+        same second as the previous ones would not show.
+        """
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Category.objects.update(updated_at=an_hour_ago)
+        Product.objects.update(updated_at=an_hour_ago)
+
+    def test_list_has_validators(self):
+        """Test list responses carry an ETag and a Last-Modified date."""
+        res = self.client.get(PRODUCTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertEqual(
+            res['Last-Modified'],
+            http_date(int(self.product.updated_at.timestamp())),
+        )
+
+    def test_unchanged_list_returns_not_modified(self):
+        """Test a matching If-None-Match is answered with 304."""
+        etag = self.client.get(PRODUCTS_URL)['ETag']
+
+        # Only the aggregate runs, the products are not serialized.
+        with self.assertNumQueries(1):
+            res = self.client.get(PRODUCTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_changed_product_changes_etag(self):
+        """Test updating a product invalidates the ETag."""
+        etag = self.client.get(PRODUCTS_URL)['ETag']
+
+        self.product.stock = 5
+        self.product.save()
+        res = self.client.get(PRODUCTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_deleted_product_changes_etag(self):
+        """Test deleting a product invalidates the ETag."""
+        Product.objects.create(
+            user=self.user, category=self.category, name='Phone',
+            price=Decimal('10.00'), stock=1,
+        )
+        etag = self.client.get(PRODUCTS_URL)['ETag']
+
+        self.product.delete()
+        res = self.client.get(PRODUCTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_pages_have_distinct_etags(self):
+        """Test the ETag depends on the requested page."""
+        first = self.client.get(PRODUCTS_URL, {'page_size': 1})
+        second = self.client.get(PRODUCTS_URL, {'page_size': 2})
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_if_modified_since(self):
+        """Test If-Modified-Since is honoured."""
+        last_modified = self.client.get(PRODUCTS_URL)['Last-Modified']
+
+        res = self.client.get(
+            PRODUCTS_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_renamed_category_changes_product_list(self):
+        """Test renaming an embedded category invalidates the list."""
+        self.backdate_catalog()
+        first = self.client.get(PRODUCTS_URL)
+
+        self.category.name = 'Computers'
+        self.category.save()
+        res = self.client.get(
+            PRODUCTS_URL, HTTP_IF_NONE_MATCH=first['ETag'],
+        )
+        since = self.client.get(
+            PRODUCTS_URL, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'][0]['category_detail']['name'], 'Computers'
+        )
+        self.assertEqual(since.status_code, status.HTTP_200_OK)
+
+    def test_deleted_product_changes_last_modified(self):
+        """Test If-Modified-Since sees deletions."""
+        Product.objects.create(
+            user=self.user, category=self.category, name='Phone',
+            price=Decimal('10.00'), stock=1,
+        )
+        self.backdate_catalog()
+        last_modified = self.client.get(PRODUCTS_URL)['Last-Modified']
+
+        self.product.delete()
+        res = self.client.get(
+            PRODUCTS_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGreater(parse_http_date(res['Last-Modified']),
+                           parse_http_date(last_modified))
+
+    def test_category_list_not_modified(self):
+        """Test the category list also supports conditional requests."""
+        etag = self.client.get(CATEGORIES_URL)['ETag']
+
+        res = self.client.get(CATEGORIES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
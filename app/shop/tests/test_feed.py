@@ -0,0 +1,130 @@
+"""
+Tests for the personalized product feed.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Category, Order, OrderItem, Product
+from shop.recommendations import build_recommendations
+
+FEED_URL = reverse('shop:product-feed')
+
+
+def create_user(email='user@example.com'):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(
+        email=email, password='testpass123'
+    )
+
+
+class PublicFeedApiTests(TestCase):
+    """Test unauthenticated feed requests."""
+
+    def test_auth_required(self):
+        """Test authentication is required for the feed."""
+        res = APIClient().get(FEED_URL)
+
+        self.assertIn(res.status_code, [status.HTTP_401_UNAUTHORIZED,
+                                        status.HTTP_403_FORBIDDEN])
+
+
+class PrivateFeedApiTests(TestCase):
+    """Test the feed of an authenticated user."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.other = create_user('other@example.com')
+
+        books = Category.objects.create(name='Books')
+        games = Category.objects.create(name='Games')
+        self.products = {
+            name: Product.objects.create(
+                user=self.other, category=category, name=name,
+                price=Decimal('10.00'), stock=10,
+            )
+            for name, category in [
+                ('Novel', books), ('Poems', books), ('Atlas', books),
+                ('Chess', games), ('Cards', games), ('Dice', games),
+            ]
+        }
+
+    def order(self, user, *names):
+        """Create an order of the named products for `user`."""
+        order = Order.objects.create(user=user)
+        for name in names:
+            OrderItem.objects.create(order=order,
+                                     product=self.products[name])
+        return order
+
+    def feed(self):
+        """Return the names of the products in the feed."""
+        res = self.client.get(FEED_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [product['name'] for product in res.data]
+
+    def test_feed_without_orders(self):
+        """Test users without orders get the most ordered products."""
+        self.order(self.other, 'Dice', 'Chess')
+        self.order(self.other, 'Dice')
+
+        self.assertEqual(self.feed()[:2], ['Dice', 'Chess'])
+
+    def test_feed_category_affinity(self):
+        """Test products of the categories ordered come first."""
+        self.order(self.other, 'Chess', 'Cards', 'Dice')
+        self.order(self.user, 'Novel')
+
+        feed = self.feed()
+
+        self.assertNotIn('Novel', feed)
+        self.assertEqual(set(feed[:2]), {'Poems', 'Atlas'})
+
+    def test_feed_copurchase(self):
+        """Test products bought with the user's ones rank first."""
+        self.order(self.other, 'Novel', 'Dice')
+        self.order(self.other, 'Novel', 'Dice')
+        self.order(self.user, 'Novel')
+        build_recommendations()
+
+        self.assertEqual(self.feed()[0], 'Dice')
+
+    def test_feed_cached(self):
+        """Test the feed is cached and served with one query."""
+        self.order(self.user, 'Novel')
+        self.client.get(FEED_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(FEED_URL)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_order_invalidates_feed(self):
+        """Test placing an order rebuilds the user's feed."""
+        self.order(self.user, 'Novel')
+        self.assertIn('Poems', self.feed())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order(self.user, 'Poems')
+
+        res = self.client.get(FEED_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertNotIn('Poems', [product['name'] for product in res.data])
+
+    def test_order_deletion_invalidates_feed_once(self):
+        """Test deleting an order costs no query per item for the feed."""
+        order = self.order(self.user, 'Poems', 'Atlas', 'Chess', 'Dice')
+        self.feed()
+
+        # Collecting the items, then deleting them and the order.
+        with self.assertNumQueries(3):
+            order.delete()
+
+        self.assertEqual(self.client.get(FEED_URL)['X-Cache'], 'MISS')
@@ -12,7 +12,7 @@ from core.models import (
     Product,
     Category
 )
-from shop.serializers import OrderSerializer
+from shop.serializers import OrderListSerializer
 
 ORDERS_URL = reverse('shop:order-list')
 
@@ -66,9 +66,34 @@ class PrivateOrderApiTests(TestCase):
         res = self.client.get(ORDERS_URL)
 
         orders = Order.objects.filter(user=self.user)
-        serializer = OrderSerializer(orders, many=True)
+        serializer = OrderListSerializer(orders, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_list_orders_fields(self):
+        """Test choosing the fields returned for each order."""
+        Order.objects.create(user=self.user)
+
+        res = self.client.get(ORDERS_URL, {'fields': 'id,total_amount'})
+
+        self.assertEqual(set(res.data['results'][0]), {'id', 'total_amount'})
+
+    def test_list_orders_expand_items(self):
+        """Test order items are only listed when expanded."""
+        order = Order.objects.create(user=self.user)
+        category = Category.objects.create(name='Sample Category')
+        product = create_product(self.user, category=category)
+        OrderItem.objects.create(order=order, product=product, quantity=2)
+
+        res = self.client.get(ORDERS_URL)
+        self.assertNotIn('items', res.data['results'][0])
+
+        res = self.client.get(ORDERS_URL, {'expand': 'items',
+                                           'fields': 'id'})
+        result = res.data['results'][0]
+        self.assertEqual(set(result), {'id', 'items'})
+        self.assertEqual(result['items'][0]['quantity'], 2)
+        self.assertEqual(result['items'][0]['product_data']['id'], product.id)
 
     def test_create_order(self):
         """Test creating a new order."""
@@ -100,8 +125,8 @@ class PrivateOrderApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         # Only one order should be retrieved
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['id'], order_user1.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['id'], order_user1.id)
 
     def test_order_exceeding_stock(self):
         """Test ordering a quantity greater
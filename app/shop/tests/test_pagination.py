@@ -0,0 +1,106 @@
+"""
+Tests for the pagination of the shop api.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Category, Order, Product
+from shop.pagination import ProductPagination
+
+PRODUCTS_URL = reverse('shop:product-list')
+CATEGORIES_URL = reverse('shop:category-list')
+ORDERS_URL = reverse('shop:order-list')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class PaginationTests(TestCase):
+    """Test cursor pagination of the list endpoints."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Electronics')
+
+    def create_products(self, count):
+        """Create `count` products."""
+        return Product.objects.bulk_create([
+            Product(
+                user=self.user,
+                category=self.category,
+                name=f'Product {i}',
+                price=Decimal('1.00'),
+                stock=1,
+            )
+            for i in range(count)
+        ])
+
+    def collect_pages(self, url):
+        """Follow the `next` links from `url` and return every page."""
+        pages = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+            url = res.data['next']
+        return pages
+
+    def test_products_are_paginated(self):
+        """Test walking the product pages returns every product once."""
+        products = self.create_products(25)
+
+        pages = self.collect_pages(f'{PRODUCTS_URL}?page_size=10')
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        ids = [item['id'] for page in pages for item in page]
+        self.assertEqual(ids, sorted((p.id for p in products), reverse=True))
+
+    def test_new_products_do_not_shift_pages(self):
+        """Test a product created between two requests is not repeated."""
+        self.create_products(10)
+        res = self.client.get(f'{PRODUCTS_URL}?page_size=5')
+        first_page = [item['id'] for item in res.data['results']]
+
+        self.create_products(3)
+        res = self.client.get(res.data['next'])
+        second_page = [item['id'] for item in res.data['results']]
+
+        self.assertEqual(len(second_page), 5)
+        self.assertFalse(set(first_page) & set(second_page))
+
+    @patch.object(ProductPagination, 'max_page_size', 2)
+    def test_page_size_is_capped(self):
+        """Test clients cannot request more than the maximum page size."""
+        self.create_products(3)
+
+        res = self.client.get(f'{PRODUCTS_URL}?page_size=100')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_categories_are_paginated(self):
+        """Test categories are paginated by name."""
+        for name in ['Books', 'Games', 'Toys']:
+            Category.objects.create(name=name)
+
+        pages = self.collect_pages(f'{CATEGORIES_URL}?page_size=2')
+
+        names = [item['name'] for page in pages for item in page]
+        self.assertEqual(names, ['Toys', 'Games', 'Electronics', 'Books'])
+
+    def test_orders_are_paginated(self):
+        """Test orders are paginated, most recent first."""
+        orders = [Order.objects.create(user=self.user) for _ in range(5)]
+
+        pages = self.collect_pages(f'{ORDERS_URL}?page_size=2')
+
+        ids = [item['id'] for page in pages for item in page]
+        self.assertEqual(ids, [order.id for order in reversed(orders)])
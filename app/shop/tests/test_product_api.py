@@ -1,9 +1,12 @@
 """
 Tests for product APIs.
 """
+import csv
+import io
+import json
 from decimal import Decimal
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -11,6 +14,7 @@ from core.models import Product, Category
 from shop.serializers import ProductSerializer
 
 PRODUCTS_URL = reverse('shop:product-list')
+EXPORT_URL = reverse('shop:product-export')
 
 
 def detail_url(product_id):
@@ -75,7 +79,7 @@ class PrivateProductApiTests(TestCase):
         products = Product.objects.filter(user=self.user).order_by('-id')
         serializer = ProductSerializer(products, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_create_product(self):
         """Test creating a new product."""
@@ -138,3 +142,68 @@ class PrivateProductApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
         self.assertTrue(Product.objects.filter(id=product.id).exists())
+
+
+class ProductExportApiTests(TestCase):
+    """Test the streaming catalog export."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Electronics')
+        self.products = [
+            create_product(user=self.user, category=self.category,
+                           name=f'Product {i}')
+            for i in range(5)
+        ]
+
+    def test_export_ndjson(self):
+        """Test exporting the catalog as newline delimited JSON."""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [
+            json.loads(line)
+            for line in b''.join(res.streaming_content).splitlines()
+        ]
+        self.assertEqual([row['id'] for row in rows],
+                         [p.id for p in self.products])
+        self.assertEqual(rows[0]['category_name'], 'Electronics')
+        self.assertEqual(rows[0]['price'], '5.99')
+
+    def test_export_csv(self):
+        """Test exporting the catalog as CSV."""
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[-1]['name'], 'Product 4')
+
+    @override_settings(SHOP_EXPORT_CHUNK_SIZE=2)
+    def test_export_streams_in_chunks(self):
+        """Test rows are sent in chunks rather than in a single body."""
+        res = self.client.get(EXPORT_URL)
+
+        chunks = list(res.streaming_content)
+        self.assertEqual(len(chunks), 3)
+
+    def test_export_unknown_type(self):
+        """Test requesting an unsupported export type fails."""
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_requires_authentication(self):
+        """Test anonymous users cannot export the catalog."""
+        self.client.force_authenticate(None)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertIn(res.status_code, (status.HTTP_401_UNAUTHORIZED,
+                                        status.HTTP_403_FORBIDDEN))
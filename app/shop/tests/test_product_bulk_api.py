@@ -0,0 +1,214 @@
+"""
+Tests for the bulk product APIs.
+"""
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Product, Category
+from shop.serializers import ProductSerializer
+
+BULK_URL = reverse('shop:product-bulk')
+
+
+def create_product(user, category, **params):
+    """Create and return a sample product."""
+    defaults = {
+        'name': 'Sample product',
+        'description': 'Sample product description',
+        'price': Decimal('5.99'),
+        'stock': 10,
+    }
+    defaults.update(params)
+    return Product.objects.create(user=user, category=category, **defaults)
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class PublicProductBulkApiTests(TestCase):
+    """Test unauthenticated bulk API access."""
+
+    def test_auth_required(self):
+        """Test that authentication is required for bulk changes."""
+        res = APIClient().post(BULK_URL, [], format='json')
+
+        self.assertIn(res.status_code, (status.HTTP_401_UNAUTHORIZED,
+                                        status.HTTP_403_FORBIDDEN))
+
+
+class PrivateProductBulkApiTests(TestCase):
+    """Test authenticated bulk API access."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='test123')
+        self.other_user = create_user(
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Electronics')
+
+    def test_bulk_create(self):
+        """Test creating a batch of products."""
+        payload = [
+            {'name': f'Product {i}', 'price': '1.50', 'stock': i,
+             'category_id': self.category.id}
+            for i in range(20)
+        ]
+
+        # Category lookup, savepoint, insert and savepoint release.
+        with self.assertNumQueries(4):
+            res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 20)
+        self.assertEqual(res.data[3]['status'], 'created')
+        product = Product.objects.get(id=res.data[3]['id'])
+        self.assertEqual(product.name, 'Product 3')
+        self.assertEqual(product.user, self.user)
+        self.assertEqual(product.category, self.category)
+
+    def test_bulk_create_invalid_item_creates_nothing(self):
+        """Test one invalid item rejects the whole batch."""
+        payload = [
+            {'name': 'Good', 'price': '1.00', 'stock': 1,
+             'category_id': self.category.id},
+            {'name': 'Bad', 'price': 'free', 'stock': 1,
+             'category_id': self.category.id},
+            {'name': 'No category', 'price': '1.00', 'stock': 1,
+             'category_id': 999999},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0]['status'], 'valid')
+        self.assertIn('price', res.data[1]['errors'])
+        self.assertFalse(Product.objects.exists())
+
+        payload.pop(1)
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('category_id', res.data[1]['errors'])
+        self.assertFalse(Product.objects.exists())
+
+    @override_settings(SHOP_BULK_MAX_ITEMS=2)
+    def test_bulk_batch_size_limit(self):
+        """Test batches over the configured size are rejected."""
+        res = self.client.delete(BULK_URL, [1, 2, 3], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update(self):
+        """Test partially updating a batch of products."""
+        products = [
+            create_product(self.user, self.category) for _ in range(10)
+        ]
+        books = Category.objects.create(name='Books')
+        payload = [
+            {'id': product.id, 'stock': 50, 'category_id': books.id}
+            for product in products
+        ]
+
+        # Savepoint, products lookup and lock, category lookup, update
+        # and savepoint release.
+        with self.assertNumQueries(5):
+            res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(all(r['status'] == 'updated' for r in res.data))
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(product.stock, 50)
+            self.assertEqual(product.category, books)
+            self.assertEqual(product.name, 'Sample product')
+
+    def test_bulk_update_writes_only_sent_fields(self):
+        """Test fields an item did not send keep concurrent changes."""
+        laptop = create_product(self.user, self.category, name='Laptop')
+        phone = create_product(self.user, self.category, name='Phone')
+        is_valid = ProductSerializer.is_valid
+
+        def sell_laptop(serializer, *args, **kwargs):
+            # Checkout takes stock after the products were read.
+            Product.objects.filter(id=laptop.id).update(stock=3)
+            return is_valid(serializer, *args, **kwargs)
+
+        with mock.patch.object(ProductSerializer, 'is_valid', sell_laptop):
+            res = self.client.patch(BULK_URL, [
+                {'id': laptop.id, 'price': '7.00'},
+                {'id': phone.id, 'stock': 20},
+            ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        laptop.refresh_from_db()
+        phone.refresh_from_db()
+        self.assertEqual(laptop.price, Decimal('7.00'))
+        self.assertEqual(laptop.stock, 3)
+        self.assertEqual(phone.stock, 20)
+        self.assertEqual(phone.price, Decimal('5.99'))
+
+    def test_bulk_update_not_owner(self):
+        """Test a batch with someone else's product is rejected."""
+        mine = create_product(self.user, self.category)
+        theirs = create_product(self.other_user, self.category)
+        payload = [
+            {'id': mine.id, 'name': 'Renamed'},
+            {'id': theirs.id, 'name': 'Renamed'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(res.data[1]['status'], 'forbidden')
+        mine.refresh_from_db()
+        self.assertEqual(mine.name, 'Sample product')
+
+    def test_bulk_update_superuser(self):
+        """Test superusers can update any product in bulk."""
+        product = create_product(self.other_user, self.category)
+        admin = get_user_model().objects.create_superuser(
+            'admin@example.com', 'testpass123'
+        )
+        self.client.force_authenticate(admin)
+
+        res = self.client.patch(BULK_URL, [{'id': product.id, 'stock': 0}],
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+
+    def test_bulk_delete(self):
+        """Test deleting a batch of products."""
+        products = [
+            create_product(self.user, self.category) for _ in range(5)
+        ]
+        kept = create_product(self.user, self.category)
+
+        res = self.client.delete(BULK_URL, [p.id for p in products],
+                                 format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['status'], 'deleted')
+        self.assertEqual(list(Product.objects.all()), [kept])
+
+    def test_bulk_delete_unknown_product(self):
+        """Test deleting a product that does not exist deletes nothing."""
+        product = create_product(self.user, self.category)
+
+        res = self.client.delete(BULK_URL, [product.id, 999999],
+                                 format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[1]['errors'], {'id': ['Not found.']})
+        self.assertTrue(Product.objects.filter(id=product.id).exists())
@@ -0,0 +1,134 @@
+"""
+Tests for filtering and sorting the product list.
+"""
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Category, Product
+
+PRODUCTS_URL = reverse('shop:product-list')
+
+
+def create_product(user, category, **params):
+    """Create and return a sample product."""
+    defaults = {
+        'name': 'Sample product',
+        'price': Decimal('10.00'),
+        'stock': 5,
+    }
+    defaults.update(params)
+    return Product.objects.create(user=user, category=category, **defaults)
+
+
+class ProductFilterTests(TestCase):
+    """Test the product list filters and ordering."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass123'
+        )
+        self.books = Category.objects.create(name='Books')
+        self.games = Category.objects.create(name='Games')
+
+    def list_ids(self, **params):
+        """Walk every page of the product list and return the ids."""
+        res = self.client.get(PRODUCTS_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [item['id'] for item in res.data['results']]
+        return ids
+
+    def test_filter_by_category(self):
+        """Test filtering products by category."""
+        book = create_product(self.user, self.books)
+        create_product(self.user, self.games)
+
+        self.assertEqual(self.list_ids(category_id=self.books.id), [book.id])
+
+    def test_filter_by_price_range(self):
+        """Test filtering products within a price range, inclusive."""
+        create_product(self.user, self.books, price=Decimal('5.00'))
+        low = create_product(self.user, self.books, price=Decimal('10.00'))
+        high = create_product(self.user, self.books, price=Decimal('20.00'))
+        create_product(self.user, self.books, price=Decimal('20.01'))
+
+        ids = self.list_ids(min_price='10', max_price='20')
+
+        self.assertCountEqual(ids, [low.id, high.id])
+
+    def test_filter_by_stock(self):
+        """Test filtering products in and out of stock."""
+        available = create_product(self.user, self.books, stock=3)
+        sold_out = create_product(self.user, self.books, stock=0)
+
+        self.assertEqual(self.list_ids(in_stock='true'), [available.id])
+        self.assertEqual(self.list_ids(in_stock='false'), [sold_out.id])
+
+    def test_filter_by_owner(self):
+        """Test filtering products by the user selling them."""
+        create_product(self.user, self.books)
+        other = create_product(self.other_user, self.books)
+
+        self.assertEqual(self.list_ids(user=self.other_user.id), [other.id])
+
+    def test_filters_combine(self):
+        """Test several filters narrow the list together."""
+        match = create_product(self.user, self.books,
+                               price=Decimal('15.00'), stock=2)
+        create_product(self.user, self.books, price=Decimal('15.00'),
+                       stock=0)
+        create_product(self.user, self.games, price=Decimal('15.00'),
+                       stock=2)
+        create_product(self.other_user, self.books,
+                       price=Decimal('15.00'), stock=2)
+
+        ids = self.list_ids(category_id=self.books.id, min_price='10',
+                            in_stock='yes', user=self.user.id)
+
+        self.assertEqual(ids, [match.id])
+
+    def test_invalid_filter_values(self):
+        """Test malformed filter values are rejected."""
+        for params in ({'category_id': 'books'}, {'min_price': 'cheap'},
+                       {'in_stock': 'maybe'}, {'user': '1.5'}):
+            res = self.client.get(PRODUCTS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+    def test_order_by_price(self):
+        """Test sorting by price pages through ties exactly once."""
+        prices = ['3.00', '1.00', '2.00', '1.00', '2.00', '1.00', '3.00']
+        products = [
+            create_product(self.user, self.books, price=Decimal(price))
+            for price in prices
+        ]
+
+        ids = self.list_ids(ordering='price', page_size=2)
+
+        expected = sorted(products, key=lambda p: (p.price, p.id))
+        self.assertEqual(ids, [p.id for p in expected])
+        ids = self.list_ids(ordering='-price', page_size=2)
+        expected = sorted(products, key=lambda p: (p.price, p.id),
+                          reverse=True)
+        self.assertEqual(ids, [p.id for p in expected])
+
+    def test_unknown_ordering_is_ignored(self):
+        """Test sorting on a field that is not allowed keeps the default."""
+        first = create_product(self.user, self.books)
+        second = create_product(self.user, self.books)
+
+        ids = self.list_ids(ordering='description')
+
+        self.assertEqual(ids, [second.id, first.id])
@@ -0,0 +1,287 @@
+"""
+Tests for the background product image uploads.
+"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from unittest.mock import patch
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Category, ImageAsset, ImageUploadJob, Product
+from shop.images import file_digest, stage_file
+from shop.processing import process_image
+from shop.storage import get_image_storage
+
+
+def upload_image_url(product_id):
+    """Create and return an image upload URL."""
+    return reverse('shop:product-upload-image', args=[product_id])
+
+
+def image_job_url(job_id):
+    """Create and return an image job status URL."""
+    return reverse('shop:image-job-detail', args=[job_id])
+
+
+def sample_image(name='photo.png'):
+    """Return a small PNG image ready to be uploaded."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (10, 10), 'red').save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type='image/png')
+
+
+class ProcessImageTests(SimpleTestCase):
+    """Test generating the variants of an image."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_photo_variants(self):
+        """Test photos are rotated, shrunk and stripped of metadata."""
+        path = os.path.join(self.dir, 'photo.jpg')
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotated 90 degrees.
+        exif[0x010F] = 'Camera maker'
+        Image.new('RGB', (2000, 1000), 'blue').save(path, exif=exif)
+
+        variants = process_image(path, max_size=1600, thumbnail_size=300,
+                                 quality=80)
+
+        with Image.open(variants['image']) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (800, 1600))
+            self.assertNotIn('exif', image.info)
+        with Image.open(variants['thumbnail']) as image:
+            self.assertEqual(image.size, (150, 300))
+        with Image.open(variants['webp']) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (800, 1600))
+
+    def test_transparent_variants(self):
+        """Test transparent images stay transparent."""
+        path = os.path.join(self.dir, 'logo.png')
+        Image.new('RGBA', (100, 100), (0, 0, 0, 0)).save(path)
+
+        variants = process_image(path, max_size=1600, thumbnail_size=30,
+                                 quality=80)
+
+        with Image.open(variants['thumbnail']) as image:
+            self.assertEqual(image.format, 'PNG')
+            self.assertEqual(image.mode, 'RGBA')
+            self.assertEqual(image.size, (30, 30))
+
+
+class ImageDirsMixin:
+    """Stage and store images in temporary directories."""
+
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.staging_dir = os.path.join(root, 'staging')
+        self.local_dir = os.path.join(root, 'images')
+        settings = override_settings(
+            SHOP_IMAGE_BACKEND='local',
+            SHOP_IMAGE_STAGING_DIR=self.staging_dir,
+            SHOP_IMAGE_LOCAL_DIR=self.local_dir,
+            SHOP_IMAGE_LOCAL_URL='/media/product_images/',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            user=self.user, category=Category.objects.create(name='Books'),
+            name='Novel', price=Decimal('12.00'), stock=3,
+        )
+
+
+@override_settings(SHOP_IMAGE_WORKERS=0, SHOP_IMAGE_PROCESSES=0)
+class ImageUploadTests(ImageDirsMixin, TestCase):
+    """Test staging images and uploading them after the request."""
+
+    def upload(self):
+        """Upload a sample image, running the job on commit."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(upload_image_url(self.product.id),
+                                    {'image': sample_image()},
+                                    format='multipart')
+
+    def test_upload_returns_job(self):
+        """Test the upload is accepted and the image attached after."""
+        res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res['Location'], image_job_url(res.data['id']))
+        job = ImageUploadJob.objects.get(id=res.data['id'])
+        self.assertEqual(job.status, ImageUploadJob.DONE)
+        stem = os.path.splitext(os.path.basename(job.staged_path))[0]
+        self.assertEqual(sorted(os.listdir(self.local_dir)), [
+            f'{stem}.webp', f'{stem}_full.jpg', f'{stem}_thumb.jpg',
+        ])
+        self.assertEqual(os.listdir(self.staging_dir), [])
+        self.assertEqual(job.image_url,
+                         f'/media/product_images/{stem}_full.jpg')
+        self.product.refresh_from_db()
+        self.assertIn(stem, str(self.product.image))
+        self.assertEqual(self.product.image_thumbnail,
+                         f'/media/product_images/{stem}_thumb.jpg')
+        self.assertEqual(self.product.image_webp,
+                         f'/media/product_images/{stem}.webp')
+
+    @override_settings(SHOP_IMAGE_BACKEND='memory')
+    def test_upload_to_memory_storage(self):
+        """Test images can be kept in memory, without any disk or network."""
+        job_id = self.upload().data['id']
+
+        job = ImageUploadJob.objects.get(id=job_id)
+        self.assertEqual(job.status, ImageUploadJob.DONE)
+        self.assertFalse(os.path.exists(self.local_dir))
+        _, names = get_image_storage().listdir('')
+        self.assertEqual(len(names), 3)
+
+    def test_same_image_reuses_asset(self):
+        """Test uploading known content reuses its stored variants."""
+        self.upload()
+        other = Product.objects.create(
+            user=self.user, category=self.product.category, name='Comic',
+            price=Decimal('8.00'), stock=1,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(upload_image_url(other.id),
+                                   {'image': sample_image('copy.png')},
+                                   format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], ImageUploadJob.DONE)
+        asset = ImageAsset.objects.get()
+        self.assertEqual(res.data['image_url'], asset.image_url)
+        self.assertEqual(len(os.listdir(self.local_dir)), 3)
+        self.assertEqual(os.listdir(self.staging_dir), [])
+        self.assertEqual(set(asset.products.all()), {self.product, other})
+        other.refresh_from_db()
+        self.assertEqual(other.image_webp, asset.webp_url)
+
+    def test_different_images_get_their_assets(self):
+        """Test different content is stored separately."""
+        self.upload()
+        buffer = io.BytesIO()
+        Image.new('RGB', (10, 10), 'blue').save(buffer, format='PNG')
+        image = SimpleUploadedFile('blue.png', buffer.getvalue())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(upload_image_url(self.product.id),
+                                   {'image': image}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(ImageAsset.objects.count(), 2)
+        self.assertEqual(len(os.listdir(self.local_dir)), 6)
+
+    def test_stage_file_digest(self):
+        """Test staged files are hashed chunk by chunk."""
+        content = os.urandom(300 * 1024)
+        file = SimpleUploadedFile('large.bin', content)
+
+        path, digest = stage_file(file)
+
+        self.assertEqual(digest, hashlib.sha256(content).hexdigest())
+        self.assertEqual(file_digest(path), digest)
+
+    def test_upload_without_image(self):
+        """Test a request without an image is rejected."""
+        res = self.client.post(upload_image_url(self.product.id), {},
+                               format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageUploadJob.objects.exists())
+
+    def test_upload_invalid_image(self):
+        """Test files that are not images are rejected."""
+        file = SimpleUploadedFile('notes.png', b'not an image',
+                                  content_type='image/png')
+
+        res = self.client.post(upload_image_url(self.product.id),
+                               {'image': file}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageUploadJob.objects.exists())
+
+    def test_poll_job_status(self):
+        """Test polling a job, only visible to the user who started it."""
+        job_id = self.upload().data['id']
+
+        res = self.client.get(image_job_url(job_id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], ImageUploadJob.DONE)
+
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass123'
+        )
+        self.client.force_authenticate(other)
+        res = self.client.get(image_job_url(job_id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_failed_upload_can_be_retried(self):
+        """Test a failed upload keeps its image for the retry command."""
+        def fail(path):
+            raise ConnectionError('Storage unavailable.')
+
+        with patch('shop.images.store_file', fail), \
+                self.assertLogs('shop.images', 'ERROR'):
+            job_id = self.upload().data['id']
+
+        job = ImageUploadJob.objects.get(id=job_id)
+        self.assertEqual(job.status, ImageUploadJob.FAILED)
+        self.assertEqual(job.error, 'Storage unavailable.')
+        self.assertTrue(os.path.exists(job.staged_path))
+
+        call_command('process_image_jobs', '--retry-failed',
+                     stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageUploadJob.DONE)
+        self.assertEqual(job.attempts, 2)
+
+
+@override_settings(SHOP_IMAGE_WORKERS=1, SHOP_IMAGE_PROCESSES=1)
+class ImageUploadWorkerTests(ImageDirsMixin, TransactionTestCase):
+    """Test uploads run by the background thread and process pools."""
+
+    def test_upload_runs_in_background(self):
+        """Test the job completes after the response is returned."""
+        res = self.client.post(upload_image_url(self.product.id),
+                               {'image': sample_image()}, format='multipart')
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+        job = ImageUploadJob.objects.get(id=res.data['id'])
+        deadline = time.monotonic() + 5
+        while job.status != ImageUploadJob.DONE:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+            job.refresh_from_db()
+
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.image)
+        self.assertTrue(self.product.image_webp.endswith('.webp'))
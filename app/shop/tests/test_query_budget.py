@@ -0,0 +1,114 @@
+"""
+Tests for the query budget of the shop read endpoints.
+"""
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Order, OrderItem, Product, Category
+
+# Maximum number of SQL queries each endpoint may run, whatever the
+# number of rows it returns. List endpoints run one more query to
+# compute their ETag.
+QUERY_BUDGETS = {
+    'shop:product-list': 2,
+    'shop:product-detail': 1,
+    'shop:category-list': 2,
+    'shop:order-list': 1,
+    'shop:order-detail': 4,
+}
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_products(user, count):
+    """Create `count` products spread over several categories."""
+    categories = [
+        Category.objects.create(name=f'Category {i}') for i in range(5)
+    ]
+    return Product.objects.bulk_create([
+        Product(
+            user=user,
+            category=categories[i % len(categories)],
+            name=f'Product {i}',
+            price=Decimal('9.99'),
+            stock=10,
+        )
+        for i in range(count)
+    ])
+
+
+class QueryBudgetTests(TestCase):
+    """Test that read endpoints stay within their query budget."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.products = create_products(self.user, 50)
+
+    def create_orders(self, count):
+        """Create `count` orders of a few products each."""
+        orders = Order.objects.bulk_create([
+            Order(user=self.user) for _ in range(count)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1,
+                      unit_price=product.price, product_name=product.name)
+            for order in orders
+            for product in self.products[:3]
+        ])
+        return orders
+
+    def assertWithinBudget(self, url_name, *args, budget=None, **params):
+        """Request the endpoint and check it stays within its budget."""
+        url = reverse(url_name, args=args)
+        if budget is None:
+            budget = QUERY_BUDGETS[url_name]
+        with self.assertNumQueries(budget):
+            res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_product_list_within_budget(self):
+        """Test listing products does not run a query per product."""
+        self.assertWithinBudget('shop:product-list')
+
+    def test_product_detail_within_budget(self):
+        """Test retrieving a product loads its category in the same query."""
+        self.assertWithinBudget('shop:product-detail', self.products[0].id)
+
+    def test_category_list_within_budget(self):
+        """Test listing categories runs a single query."""
+        self.assertWithinBudget('shop:category-list')
+
+    def test_order_list_within_budget(self):
+        """Test listing orders reads only the order and user tables."""
+        self.create_orders(30)
+        self.client.force_authenticate(self.user)
+
+        res = self.assertWithinBudget('shop:order-list')
+
+        self.assertEqual(len(res.data['results']), 30)
+
+    def test_expanded_order_list_within_budget(self):
+        """Test listing orders with their items prefetches them."""
+        self.create_orders(30)
+        self.client.force_authenticate(self.user)
+
+        # Orders, then their items, products and categories.
+        self.assertWithinBudget('shop:order-list', budget=4, expand='items')
+
+    def test_order_detail_within_budget(self):
+        """Test retrieving an order prefetches its items."""
+        order = self.create_orders(1)[0]
+        self.client.force_authenticate(self.user)
+
+        self.assertWithinBudget('shop:order-detail', order.id)
@@ -0,0 +1,206 @@
+"""
+Tests for the product recommendations.
+"""
+from decimal import Decimal
+from io import StringIO
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import (
+    Category,
+    Order,
+    OrderItem,
+    Product,
+    ProductRecommendation,
+    RecommendationBuild,
+)
+from shop.recommendations import (
+    build_recommendations,
+    cooccurrence,
+    normalize,
+    top_k,
+)
+
+
+def recommendations_url(product_id):
+    """Create and return a product recommendations URL."""
+    return reverse('shop:product-recommendations', args=[product_id])
+
+
+class CooccurrenceTests(SimpleTestCase):
+    """Test the co-occurrence matrix and its scores."""
+
+    def setUp(self):
+        # Orders 1 and 2 hold products 10 and 20, order 3 holds 10 and 30.
+        self.products, self.matrix, self.counts, self.orders = cooccurrence(
+            np.array([1, 1, 2, 2, 3, 3]), np.array([10, 20, 10, 20, 10, 30])
+        )
+
+    def test_cooccurrence(self):
+        """Test pairs are counted once per order, never with themselves."""
+        self.assertEqual(self.products.tolist(), [10, 20, 30])
+        self.assertEqual(self.matrix.toarray().tolist(),
+                         [[0, 2, 1], [2, 0, 0], [1, 0, 0]])
+        self.assertEqual(self.counts.tolist(), [3, 2, 1])
+        self.assertEqual(self.orders, 3)
+
+    def test_cosine(self):
+        """Test cosine scores divide by the products' popularity."""
+        scores = normalize(self.matrix, self.counts, self.orders, 'cosine')
+
+        self.assertAlmostEqual(scores[0, 1], 2 / np.sqrt(6))
+        self.assertAlmostEqual(scores[0, 2], 1 / np.sqrt(3))
+
+    def test_lift(self):
+        """Test lift compares pairs to independent purchases."""
+        scores = normalize(self.matrix, self.counts, self.orders, 'lift')
+
+        self.assertAlmostEqual(scores[0, 1], 2 * 3 / (3 * 2))
+        self.assertAlmostEqual(scores[1, 0], scores[0, 1])
+
+    def test_top_k(self):
+        """Test the best entries of a row come first."""
+        scores = normalize(self.matrix, self.counts, self.orders, 'cosine')
+
+        columns, values = top_k(scores, 0, 1)
+
+        self.assertEqual(columns.tolist(), [1])
+        columns, _ = top_k(scores, 0, 5)
+        self.assertEqual(columns.tolist(), [1, 2])
+
+
+class RecommendationTests(TestCase):
+    """Test building and serving recommendations."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        category = Category.objects.create(name='Electronics')
+        self.laptop, self.mouse, self.bag, self.desk = [
+            Product.objects.create(
+                user=self.user, category=category, name=name,
+                price=Decimal('10.00'), stock=100,
+            )
+            for name in ['Laptop', 'Mouse', 'Bag', 'Desk']
+        ]
+        self.order(self.laptop, self.mouse)
+        self.order(self.laptop, self.mouse)
+        self.order(self.laptop, self.bag)
+
+    def order(self, *products):
+        """Create an order of the given products."""
+        order = Order.objects.create(user=self.user)
+        for product in products:
+            OrderItem.objects.create(order=order, product=product)
+        return order
+
+    def recommended(self, product):
+        """Return the names of the products recommended with `product`."""
+        res = self.client.get(recommendations_url(product.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data]
+
+    def test_recommendations(self):
+        """Test products bought together most often come first."""
+        build_recommendations()
+
+        self.assertEqual(self.recommended(self.laptop), ['Mouse', 'Bag'])
+        self.assertEqual(self.recommended(self.mouse), ['Laptop'])
+        self.assertEqual(self.recommended(self.desk), [])
+
+    def test_recommendations_single_query(self):
+        """Test recommendations are served by one query."""
+        build_recommendations()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(recommendations_url(self.laptop.id))
+
+        self.assertAlmostEqual(res.data[0]['score'], 2 / np.sqrt(6))
+
+    def test_top_k_limit(self):
+        """Test only the best `k` recommendations are stored."""
+        build_recommendations(k=1)
+
+        self.assertEqual(self.recommended(self.laptop), ['Mouse'])
+
+    def test_min_count(self):
+        """Test pairs bought together too rarely are left out."""
+        build_recommendations(min_count=2)
+
+        self.assertEqual(self.recommended(self.laptop), ['Mouse'])
+
+    def test_incremental_build(self):
+        """Test an incremental build only updates the products involved."""
+        build_recommendations()
+        self.order(self.bag, self.desk)
+
+        build = build_recommendations(incremental=True)
+
+        self.assertTrue(build.incremental)
+        # The bag and desk, and the laptop bought with the bag.
+        self.assertEqual(build.products_updated, 3)
+        self.assertEqual(self.recommended(self.desk), ['Bag'])
+        self.assertEqual(self.recommended(self.bag), ['Desk', 'Laptop'])
+        self.assertEqual(self.recommended(self.mouse), ['Laptop'])
+
+    def test_incremental_build_without_previous(self):
+        """Test the first incremental build is a full one."""
+        build = build_recommendations(incremental=True)
+
+        self.assertFalse(build.incremental)
+        self.assertEqual(build.products_updated, 3)
+
+    def test_incremental_build_with_other_min_count(self):
+        """Test an incremental build ignores builds of another min count."""
+        build_recommendations(min_count=2)
+        self.order(self.bag, self.desk)
+
+        build = build_recommendations(incremental=True)
+
+        self.assertFalse(build.incremental)
+        self.assertEqual(build.min_count, 1)
+
+    def test_incremental_build_after_deletion(self):
+        """Test an incremental build is a full one after orders go."""
+        order = self.order(self.bag, self.desk)
+        build_recommendations()
+        order.delete()
+        self.order(self.mouse, self.desk)
+
+        build = build_recommendations(incremental=True)
+
+        self.assertFalse(build.incremental)
+        self.assertEqual(self.recommended(self.bag), ['Laptop'])
+
+    def test_incremental_build_rescales_lift(self):
+        """Test lift scores left untouched follow the number of orders."""
+        build_recommendations(metric='lift')
+        self.order(self.bag, self.desk)
+
+        build = build_recommendations(metric='lift', incremental=True)
+        scores = dict(ProductRecommendation.objects.values_list(
+            'product_id', 'score'
+        ).filter(recommended_id=self.laptop.id))
+
+        self.assertTrue(build.incremental)
+        # Bought 2 times out of 4 orders, with products in 2 and 3.
+        self.assertAlmostEqual(scores[self.mouse.id], 2 * 4 / (2 * 3))
+
+    def test_command(self):
+        """Test the command builds and records the recommendations."""
+        out = StringIO()
+        call_command('build_recommendations', '--metric', 'lift',
+                     '--top-k', '5', stdout=out)
+
+        build = RecommendationBuild.objects.get()
+        self.assertEqual((build.metric, build.top_k), ('lift', 5))
+        self.assertEqual(build.last_order_item_id,
+                         OrderItem.objects.order_by('-id')[0].id)
+        self.assertTrue(ProductRecommendation.objects.exists())
+        self.assertIn('3 products', out.getvalue())
@@ -0,0 +1,103 @@
+"""
+Tests for product search.
+"""
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Category, Product
+from shop.filters import trigram_available
+
+PRODUCTS_URL = reverse('shop:product-list')
+
+
+class ProductSearchTests(TestCase):
+    """Test the `search` parameter of the product list."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.category = Category.objects.create(name='Electronics')
+
+    def create_product(self, name, description=''):
+        """Create and return a product."""
+        return Product.objects.create(
+            user=self.user, category=self.category, name=name,
+            description=description, price=Decimal('10.00'), stock=1,
+        )
+
+    def search(self, terms, **params):
+        """Search products and return the names found."""
+        res = self.client.get(PRODUCTS_URL, {'search': terms, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data['results']]
+
+    def test_search_vector_maintained_by_trigger(self):
+        """Test the search vector is filled and updated by the database."""
+        product = self.create_product('Gaming laptop')
+        product.refresh_from_db()
+        self.assertIn('laptop', product.search_vector)
+
+        product.name = 'Office chair'
+        product.save()
+        product.refresh_from_db()
+        self.assertIn('chair', product.search_vector)
+        self.assertNotIn('laptop', product.search_vector)
+
+    def test_search_matches_name_and_description(self):
+        """Test search looks into names and descriptions, stemmed."""
+        self.create_product('Gaming laptop')
+        self.create_product('Laptop bag', 'Fits most laptops')
+        self.create_product('Desk lamp')
+
+        names = self.search('laptops')
+
+        self.assertCountEqual(names, ['Gaming laptop', 'Laptop bag'])
+
+    def test_search_ranks_results(self):
+        """Test products matching in their name come first."""
+        self.create_product('Mouse pad', 'Pairs well with a wireless mouse')
+        self.create_product('Wireless headphones')
+        self.create_product('Phone charger', 'Wireless charging pad')
+
+        names = self.search('wireless headphones')
+
+        self.assertEqual(names, ['Wireless headphones'])
+        names = self.search('wireless')
+        self.assertEqual(names[0], 'Wireless headphones')
+
+    def test_search_results_paginate(self):
+        """Test walking ranked pages returns every match once."""
+        for i in range(7):
+            self.create_product(f'Cable {i}', 'cable ' * (i % 3))
+
+        res = self.client.get(PRODUCTS_URL,
+                              {'search': 'cable', 'page_size': 3})
+        ids = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(len(set(ids)), 7)
+
+    def test_search_without_match(self):
+        """Test a search matching nothing returns an empty page."""
+        self.create_product('Gaming laptop')
+
+        self.assertEqual(self.search('refrigerator'), [])
+
+    def test_trigram_fallback(self):
+        """Test misspelled terms still find similar product names."""
+        if not trigram_available():
+            self.skipTest('pg_trgm is not installed.')
+        self.create_product('Keyboard')
+        self.create_product('Monitor')
+
+        self.assertEqual(self.search('keybaord'), ['Keyboard'])
@@ -0,0 +1,237 @@
+"""
+Tests for the semantic product search.
+"""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Category, Product
+from shop.semantic import (
+    SemanticIndex,
+    embed,
+    get_index,
+    inverse_frequencies,
+    upsert_in_worker,
+    write_index,
+)
+
+SEMANTIC_SEARCH_URL = reverse('shop:product-semantic-search')
+
+CATALOG = [
+    (1, 'Gaming laptop', 'A fast notebook computer with a big screen'),
+    (2, 'Wireless mouse', 'Ergonomic mouse for your computer'),
+    (3, 'Leather bag', 'A bag to carry your notebook'),
+    (4, 'Standing desk', 'Adjustable office desk made of oak'),
+    (5, 'Office chair', 'Comfortable chair for long days at the desk'),
+]
+
+
+def semantic_search(client, query, **params):
+    """Search products, return the names found."""
+    res = client.get(SEMANTIC_SEARCH_URL, {'q': query, **params})
+    assert res.status_code == status.HTTP_200_OK, res.data
+    return [product['name'] for product in res.data]
+
+
+class EmbedTests(SimpleTestCase):
+    """Test embedding products."""
+
+    def setUp(self):
+        self.idf = inverse_frequencies(np.zeros(256), 0)
+
+    def test_unit_vectors(self):
+        """Test vectors are normalized and empty texts stay zero."""
+        vectors = embed([('Laptop', 'A computer'), ('', '')], self.idf)
+
+        self.assertEqual(vectors.dtype, np.float32)
+        self.assertAlmostEqual(float(np.linalg.norm(vectors[0])), 1, 5)
+        self.assertEqual(float(np.linalg.norm(vectors[1])), 0)
+
+    def test_trigrams_match_word_forms(self):
+        """Test related word forms are closer than unrelated words."""
+        laptop, laptops, chair = embed(
+            [('Laptop', ''), ('laptops', ''), ('chair', '')], self.idf
+        )
+
+        self.assertGreater(laptop @ laptops, laptop @ chair)
+
+
+class SemanticIndexTests(SimpleTestCase):
+    """Test writing and querying the index files."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.path = os.path.join(self.root, 'index')
+        write_index(self.path, lambda: iter([CATALOG]), 256, n_clusters=2)
+        self.index = SemanticIndex(self.path)
+
+    def search(self, query, k=3):
+        """Return the ids found for `query`."""
+        vector = embed([(query, '')], self.index.idf)[0]
+        return self.index.search(vector, k, nprobe=2)[0]
+
+    def test_search(self):
+        """Test the best matching products come first."""
+        self.assertEqual(self.search('laptop')[0], 1)
+        self.assertEqual(self.search('desk', k=2), [4, 5])
+
+    def test_search_limit(self):
+        """Test at most `k` products are returned."""
+        self.assertEqual(len(self.search('desk office', k=2)), 2)
+
+    def test_upsert(self):
+        """Test new products are appended and found at once."""
+        vector = embed([('Mechanical keyboard', '')], self.index.idf)[0]
+
+        self.index.upsert({6: vector})
+
+        self.assertEqual(self.index.count, 6)
+        self.assertEqual(self.search('keyboard')[0], 6)
+        # Another process mapping the same files sees it too.
+        other = SemanticIndex(self.path)
+        self.assertEqual(other.find(6), 5)
+
+    def test_remove(self):
+        """Test removed products are no longer found."""
+        self.index.remove([1])
+
+        self.assertNotIn(1, self.search('laptop'))
+
+
+class SemanticSearchAPITests(TestCase):
+    """Test the semantic search endpoint."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(SHOP_SEMANTIC_INDEX_DIR=self.root,
+                                     SHOP_IMAGE_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.category = Category.objects.create(name='Office')
+        for _, name, description in CATALOG:
+            self.create_product(name, description)
+
+    def create_product(self, name, description=''):
+        """Create and return a product."""
+        return Product.objects.create(
+            user=self.user, category=self.category, name=name,
+            description=description, price=Decimal('10.00'), stock=5,
+        )
+
+    def test_search(self):
+        """Test products are ranked by similarity, with their score."""
+        call_command('build_semantic_index', stdout=StringIO())
+
+        res = self.client.get(SEMANTIC_SEARCH_URL, {'q': 'laptops'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['name'], 'Gaming laptop')
+        self.assertGreater(res.data[0]['score'], 0)
+        self.assertEqual(
+            semantic_search(self.client, 'desk', limit=2),
+            ['Standing desk', 'Office chair'],
+        )
+        self.assertEqual(len(semantic_search(self.client, 'desk', limit=1)),
+                         1)
+
+    def test_query_required(self):
+        """Test a query is required."""
+        res = self.client.get(SEMANTIC_SEARCH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_index_not_built(self):
+        """Test searching before the index is built is unavailable."""
+        res = self.client.get(SEMANTIC_SEARCH_URL, {'q': 'laptop'})
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_saved_products_upserted(self):
+        """Test saving products updates the index once committed."""
+        call_command('build_semantic_index', stdout=StringIO())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            keyboard = self.create_product('Mechanical keyboard')
+        self.assertEqual(semantic_search(self.client, 'keyboard')[0],
+                         'Mechanical keyboard')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            keyboard.name = 'Espresso machine'
+            keyboard.save()
+        # Rewritten in place rather than appended again.
+        self.assertEqual(get_index().count, 6)
+        self.assertEqual(semantic_search(self.client, 'espresso')[0],
+                         'Espresso machine')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            keyboard.delete()
+        self.assertNotIn('Espresso machine',
+                         semantic_search(self.client, 'espresso'))
+
+    def test_upserted_in_background(self):
+        """Test upserts go to the background threads when there are."""
+        call_command('build_semantic_index', stdout=StringIO())
+
+        with override_settings(SHOP_IMAGE_WORKERS=2), \
+                mock.patch('shop.semantic.get_executor') as executor, \
+                self.captureOnCommitCallbacks(execute=True):
+            keyboard = self.create_product('Mechanical keyboard')
+
+        executor.return_value.submit.assert_called_once_with(
+            upsert_in_worker, [keyboard.id]
+        )
+        self.assertIsNone(get_index().find(keyboard.id))
+
+    def test_imported_products_upserted(self):
+        """Test products imported with INSERT are upserted."""
+        call_command('build_semantic_index', stdout=StringIO())
+        path = os.path.join(self.root, 'products.csv')
+        with open(path, 'w') as file:
+            file.write('name,price,stock,category\n'
+                       'Mechanical keyboard,10.00,1,Office\n')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_products', path, '--owner', self.user.email,
+                         stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(semantic_search(self.client, 'keyboard')[0],
+                         'Mechanical keyboard')
+
+    def test_rebuild_switches_index(self):
+        """Test a new build replaces the previous one, kept until the next."""
+        call_command('build_semantic_index', stdout=StringIO())
+        first = get_index()
+        self.create_product('Mechanical keyboard')
+
+        out = StringIO()
+        call_command('build_semantic_index', stdout=out)
+
+        self.assertIn('Indexed 6 products', out.getvalue())
+        self.assertIsNot(get_index(), first)
+        self.assertEqual(get_index().built, 6)
+        self.assertTrue(first.path.is_dir())
+
+        call_command('build_semantic_index', stdout=StringIO())
+
+        self.assertFalse(first.path.is_dir())
+        self.assertEqual(len([
+            name for name in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, name))
+        ]), 2)
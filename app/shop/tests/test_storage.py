@@ -0,0 +1,89 @@
+"""
+Tests for the product image storage backends.
+"""
+import io
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings
+from shop.storage import (
+    CloudinaryImageStorage,
+    InMemoryStorage,
+    get_image_storage,
+)
+
+
+class InMemoryStorageTests(SimpleTestCase):
+    """Test the in-memory storage."""
+
+    def setUp(self):
+        self.storage = InMemoryStorage(base_url='/media/images/')
+
+    def test_save_and_open(self):
+        """Test saved files can be read back and are listed."""
+        name = self.storage.save('photo.jpg', ContentFile(b'data'))
+
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.size(name), 4)
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b'data')
+        self.assertEqual(self.storage.listdir(''), ([], [name]))
+        self.assertEqual(self.storage.url(name), f'/media/images/{name}')
+
+    def test_names_are_not_overwritten(self):
+        """Test saving a taken name stores the file under a new one."""
+        first = self.storage.save('photo.jpg', ContentFile(b'first'))
+        second = self.storage.save('photo.jpg', ContentFile(b'second'))
+
+        self.assertNotEqual(first, second)
+        with self.storage.open(first) as file:
+            self.assertEqual(file.read(), b'first')
+
+    def test_delete(self):
+        """Test deleted files are gone."""
+        name = self.storage.save('photo.jpg', ContentFile(b'data'))
+
+        self.storage.delete(name)
+
+        self.assertFalse(self.storage.exists(name))
+        with self.assertRaises(FileNotFoundError):
+            self.storage.open(name)
+
+
+class CloudinaryImageStorageTests(SimpleTestCase):
+    """Test the Cloudinary image storage."""
+
+    @mock.patch('shop.storage.urlopen')
+    def test_open_downloads_from_url(self, patched_urlopen):
+        """Test opening an image reads it from its delivery URL."""
+        patched_urlopen.return_value = io.BytesIO(b'image')
+        storage = CloudinaryImageStorage()
+
+        with mock.patch.object(storage, 'url', return_value='https://x/a.jpg'):
+            with storage.open('product_images/a.jpg') as file:
+                self.assertEqual(file.read(), b'image')
+
+        patched_urlopen.assert_called_once_with('https://x/a.jpg')
+
+
+class ImageStorageSettingTests(SimpleTestCase):
+    """Test the image storage is chosen by settings."""
+
+    def test_backends(self):
+        """Test each named backend."""
+        for backend, storage_class in [('cloudinary', CloudinaryImageStorage),
+                                       ('local', FileSystemStorage),
+                                       ('memory', InMemoryStorage)]:
+            with override_settings(SHOP_IMAGE_BACKEND=backend):
+                self.assertIsInstance(get_image_storage(), storage_class)
+
+    @override_settings(SHOP_IMAGE_BACKEND='shop.storage.InMemoryStorage')
+    def test_dotted_path(self):
+        """Test any storage class can be given by its dotted path."""
+        self.assertIsInstance(get_image_storage(), InMemoryStorage)
+
+    @override_settings(SHOP_IMAGE_BACKEND='memory')
+    def test_storage_is_shared(self):
+        """Test the storage is created once for all uploads."""
+        self.assertIs(get_image_storage(), get_image_storage())
@@ -1,17 +1,26 @@
 """
 URL mapping for the shop app.
 """
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
+from .async_views import async_routes
 
 router = DefaultRouter()
 router.register('categories', views.CategoryViewSet, basename='category')
 router.register('products', views.ProductViewSet, basename='product')
 router.register('orders', views.OrderViewSet, basename= 'order')
+router.register('cart', views.CartViewSet, basename='cart')
+router.register('image-jobs', views.ImageUploadJobViewSet,
+                basename='image-job')
 
 app_name = 'shop'
 
+routes = router.urls
+if settings.SHOP_ASYNC_VIEWS:
+    routes = async_routes(routes)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(routes)),
 ]
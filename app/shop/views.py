@@ -1,28 +1,67 @@
 """
 View for Shop Api.
 """
+from django.conf import settings
 from django.db import transaction
+from django.db.models import F
+from django.http import StreamingHttpResponse
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, SAFE_METHODS, AllowAny
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework.exceptions import ValidationError
-from rest_framework import viewsets, permissions, status
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.decorators import action
-from cloudinary.uploader import upload as cloudinary_upload
+from django.urls import reverse
 from core.models import (
     Category,
     Product,
     Order,
-    OrderItem,
-    User
+    User,
+    ImageUploadJob
+)
+from .bulk import (
+    bulk_create_products,
+    bulk_delete_products,
+    bulk_update_products,
+)
+from .cache import cached_response
+from .cart import (
+    add_items,
+    cart_items,
+    cart_summary,
+    checkout_cart,
+    get_cart,
+    remove_item,
+    set_quantity,
+)
+from .checkout import checkout
+from .conditional import conditional_response
+from .export import CONTENT_TYPES, STREAMS
+from .feed import get_feed
+from .filters import (
+    ProductFilter,
+    ProductOrderingFilter,
+    ProductSearchFilter,
+)
+from .images import submit_image
+from .semantic import search
+from .pagination import (
+    CategoryPagination,
+    OrderPagination,
+    ProductPagination,
 )
 from .serializers import (
     CategorySerializer,
     ProductSerializer,
     ProductImageSerializer,
-    OrderSerializer
+    ScoredProductSerializer,
+    OrderSerializer,
+    OrderListSerializer,
+    CartItemSerializer,
+    CartMergeSerializer,
+    ImageUploadJobSerializer,
+    requested_fields
 )
 
 
@@ -30,6 +69,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     """View for managing categories."""
     serializer_class = CategorySerializer
     queryset = Category.objects.all().order_by('-name')
+    pagination_class = CategoryPagination
 
     def get_permissions(self):
         """Customize permission classes based on action."""
@@ -39,12 +79,31 @@ class CategoryViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
 
+    def list(self, request, *args, **kwargs):
+        """List categories, served from the cache when possible."""
+        return conditional_response(
+            request, self.filter_queryset(self.get_queryset()),
+            lambda: cached_response(
+                'category-list', request, [Category],
+                lambda: super(CategoryViewSet, self).list(
+                    request, *args, **kwargs
+                ),
+            ),
+        )
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ProductViewSet(viewsets.ModelViewSet):
     """View for managing products."""
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = ProductPagination
+    filter_backends = [
+        ProductSearchFilter,
+        ProductFilter,
+        ProductOrderingFilter,
+    ]
+    ordering = ['-id']
 
     def get_queryset(self):
         """Return products for the current authenticated user
@@ -55,11 +114,14 @@ class ProductViewSet(viewsets.ModelViewSet):
         #     return Product.objects.filter(user=self.request.user)
         # else:
         #     return Product.objects.none()
-        return Product.objects.all()
+        return Product.objects.select_related(
+            'category', 'user'
+        ).defer('search_vector')
 
     def get_permissions(self):
         """Customize permission classes based on action and user."""
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'recommendations',
+                           'semantic_search']:
             permission_classes = [permissions.AllowAny]
         elif self.request.user.is_superuser:
             permission_classes = [IsAdminUser]
@@ -89,6 +151,29 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer.save(user=user)
 
 
+    def list(self, request, *args, **kwargs):
+        """List products, answering 304 when the catalog is unchanged."""
+        queryset = self.filter_queryset(self.get_queryset())
+        return conditional_response(
+            request, queryset, lambda: self.paginated_response(queryset),
+            related=['category'],
+        )
+
+    def paginated_response(self, queryset):
+        """Return the serialized page of `queryset` requested."""
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a product, served from the cache when possible."""
+        return cached_response(
+            'product-detail', request, [Product, Category],
+            lambda: super(ProductViewSet, self).retrieve(
+                request, *args, **kwargs
+            ),
+        )
+
     def update(self, request, *args, **kwargs):
         product = Product.objects.filter(pk=kwargs['pk']).first()
         if product and not request.user.is_superuser and product.user != request.user:
@@ -101,9 +186,104 @@ class ProductViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Not authorized to delete this product.'}, status=status.HTTP_403_FORBIDDEN)
         return super().destroy(request, *args, **kwargs)
 
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        """Create, update or delete a batch of products at once.
+
+        POST takes a list of products, PATCH a list of partial updates
+        carrying an `id` and DELETE a list of ids. The whole batch is
+        applied in one transaction, or not at all if any item fails.
+        """
+        handler = {
+            'POST': bulk_create_products,
+            'PATCH': bulk_update_products,
+            'DELETE': bulk_delete_products,
+        }[request.method]
+        status_code, results = handler(request.data, request.user)
+        return Response(results, status=status_code)
+
+    @action(methods=['GET'], detail=True, url_path='recommendations')
+    def recommendations(self, request, pk=None):
+        """List the products most often bought with this one."""
+        products = Product.objects.filter(
+            recommended_in__product_id=pk
+        ).select_related('category').defer('search_vector').annotate(
+            score=F('recommended_in__score')
+        ).order_by('recommended_in__rank')
+        serializer = ScoredProductSerializer(products, many=True)
+        return Response(serializer.data)
+
+    @action(methods=['GET'], detail=False, url_path='semantic-search')
+    def semantic_search(self, request):
+        """List the products closest in meaning to the `q` parameter."""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'q': ['This parameter is required.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            return Response({'limit': ['A valid integer is required.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), 100)
+
+        found = search(query, limit)
+        if found is None:
+            return Response(
+                {'detail': 'The semantic search index is not built yet.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        ids, scores = found
+        # Products deleted since they were indexed are left out here.
+        products = self.get_queryset().in_bulk(ids)
+        results = []
+        for product_id, score in zip(ids, scores):
+            if product_id in products:
+                products[product_id].score = score
+                results.append(products[product_id])
+        serializer = ScoredProductSerializer(results, many=True)
+        return Response(serializer.data)
+
+    @action(methods=['GET'], detail=False, url_path='feed')
+    def feed(self, request):
+        """List the products picked for the user from their orders."""
+        ids, scores, hit = get_feed(request.user)
+        products = self.get_queryset().in_bulk(ids)
+        results = []
+        for product_id, score in zip(ids, scores):
+            if product_id in products:
+                products[product_id].score = score
+                results.append(products[product_id])
+        serializer = ScoredProductSerializer(results, many=True)
+        response = Response(serializer.data)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """Stream the whole catalog as NDJSON (default) or CSV."""
+        file_format = request.query_params.get('type', 'ndjson')
+        if file_format not in STREAMS:
+            return Response(
+                {'detail': f'Unsupported export type {file_format!r}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        stream = STREAMS[file_format](
+            self.get_queryset(), settings.SHOP_EXPORT_CHUNK_SIZE
+        )
+        response = StreamingHttpResponse(
+            stream, content_type=CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="products.{file_format}"'
+        )
+        return response
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Upload an image to a product."""
+        """Stage an image for a product, uploaded in the background."""
         product = self.get_object()
 
         # Extract the file from the request
@@ -112,23 +292,31 @@ class ProductViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'No image provided.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # Upload to Cloudinary
-        try:
-            upload_result = cloudinary_upload(
-                file,
-                folder='product_images',
-                resource_type='image'
-            )
-        except Exception as e:
-            return Response({'detail': str(e)},
-                            status=status.HTTP_400_BAD_REQUEST)
+        ProductImageSerializer(product, data=request.data).is_valid(
+            raise_exception=True
+        )
+        job = submit_image(product, request.user, file)
 
-        # Update product image URL
-        product.image = upload_result['url']
-        product.save()
+        url = reverse('shop:image-job-detail', args=[job.id])
+        done = job.status == ImageUploadJob.DONE
+        return Response(ImageUploadJobSerializer(job).data,
+                        status=status.HTTP_200_OK if done
+                        else status.HTTP_202_ACCEPTED,
+                        headers={'Location': url})
 
-        serializer = self.get_serializer(product)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class ImageUploadJobViewSet(mixins.RetrieveModelMixin,
+                            viewsets.GenericViewSet):
+    """Viewset for polling the status of product image uploads."""
+    serializer_class = ImageUploadJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        """Retrieve all jobs for superuser, or the user's own jobs."""
+        user = self.request.user
+        if user.is_superuser:
+            return ImageUploadJob.objects.all()
+        return ImageUploadJob.objects.filter(user=user)
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -136,6 +324,7 @@ class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     queryset = Order.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OrderPagination
 
     # def perform_create(self, serializer):
     #     products_data = serializer.validated_data.pop('products')
@@ -175,41 +364,98 @@ class OrderViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         products_data = serializer.validated_data.pop('products')
         order = serializer.save(user=self.request.user)
+        checkout(order, products_data)
 
-        for product_data in products_data:
-            product_id = product_data.get('product_id')
-            quantity = product_data.get('quantity')
-
-            # Retrieve the product using the product_id
-            try:
-                product_instance = Product.objects.get(id=product_id)
-            except Product.DoesNotExist:
-                raise ValidationError({'product_id': f'Product with id {product_id} does not exist.'})
-
-            # Check stock availability
-            if quantity > product_instance.stock:
-                raise ValidationError({
-                    'quantity': f'Insufficient stock for product ID {product_id}. Available: {product_instance.stock}, requested: {quantity}.'
-                })
-
-            # Create OrderItem instance
-            OrderItem.objects.create(
-                order=order,
-                product=product_instance,
-                quantity=quantity
-            )
-
-            # Update product stock
-            product_instance.stock -= quantity
-            product_instance.save()
+    def get_serializer_class(self):
+        """Use the compact serializer to list orders."""
+        if self.action == 'list':
+            return OrderListSerializer
+        return self.serializer_class
 
     def get_queryset(self):
         """Retrieve all orders for superuser, or orders for the current authenticated user."""
         user = self.request.user
+        queryset = Order.objects.select_related('user')
+        expand = requested_fields(self.request, 'expand')
+        if self.action != 'list' or 'items' in expand:
+            queryset = queryset.prefetch_related(
+                'orderitem_set__product__category'
+            )
         if user.is_superuser:
-            return Order.objects.all()  # Superuser gets all orders
-        return Order.objects.filter(user=user)  # Other users get their orders
+            return queryset  # Superuser gets all orders
+        return queryset.filter(user=user)  # Other users get their orders
 
     # def get_queryset(self):
     #     """Retrieve orders for the current authenticated user."""
     #     return Order.objects.filter(user=self.request.user)
+
+
+class CartViewSet(viewsets.GenericViewSet):
+    """Viewset for managing the cart of the authenticated user.
+
+    Clients keeping a local cart while logged out post it to `merge`
+    once logged in, so that it is added to the cart kept on the server.
+    """
+    serializer_class = CartItemSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        return cart_items(self.request.user)
+
+    def cart_response(self):
+        """Return the items of the cart along with its summary."""
+        items = self.get_serializer(self.get_queryset(), many=True).data
+        return Response({
+            'items': items,
+            'summary': cart_summary(self.request.user),
+        })
+
+    def list(self, request):
+        return self.cart_response()
+
+    @action(methods=['GET'], detail=False, url_path='summary')
+    def summary(self, request):
+        """Return the totals of the cart from a single query."""
+        return Response(cart_summary(request.user))
+
+    @action(methods=['POST'], detail=False, url_path='items')
+    def add(self, request):
+        """Add a quantity of a product to the cart."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        add_items(get_cart(request.user), [serializer.validated_data])
+        return self.cart_response()
+
+    @action(methods=['PATCH', 'DELETE'], detail=False,
+            url_path=r'items/(?P<product_id>\d+)', url_name='item')
+    def item(self, request, product_id):
+        """Change the quantity of a product in the cart, or remove it."""
+        cart = get_cart(request.user)
+        if request.method == 'DELETE':
+            if not remove_item(cart, int(product_id)):
+                return Response(status=status.HTTP_404_NOT_FOUND)
+            return self.cart_response()
+
+        serializer = self.get_serializer(
+            data={**request.data, 'product_id': product_id}
+        )
+        serializer.is_valid(raise_exception=True)
+        set_quantity(cart, int(product_id),
+                     serializer.validated_data['quantity'])
+        return self.cart_response()
+
+    @action(methods=['POST'], detail=False, url_path='merge')
+    def merge(self, request):
+        """Add the items of a client side cart to the cart."""
+        serializer = CartMergeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        add_items(get_cart(request.user), serializer.validated_data['items'])
+        return self.cart_response()
+
+    @action(methods=['POST'], detail=False, url_path='checkout')
+    def checkout(self, request):
+        """Order the content of the cart and empty it."""
+        order = checkout_cart(request.user)
+        return Response(OrderSerializer(order).data,
+                        status=status.HTTP_201_CREATED)
@@ -0,0 +1,167 @@
+"""
+Token authentication with cached token lookups, and signed tokens.
+
+DRF's TokenAuthentication loads the token and its user with a join on
+every request. CachedTokenAuthentication keeps the user id and staff
+and superuser flags of recently seen tokens for SHOP_AUTH_CACHE_TIMEOUT
+seconds, in a bounded LRU of this process ('local') or in Django's
+cache, shared by every process ('shared'). An empty SHOP_AUTH_CACHE
+turns the cache off. Like with signed tokens, the other fields of the
+user are deferred and loaded on first access; nothing else about the
+user, its password hash least of all, is cached.
+
+Entries are dropped when their token is deleted or their user saved
+with fields that may change its access, which covers deactivations.
+Other processes only see those with the shared cache, the local one
+relies on its short timeout. Queryset update() sends no signal, so
+deactivating users that way only takes effect after the timeout.
+
+SignedTokenAuthentication takes the signed access tokens of tokens.py
+as `Bearer` tokens, and needs no lookup at all.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.authtoken.models import Token
+
+from user.tokens import InvalidToken, read_access_token, user_from_claims
+
+
+def cache_key(key):
+    """Return the cache key of a token, which never holds the token."""
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+class LRUCache:
+    """A thread safe LRU mapping whose entries expire after `timeout`."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SharedCache:
+    """The token cache API over Django's cache."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def get(self, key):
+        return cache.get(key)
+
+    def set(self, key, value):
+        cache.set(key, value, self.timeout)
+
+    def delete_many(self, keys):
+        cache.delete_many(keys)
+
+
+@lru_cache(maxsize=None)
+def get_token_cache():
+    """Return the cache of token users, or None when disabled."""
+    backend = settings.SHOP_AUTH_CACHE
+    if backend == 'local':
+        return LRUCache(settings.SHOP_AUTH_CACHE_SIZE,
+                        settings.SHOP_AUTH_CACHE_TIMEOUT)
+    if backend == 'shared':
+        return SharedCache(settings.SHOP_AUTH_CACHE_TIMEOUT)
+    return None
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    """Pick the token cache again when its settings change."""
+    if setting.startswith('SHOP_AUTH_CACHE'):
+        get_token_cache.cache_clear()
+
+
+def forget_tokens(keys):
+    """Drop the cached users of the given tokens."""
+    token_cache = get_token_cache()
+    if token_cache is not None:
+        token_cache.delete_many([cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication looking tokens up in a cache first."""
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        if token_cache is None:
+            return super().authenticate_credentials(key)
+
+        claims = token_cache.get(cache_key(key))
+        if claims is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(cache_key(key), {
+                'uid': user.pk,
+                'staff': user.is_staff,
+                'su': user.is_superuser,
+            })
+            return user, token
+        # Only active users are cached, deactivating one drops its tokens.
+        user = user_from_claims(claims)
+        return user, Token(key=key, user=user)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authentication by signed access tokens, without any query."""
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            claims = read_access_token(auth[1].decode())
+        except (InvalidToken, UnicodeError) as exc:
+            raise exceptions.AuthenticationFailed(str(exc))
+        return user_from_claims(claims), claims
+
+    def authenticate_header(self, request):
+        return self.keyword
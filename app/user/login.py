@@ -0,0 +1,141 @@
+"""
+Password checks for the login endpoints.
+
+Password hashes are slow on purpose, which makes logins the most CPU
+hungry requests. Checks run on a pool of SHOP_LOGIN_WORKERS threads,
+where hashlib and argon2 release the GIL, with at most SHOP_LOGIN_QUEUE
+more waiting for a thread. Logins beyond that are refused at once with
+a 503, so that a burst of them cannot tie up every server worker.
+
+Hashes made by an older hasher or with a lower work factor than
+PASSWORD_HASHERS asks for are upgraded on the next successful login.
+
+Unknown emails are checked against a dummy hash made by the default
+hasher, so that they take as long to refuse as users whose hash is up
+to date. Users still on an older hasher are refused in that hasher's
+time until their hash is upgraded, as with Django's ModelBackend.
+
+`authenticate` checks users and passwords itself, it does not go
+through AUTHENTICATION_BACKENDS.
+"""
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, user_login_failed
+from django.contrib.auth.hashers import (
+    check_password,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import exceptions, status
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+class LoginBusy(exceptions.APIException):
+    """Raised when too many password checks are running already."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins in progress, try again shortly.'
+    default_code = 'login_busy'
+    # Sent as the Retry-After header.
+    wait = 1
+
+
+def get_pool():
+    """Return the thread pool checking passwords and its free slots."""
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.SHOP_LOGIN_WORKERS,
+                thread_name_prefix='login',
+            )
+            _slots = threading.BoundedSemaphore(
+                settings.SHOP_LOGIN_WORKERS + settings.SHOP_LOGIN_QUEUE
+            )
+        return _executor, _slots
+
+
+@lru_cache(maxsize=None)
+def dummy_hash():
+    """Return the hash of a random password, made by the default hasher."""
+    return make_password(secrets.token_urlsafe())
+
+
+@receiver(setting_changed)
+def reset_pool(setting, **kwargs):
+    """Size the pool again when its settings change."""
+    global _executor, _slots
+    if setting.startswith('SHOP_LOGIN_'):
+        with _executor_lock:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = _slots = None
+    if setting == 'PASSWORD_HASHERS':
+        dummy_hash.cache_clear()
+
+
+def run_hashing(function, *args):
+    """Run `function` on the pool, raise LoginBusy when it is full."""
+    if settings.SHOP_LOGIN_WORKERS == 0:
+        return function(*args)
+    executor, slots = get_pool()
+    if not slots.acquire(blocking=False):
+        raise LoginBusy()
+    try:
+        return executor.submit(function, *args).result()
+    finally:
+        slots.release()
+
+
+def must_update(encoded):
+    """Return whether a hash is not made the way new ones would be."""
+    preferred = get_hasher('default')
+    hasher = identify_hasher(encoded)
+    return (hasher.algorithm != preferred.algorithm
+            or preferred.must_update(encoded))
+
+
+def verify(password, encoded):
+    """Check `password` against its hash.
+
+    Returns whether it matches, and its new hash when it must be
+    upgraded.
+    """
+    if not check_password(password, encoded):
+        return False, None
+    if must_update(encoded):
+        return True, make_password(password)
+    return True, None
+
+
+def authenticate(request, email, password):
+    """Return the active user with these credentials, or None."""
+    User = get_user_model()
+    try:
+        user = User._default_manager.get_by_natural_key(email)
+    except User.DoesNotExist:
+        # Check anyway, so that unknown emails take as long to refuse.
+        run_hashing(verify, password, dummy_hash())
+        user = None
+    else:
+        valid, encoded = run_hashing(verify, password, user.password)
+        if encoded:
+            user.password = encoded
+            user.save(update_fields=['password'])
+        if not (valid and user.is_active):
+            user = None
+
+    if user is None:
+        user_login_failed.send(sender=__name__,
+                               credentials={'username': email},
+                               request=request)
+    return user
@@ -1,14 +1,14 @@
 """
 Serializers for the user API View.
 """
-from django.contrib.auth import (
-    get_user_model,
-    authenticate
-)
+from django.contrib.auth import get_user_model
 from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
+from user.login import authenticate
+from user.tokens import revoke_user
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object."""
@@ -30,6 +30,8 @@ class UserSerializer(serializers.ModelSerializer):
         if password:
             user.set_password(password)
             user.save()
+            # Logins made with the old password cannot be renewed.
+            revoke_user(user)
 
         return user
 
@@ -48,7 +50,7 @@ class AuthTokenSerializer(serializers.Serializer):
         password = attrs.get('password')
         user = authenticate(
             request=self.context.get('request'),
-            username=email,
+            email=email,
             password=password,
         )
         if not user:
@@ -58,3 +60,8 @@ class AuthTokenSerializer(serializers.Serializer):
         attrs['user'] = user
         attrs['is_superuser'] = user.is_superuser
         return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for a refresh token."""
+    refresh = serializers.CharField(trim_whitespace=False)
@@ -0,0 +1,29 @@
+"""
+Signal handlers for the user app.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import forget_tokens
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a deleted token."""
+    forget_tokens([instance.key])
+
+
+# The fields of users that the token cache holds or depends on.
+CACHED_FIELDS = {'is_active', 'is_staff', 'is_superuser'}
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """Reload a saved user, whose status may have changed."""
+    if update_fields is not None and not CACHED_FIELDS & update_fields:
+        return
+    forget_tokens(Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ))
@@ -0,0 +1,151 @@
+"""
+Tests for the cached token authentication.
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import LRUCache, cache_key, get_token_cache
+
+ME_URL = reverse('user:me')
+
+
+def token_lookups(client):
+    """Request the user endpoint, return how many tokens it looked up."""
+    with CaptureQueriesContext(connection) as queries:
+        res = client.get(ME_URL)
+    assert res.status_code == status.HTTP_200_OK, res.data
+    return sum('authtoken_token' in query['sql'] for query in queries)
+
+
+class LRUCacheTests(SimpleTestCase):
+    """Test the in-process LRU cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test the entry used least recently goes first."""
+        lru = LRUCache(maxsize=2, timeout=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+
+        lru.set('c', 3)
+
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')),
+                         (1, None, 3))
+
+    @mock.patch('user.authentication.time.monotonic')
+    def test_entries_expire(self, monotonic):
+        """Test entries are gone after the timeout."""
+        monotonic.return_value = 100
+        lru = LRUCache(maxsize=2, timeout=60)
+        lru.set('a', 1)
+
+        monotonic.return_value = 160
+
+        self.assertIsNone(lru.get('a'))
+        self.assertEqual(len(lru.entries), 0)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens."""
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='testpass123', name='Test',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        """Test the token is looked up once."""
+        self.assertEqual(token_lookups(self.client), 1)
+        self.assertEqual(token_lookups(self.client), 0)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    @override_settings(SHOP_AUTH_CACHE='shared')
+    def test_only_ids_and_flags_cached(self):
+        """Test the cache holds neither the user nor its password."""
+        self.client.get(ME_URL)
+
+        entry = cache.get(cache_key(self.token.key))
+
+        self.assertEqual(entry, {'uid': self.user.id, 'staff': False,
+                                 'su': False})
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops authenticating at once."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user stops authenticating at once."""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_staff_change_reloads_user(self):
+        """Test changing the flags of a user drops its cached tokens."""
+        self.client.get(ME_URL)
+
+        self.user.is_staff = True
+        self.user.save()
+
+        self.assertEqual(token_lookups(self.client), 1)
+
+    def test_unrelated_save_keeps_cache(self):
+        """Test saving fields the cache does not depend on keeps it."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['password'])
+
+        self.assertEqual(token_lookups(self.client), 0)
+
+    def test_cached_user_not_shared(self):
+        """Test a request changing its user leaves the cache alone."""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'Renamed'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Renamed')
+
+    @override_settings(SHOP_AUTH_CACHE='shared')
+    def test_shared_cache(self):
+        """Test the shared cache is invalidated too."""
+        self.client.get(ME_URL)
+        self.assertEqual(token_lookups(self.client), 0)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SHOP_AUTH_CACHE='')
+    def test_cache_disabled(self):
+        """Test every request looks the token up without the cache."""
+        self.client.get(ME_URL)
+
+        self.assertEqual(token_lookups(self.client), 1)
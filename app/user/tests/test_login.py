@@ -0,0 +1,119 @@
+"""
+Tests for password hashing and login protection.
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.login import dummy_hash, get_pool, verify
+from user.throttling import LoginIPThrottle
+
+TOKEN_URL = reverse('user:token')
+
+
+class LoginTests(TestCase):
+    """Test the login endpoint protections."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='testpass123',
+        )
+
+    def login(self, email='test@example.com', password='testpass123',
+              **extra):
+        """Post credentials to the token endpoint."""
+        return self.client.post(TOKEN_URL, {
+            'email': email, 'password': password,
+        }, **extra)
+
+    def test_new_passwords_use_argon2(self):
+        """Test passwords are hashed by the preferred hasher."""
+        self.assertTrue(self.user.password.startswith('argon2'))
+
+    def test_rehash_on_login(self):
+        """Test hashes from another hasher are upgraded at login."""
+        self.user.password = make_password('testpass123',
+                                           hasher='pbkdf2_sha256')
+        self.user.save()
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('argon2'))
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+    ])
+    def test_rehash_to_scrypt(self):
+        """Test switching hashers upgrades existing hashes at login."""
+        self.login()
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt'))
+
+    def test_unknown_email(self):
+        """Test unknown emails are refused like bad passwords."""
+        with mock.patch('user.login.verify', wraps=verify) as checked:
+            res = self.login(email='nobody@example.com')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        # Checked against a hash like the ones of current users.
+        password, encoded = checked.call_args.args
+        self.assertEqual(password, 'testpass123')
+        self.assertEqual(encoded, dummy_hash())
+        self.assertTrue(encoded.startswith('argon2'))
+
+    def test_inactive_user(self):
+        """Test inactive users cannot log in."""
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(SHOP_LOGIN_WORKERS=1, SHOP_LOGIN_QUEUE=0)
+    def test_admission_control(self):
+        """Test logins are refused while the hashing pool is full."""
+        _, slots = get_pool()
+        slots.acquire()
+        try:
+            res = self.login()
+        finally:
+            slots.release()
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    def test_email_throttle(self):
+        """Test attempts on one email are limited."""
+        for _ in range(5):
+            self.login(password='wrong', REMOTE_ADDR='10.0.0.1')
+
+        res = self.login(REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    @mock.patch.dict(LoginIPThrottle.THROTTLE_RATES, {'login_ip': '3/min'})
+    def test_ip_throttle(self):
+        """Test attempts from one address are limited across emails."""
+        for i in range(3):
+            self.login(email=f'user{i}@example.com', password='wrong')
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,156 @@
+"""
+Tests for the signed access tokens and the refresh tokens.
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import RefreshToken
+from user.tokens import issue_access_token
+
+TOKEN_PAIR_URL = reverse('user:token-pair')
+TOKEN_REFRESH_URL = reverse('user:token-refresh')
+TOKEN_REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+ORDERS_URL = reverse('shop:order-list')
+
+
+def create_user(**params):
+    """Create and return new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class TokenPairApiTests(TestCase):
+    """Test the signed token flow."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(email='test@example.com',
+                                password='testpass123', name='Test')
+        self.client = APIClient()
+
+    def login(self):
+        """Return a token pair for the user."""
+        res = self.client.post(TOKEN_PAIR_URL, {
+            'email': 'test@example.com', 'password': 'testpass123',
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def refresh(self, token):
+        """Exchange a refresh token, return the response."""
+        return self.client.post(TOKEN_REFRESH_URL, {'refresh': token})
+
+    def test_create_token_pair(self):
+        """Test valid credentials get an access and a refresh token."""
+        pair = self.login()
+
+        self.assertIn('access', pair)
+        self.assertIn('refresh', pair)
+        self.assertFalse(pair['is_superuser'])
+        stored = RefreshToken.objects.get(user=self.user)
+        self.assertNotEqual(stored.key_hash, pair['refresh'])
+
+    def test_bad_credentials(self):
+        """Test bad credentials get no token."""
+        res = self.client.post(TOKEN_PAIR_URL, {
+            'email': 'test@example.com', 'password': 'wrong',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_access_token_without_queries(self):
+        """Test access tokens authenticate without any query."""
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {issue_access_token(self.user)}'
+        )
+
+        with self.assertNumQueries(1):
+            # The order list itself, the user is never loaded.
+            res = self.client.get(ORDERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['email'], 'test@example.com')
+
+    def test_tampered_access_token(self):
+        """Test an access token changed by the client is rejected."""
+        token = issue_access_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer x{token}')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_access_token(self):
+        """Test an access token stops working once expired."""
+        token = issue_access_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        with mock.patch('user.tokens.time.time', return_value=2 ** 40):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Bearer')
+
+    def test_refresh_rotates(self):
+        """Test a refresh token is exchanged for a new pair once."""
+        pair = self.login()
+
+        res = self.refresh(pair['refresh'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['refresh'], pair['refresh'])
+        self.assertEqual(
+            self.refresh(res.data['refresh']).status_code,
+            status.HTTP_200_OK,
+        )
+
+    def test_reused_refresh_token_revokes_family(self):
+        """Test presenting an exchanged token revokes its successors."""
+        pair = self.login()
+        rotated = self.refresh(pair['refresh']).data
+
+        res = self.refresh(pair['refresh'])
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.refresh(rotated['refresh']).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke(self):
+        """Test a revoked refresh token cannot be exchanged."""
+        pair = self.login()
+
+        res = self.client.post(TOKEN_REVOKE_URL, {'refresh': pair['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.refresh(pair['refresh']).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes(self):
+        """Test changing the password revokes the refresh tokens."""
+        pair = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {pair["access"]}')
+
+        res = self.client.patch(ME_URL, {'password': 'newpassword123'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('newpassword123'))
+        self.assertEqual(self.refresh(pair['refresh']).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_user_refresh(self):
+        """Test deactivated users cannot renew their tokens."""
+        pair = self.login()
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.refresh(pair['refresh'])
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,34 @@
+"""
+Rate limits of the login endpoints.
+
+Attempts are counted per client IP and per email, so that a burst of
+guesses is cut short whether it targets many accounts from one address
+or one account from many. Rates are set in DEFAULT_THROTTLE_RATES.
+"""
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginIPThrottle(SimpleRateThrottle):
+    """Limit the login attempts of each client IP."""
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope, 'ident': self.get_ident(request),
+        }
+
+
+class LoginEmailThrottle(SimpleRateThrottle):
+    """Limit the login attempts on each email."""
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(
+            request.data, 'get'
+        ) else None
+        if not isinstance(email, str) or not email:
+            return None
+        ident = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -0,0 +1,142 @@
+"""
+Signed access tokens and rotating refresh tokens.
+
+Access tokens are signed with SECRET_KEY by django.core.signing and
+carry the user id, staff and superuser flags and an expiry, so they are
+verified without touching the database. They live for
+SHOP_ACCESS_TOKEN_LIFETIME seconds and cannot be revoked before.
+
+Refresh tokens are random, stored hashed as RefreshToken rows, and
+exchanged for a new pair at most once. Presenting a token already
+exchanged revokes every token rotated from the same login, as it means
+the token leaked.
+"""
+import hashlib
+import secrets
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+from core.models import RefreshToken
+
+ACCESS_TOKEN_SALT = 'user.tokens.access'
+
+
+class InvalidToken(Exception):
+    """Raised for tokens that are malformed, expired or revoked."""
+
+
+def issue_access_token(user):
+    """Return a signed access token for `user`."""
+    return signing.dumps({
+        'uid': user.pk,
+        'staff': user.is_staff,
+        'su': user.is_superuser,
+        'exp': int(time.time()) + settings.SHOP_ACCESS_TOKEN_LIFETIME,
+    }, salt=ACCESS_TOKEN_SALT)
+
+
+def read_access_token(token):
+    """Return the claims of a valid access token, else raise."""
+    try:
+        claims = signing.loads(token, salt=ACCESS_TOKEN_SALT)
+    except signing.BadSignature:
+        raise InvalidToken('Invalid token.')
+    if claims['exp'] <= time.time():
+        raise InvalidToken('Token expired.')
+    return claims
+
+
+def user_from_claims(claims):
+    """Build the user of an access token without querying it.
+
+    Fields other than the ones carried by the token are deferred, and
+    loaded on first access.
+    """
+    return get_user_model().from_db(
+        'default',
+        ['id', 'is_staff', 'is_superuser'],
+        [claims['uid'], claims['staff'], claims['su']],
+    )
+
+
+def hash_key(key):
+    """Return the hash a refresh token is stored under."""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def issue_refresh_token(user, family=None):
+    """Store and return a new refresh token for `user`."""
+    key = secrets.token_urlsafe(32)
+    RefreshToken.objects.create(
+        user=user,
+        key_hash=hash_key(key),
+        family=family or uuid.uuid4(),
+        expires_at=timezone.now() + timedelta(
+            seconds=settings.SHOP_REFRESH_TOKEN_LIFETIME
+        ),
+    )
+    return key
+
+
+def token_pair(user, family=None):
+    """Return a new access and refresh token response for `user`."""
+    return {
+        'access': issue_access_token(user),
+        'refresh': issue_refresh_token(user, family),
+        'expires_in': settings.SHOP_ACCESS_TOKEN_LIFETIME,
+        'is_superuser': user.is_superuser,
+    }
+
+
+def revoke_family(family):
+    """Revoke every refresh token rotated from the same login."""
+    RefreshToken.objects.filter(family=family, revoked_at=None).update(
+        revoked_at=timezone.now()
+    )
+
+
+def revoke_user(user):
+    """Revoke every refresh token of `user`."""
+    RefreshToken.objects.filter(user=user, revoked_at=None).update(
+        revoked_at=timezone.now()
+    )
+
+
+def rotate_refresh_token(key):
+    """Exchange a refresh token for a new token pair.
+
+    The token is locked while exchanged, so that it is exchanged once
+    even by concurrent requests.
+    """
+    with transaction.atomic():
+        token = RefreshToken.objects.select_related('user').select_for_update(
+            of=('self',)
+        ).filter(key_hash=hash_key(key)).first()
+        if token is None or token.revoked_at is not None:
+            raise InvalidToken('Invalid token.')
+        if token.used_at is not None:
+            revoke_family(token.family)
+        elif token.expires_at <= timezone.now():
+            raise InvalidToken('Token expired.')
+        elif not token.user.is_active:
+            raise InvalidToken('User inactive or deleted.')
+        else:
+            token.used_at = timezone.now()
+            token.save(update_fields=['used_at'])
+            return token_pair(token.user, token.family)
+    # Raised once the revocation is committed.
+    raise InvalidToken('Token reused, all tokens of this login revoked.')
+
+
+def revoke_refresh_token(key):
+    """Revoke a refresh token and every token rotated with it."""
+    token = RefreshToken.objects.filter(key_hash=hash_key(key)).first()
+    if token is None:
+        raise InvalidToken('Invalid token.')
+    revoke_family(token.family)
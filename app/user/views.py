@@ -1,15 +1,29 @@
 """
 Views for the user API.
 """
+from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
+    RefreshTokenSerializer,
+)
+from user.throttling import LoginEmailThrottle, LoginIPThrottle
+from user.tokens import (
+    InvalidToken,
+    revoke_refresh_token,
+    rotate_refresh_token,
+    token_pair,
 )
 
 
@@ -27,6 +41,7 @@ class CreateTokenView(ObtainAuthToken):
     """Create new auth token for user."""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data,
@@ -40,12 +55,68 @@ class CreateTokenView(ObtainAuthToken):
         })
 
 
+class CreateTokenPairView(APIView):
+    """Create a signed access token and a refresh token for a user."""
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+    serializer_class = AuthTokenSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data,
+                                           context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        return Response(token_pair(serializer.validated_data['user']))
+
+
+class RefreshTokenView(APIView):
+    """Exchange a refresh token for a new token pair."""
+    authentication_classes = []
+    permission_classes = []
+    serializer_class = RefreshTokenSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            pair = rotate_refresh_token(serializer.validated_data['refresh'])
+        except InvalidToken as exc:
+            return Response({'detail': str(exc)},
+                            status=status.HTTP_401_UNAUTHORIZED)
+        return Response(pair)
+
+
+class RevokeTokenView(APIView):
+    """Revoke a refresh token and the ones rotated with it."""
+    authentication_classes = []
+    permission_classes = []
+    serializer_class = RefreshTokenSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            revoke_refresh_token(serializer.validated_data['refresh'])
+        except InvalidToken as exc:
+            return Response({'detail': str(exc)},
+                            status=status.HTTP_401_UNAUTHORIZED)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [
+        SignedTokenAuthentication,
+        CachedTokenAuthentication,
+    ]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrieve and return the authenticated User."""
-        return self.request.user
+        user = self.request.user
+        if user.get_deferred_fields():
+            # Users of signed or cached tokens only carry their id and
+            # flags.
+            user = get_user_model().objects.get(pk=user.pk)
+        return user
@@ -0,0 +1,18 @@
+#!/bin/sh
+
+set -e
+
+python manage.py wait_for_db
+
+# Pending image jobs every IMAGE_JOBS_INTERVAL seconds, and unreferenced
+# image assets every IMAGE_GC_INTERVAL seconds.
+last_gc=0
+while true; do
+    python manage.py process_image_jobs
+    now=$(date +%s)
+    if [ $((now - last_gc)) -ge "${IMAGE_GC_INTERVAL:-3600}" ]; then
+        python manage.py gc_image_assets
+        last_gc=$now
+    fi
+    sleep "${IMAGE_JOBS_INTERVAL:-60}"
+done